@@ -4,3 +4,6 @@ from django.apps import AppConfig
 class GrcDashboardConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'grc_dashboard'
+
+    def ready(self):
+        from . import signals  # noqa: F401 (connects the receivers)
@@ -0,0 +1,175 @@
+# grc_dashboard/counters.py
+from collections import Counter
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from django.db import IntegrityError, transaction
+from django.db.models import Count, F
+
+from .models import Audit, ComplianceControl, Issue, KpiCounter, Risk
+
+
+# Models tallied in KpiCounter, and the field each is tallied by as its
+# severity (an issue's priority; controls and audits have none)
+COUNTED_MODELS = {
+    Risk: 'severity',
+    Issue: 'priority',
+    ComplianceControl: None,
+    Audit: None,
+}
+
+# Primary keys per tally query when counting a bulk update
+TALLY_BATCH_SIZE = 500
+
+# Changes collected by an enclosing batched_changes() block
+_batch = ContextVar('kpi_counter_batch', default=None)
+
+
+def counted_fields(model):
+    """Field names whose change moves a row to another counter"""
+    severity = COUNTED_MODELS[model]
+    return {'status', 'department', 'department_id'} | ({severity} if severity else set())
+
+
+def counter_key(instance):
+    """(model, status, severity, department_id) of an instance"""
+    model = type(instance)
+    severity = COUNTED_MODELS[model]
+    return (
+        model._meta.model_name,
+        instance.status,
+        getattr(instance, severity) if severity else '',
+        instance.department_id,
+    )
+
+
+def tally(model, queryset):
+    """Counter of counter keys over a queryset of a counted model, in one grouped query"""
+    severity = COUNTED_MODELS[model]
+    fields = ['status', 'department_id'] + ([severity] if severity else [])
+    counts = Counter()
+    for row in queryset.order_by().values(*fields).annotate(count=Count('pk')):
+        key = (model._meta.model_name, row['status'], row[severity] if severity else '', row['department_id'])
+        counts[key] += row['count']
+    return counts
+
+
+def tally_pks(model, pks):
+    counts = Counter()
+    for start in range(0, len(pks), TALLY_BATCH_SIZE):
+        counts.update(tally(model, model._base_manager.filter(pk__in=pks[start:start + TALLY_BATCH_SIZE])))
+    return counts
+
+
+def apply_changes(changes):
+    """Add each delta in changes to its counter row.
+
+    Increments are single UPDATE ... SET count = count + n statements, so
+    concurrent writers cannot lose each other's changes.
+    """
+    for (model, status, severity, department_id), delta in sorted(changes.items()):
+        if not delta:
+            continue
+        counter = KpiCounter.objects.filter(
+            model=model, status=status, severity=severity, department_id=department_id
+        )
+        with transaction.atomic():
+            if counter.update(count=F('count') + delta) or delta < 0:
+                # A missing row on a decrement means the department was
+                # deleted with its counters
+                continue
+            try:
+                with transaction.atomic():
+                    KpiCounter.objects.create(
+                        model=model, status=status, severity=severity, department_id=department_id, count=delta
+                    )
+            except IntegrityError:
+                # Created by a concurrent writer since the UPDATE
+                counter.update(count=F('count') + delta)
+
+
+def record(changes):
+    """Apply counter changes now, or at the end of the enclosing batched_changes() block"""
+    batch = _batch.get()
+    if batch is None:
+        apply_changes(changes)
+    else:
+        batch.update(changes)
+
+
+@contextmanager
+def batched_changes():
+    """Collect the counter changes made inside the block and apply them once at the end"""
+    if _batch.get() is not None:
+        yield
+        return
+    changes = Counter()
+    token = _batch.set(changes)
+    try:
+        yield
+    finally:
+        _batch.reset(token)
+    apply_changes(changes)
+
+
+def rebuild_counters(dry_run=False):
+    """Recount every counter from the counted tables.
+
+    Returns {key: (stored, actual)} for the counters that had drifted; with
+    dry_run the table is left as it was.
+    """
+    actual = Counter()
+    for model in COUNTED_MODELS:
+        actual.update(tally(model, model._base_manager.all()))
+
+    with transaction.atomic():
+        stored = {
+            (model, status, severity, department_id): count
+            for model, status, severity, department_id, count in KpiCounter.objects.values_list(
+                'model', 'status', 'severity', 'department_id', 'count'
+            )
+        }
+        drift = {
+            key: (stored.get(key, 0), actual.get(key, 0))
+            for key in set(stored) | set(actual)
+            if stored.get(key, 0) != actual.get(key, 0)
+        }
+        if not dry_run:
+            KpiCounter.objects.all().delete()
+            KpiCounter.objects.bulk_create(
+                KpiCounter(model=model, status=status, severity=severity, department_id=department_id, count=count)
+                for (model, status, severity, department_id), count in actual.items()
+                if count
+            )
+    return drift
+
+
+class KpiTotals:
+    """Every counter, loaded in one query, summed over any dimension"""
+
+    def __init__(self):
+        self.rows = list(KpiCounter.objects.values_list('model', 'status', 'severity', 'department_id', 'count'))
+
+    def _matching(self, model, status=None, severity=None, department_id=None):
+        model_name = model._meta.model_name
+        statuses = [status] if isinstance(status, str) else status
+        for row in self.rows:
+            if (
+                row[0] == model_name
+                and (statuses is None or row[1] in statuses)
+                and (severity is None or row[2] == severity)
+                and (department_id is None or row[3] == department_id)
+            ):
+                yield row
+
+    def total(self, model, status=None, severity=None, department_id=None):
+        """Rows of model with the given status (or list of statuses), severity and department"""
+        return sum(row[4] for row in self._matching(model, status, severity, department_id))
+
+    def breakdown(self, model, field):
+        """[{field: value, 'count': n}] by 'status' or 'severity', like values().annotate(Count())"""
+        index = {'status': 1, 'severity': 2}[field]
+        counts = Counter()
+        for row in self._matching(model):
+            counts[row[index]] += row[4]
+        return [{field: value, 'count': count} for value, count in counts.items() if count]
@@ -1,7 +1,9 @@
 # Create this file: grc_dashboard/decorators.py
 
+from asgiref.sync import sync_to_async
 from django.shortcuts import redirect
 from django.contrib import messages
+from django.contrib.auth.views import redirect_to_login
 from functools import wraps
 
 def poam_permission_required(view_func):
@@ -28,4 +30,20 @@ def poam_permission_required(view_func):
         messages.error(request, 'You do not have permission to manage PO&AMs. Only Security department users and administrators can add or modify PO&AMs.')
         return redirect('issue_tracking')
     
-    return wrapper
\ No newline at end of file
+    return wrapper
+
+
+def async_login_required(view_func):
+    """
+    login_required for async views, which Django 4.2's decorator does not support.
+    The user is loaded in a sync thread, so the view and its template can use
+    request.user without touching the database again.
+    """
+    @wraps(view_func)
+    async def wrapper(request, *args, **kwargs):
+        is_authenticated = await sync_to_async(lambda: request.user.is_authenticated)()
+        if not is_authenticated:
+            return redirect_to_login(request.get_full_path())
+        return await view_func(request, *args, **kwargs)
+
+    return wrapper
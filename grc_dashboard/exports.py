@@ -0,0 +1,194 @@
+# grc_dashboard/exports.py
+from datetime import timezone as dt_timezone
+from itertools import islice
+
+from openpyxl import Workbook
+from openpyxl.cell.cell import ILLEGAL_CHARACTERS_RE
+
+from .models import ComplianceControl, Issue, Risk, Vulnerability
+
+try:
+    import pyarrow
+    import pyarrow.parquet
+except ImportError:  # Parquet export is optional
+    pyarrow = None
+
+
+# Rows fetched per database round trip and written per Parquet row group
+EXPORT_BATCH_SIZE = 50000
+
+# Data rows that fit on one worksheet under the header
+XLSX_MAX_ROWS = 1048575
+
+EXPORT_FORMATS = {
+    'parquet': 'application/vnd.apache.parquet',
+    'xlsx': 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet',
+}
+
+# Dataset -> (model, [(column, lookup, kind)]). "category" columns are
+# low-cardinality strings, written dictionary-encoded
+DATASETS = {
+    'vulnerabilities': (Vulnerability, [
+        ('id', 'id', 'int'),
+        ('cve', 'cve', 'category'),
+        ('plugin_id', 'plugin_id', 'category'),
+        ('plugin_name', 'plugin__plugin_name', 'category'),
+        ('severity', 'severity', 'category'),
+        ('status', 'status', 'category'),
+        ('dns_name', 'dns_name', 'category'),
+        ('ip_address', 'ip_address', 'category'),
+        ('port', 'port', 'int'),
+        ('synopsis', 'plugin__synopsis', 'category'),
+        ('description', 'plugin__description', 'category'),
+        ('remediation', 'plugin__remediation', 'category'),
+        ('plugin_output', 'plugin_output', 'string'),
+        ('exploit_available', 'exploit_available', 'bool'),
+        ('first_discovered', 'first_discovered', 'date'),
+        ('last_observed', 'last_observed', 'date'),
+        ('scan', 'scan__name', 'category'),
+        ('created_at', 'created_at', 'datetime'),
+        ('updated_at', 'updated_at', 'datetime'),
+    ]),
+    'risks': (Risk, [
+        ('id', 'id', 'int'),
+        ('title', 'title', 'string'),
+        ('description', 'description', 'string'),
+        ('department', 'department__name', 'category'),
+        ('severity', 'severity', 'category'),
+        ('likelihood', 'likelihood', 'int'),
+        ('impact', 'impact', 'int'),
+        ('status', 'status', 'category'),
+        ('owner', 'owner__username', 'category'),
+        ('mitigation_plan', 'mitigation_plan', 'string'),
+        ('identified_date', 'identified_date', 'date'),
+        ('target_closure_date', 'target_closure_date', 'date'),
+        ('compliance_percentage', 'compliance_percentage', 'int'),
+        ('evidence_uploaded', 'evidence_uploaded', 'bool'),
+        ('created_at', 'created_at', 'datetime'),
+        ('updated_at', 'updated_at', 'datetime'),
+    ]),
+    'issues': (Issue, [
+        ('id', 'id', 'int'),
+        ('title', 'title', 'string'),
+        ('description', 'description', 'string'),
+        ('priority', 'priority', 'category'),
+        ('status', 'status', 'category'),
+        ('department', 'department__name', 'category'),
+        ('assigned_to', 'assigned_to__username', 'category'),
+        ('related_risk_id', 'related_risk_id', 'int'),
+        ('related_audit_id', 'related_audit_id', 'int'),
+        ('due_date', 'due_date', 'date'),
+        ('resolution_notes', 'resolution_notes', 'string'),
+        ('created_at', 'created_at', 'datetime'),
+        ('updated_at', 'updated_at', 'datetime'),
+    ]),
+    'controls': (ComplianceControl, [
+        ('id', 'id', 'int'),
+        ('framework', 'framework__name', 'category'),
+        ('control_id', 'control_id', 'string'),
+        ('title', 'title', 'string'),
+        ('description', 'description', 'string'),
+        ('department', 'department__name', 'category'),
+        ('status', 'status', 'category'),
+        ('owner', 'owner__username', 'category'),
+        ('evidence', 'evidence', 'string'),
+        ('last_assessment_date', 'last_assessment_date', 'date'),
+        ('next_assessment_date', 'next_assessment_date', 'date'),
+        ('created_at', 'created_at', 'datetime'),
+        ('updated_at', 'updated_at', 'datetime'),
+    ]),
+}
+
+
+def _row_batches(dataset, queryset, batch_size):
+    model, columns = DATASETS[dataset]
+    if queryset is None:
+        queryset = model.objects.all()
+    # Primary key order walks the table without a sort
+    rows = (
+        queryset.order_by('pk')
+        .values_list(*[lookup for column, lookup, kind in columns])
+        .iterator(chunk_size=batch_size)
+    )
+    while True:
+        batch = list(islice(rows, batch_size))
+        if not batch:
+            return
+        yield batch
+
+
+def _arrow_type(kind):
+    return {
+        'int': pyarrow.int64(),
+        'string': pyarrow.string(),
+        'category': pyarrow.dictionary(pyarrow.int32(), pyarrow.string()),
+        'bool': pyarrow.bool_(),
+        'date': pyarrow.date32(),
+        'datetime': pyarrow.timestamp('us', tz='UTC'),
+    }[kind]
+
+
+def write_parquet(dataset, out, queryset=None, batch_size=EXPORT_BATCH_SIZE):
+    """Write a dataset to out (a path or binary file) as Parquet.
+
+    Rows are converted batch by batch into typed Arrow columns and written
+    as one row group each, so the table is never held in memory.
+    """
+    if pyarrow is None:
+        raise ImportError('Parquet export requires pyarrow (pip install pyarrow).')
+
+    model, columns = DATASETS[dataset]
+    schema = pyarrow.schema([(column, _arrow_type(kind)) for column, lookup, kind in columns])
+    rows = 0
+    with pyarrow.parquet.ParquetWriter(out, schema, compression='zstd') as writer:
+        for batch in _row_batches(dataset, queryset, batch_size):
+            arrays = []
+            for (column, lookup, kind), values in zip(columns, zip(*batch)):
+                if kind == 'category':
+                    arrays.append(pyarrow.array(values, pyarrow.string()).dictionary_encode())
+                else:
+                    arrays.append(pyarrow.array(values, _arrow_type(kind)))
+            writer.write_table(pyarrow.Table.from_arrays(arrays, schema=schema))
+            rows += len(batch)
+    return rows
+
+
+def write_xlsx(dataset, out, queryset=None, batch_size=EXPORT_BATCH_SIZE):
+    """Write a dataset to out (a path or binary file) as a write-only .xlsx workbook"""
+    model, columns = DATASETS[dataset]
+    if queryset is None:
+        queryset = model.objects.all()
+    if queryset[:XLSX_MAX_ROWS + 1].count() > XLSX_MAX_ROWS:
+        raise ValueError(f'More than {XLSX_MAX_ROWS} rows; use the Parquet export instead.')
+
+    # Excel has no timezone support, so datetimes are written as naive UTC,
+    # and cells cannot hold control characters (common in plugin output)
+    datetime_columns = [i for i, (column, lookup, kind) in enumerate(columns) if kind == 'datetime']
+    text_columns = [i for i, (column, lookup, kind) in enumerate(columns) if kind in ('string', 'category')]
+
+    workbook = Workbook(write_only=True)
+    sheet = workbook.create_sheet(dataset)
+    sheet.append([column for column, lookup, kind in columns])
+    rows = 0
+    for batch in _row_batches(dataset, queryset, batch_size):
+        for row in batch:
+            row = list(row)
+            for i in datetime_columns:
+                if row[i] is not None:
+                    row[i] = row[i].astimezone(dt_timezone.utc).replace(tzinfo=None)
+            for i in text_columns:
+                if row[i]:
+                    row[i] = ILLEGAL_CHARACTERS_RE.sub('', row[i])
+            sheet.append(row)
+        rows += len(batch)
+    workbook.save(out)
+    return rows
+
+
+def write_export(dataset, fmt, out, queryset=None):
+    """Write a dataset in the given format ('parquet' or 'xlsx'); returns the row count"""
+    if fmt == 'parquet':
+        return write_parquet(dataset, out, queryset)
+    if fmt == 'xlsx':
+        return write_xlsx(dataset, out, queryset)
+    raise ValueError(f'Unknown export format: {fmt}')
@@ -0,0 +1,806 @@
+# grc_dashboard/ingestion.py
+from concurrent.futures import ProcessPoolExecutor, wait
+from datetime import timedelta
+import django
+from django.db import connections, transaction
+from django.utils import timezone
+import ipaddress
+import logging
+import os
+import pandas as pd
+import pickle
+import tempfile
+import time
+import warnings
+from openpyxl import load_workbook
+from xml.etree import ElementTree
+
+from .models import Plugin, ScanDelta, ScanRowError, Vulnerability, VulnerabilityScan
+from .rollups import ACTIVE_STATUSES, refresh_hosts, snapshot_trends
+from .upserts import bulk_upsert
+
+logger = logging.getLogger(__name__)
+
+
+# Expected columns (map to your template)
+COLUMN_MAPPING = {
+    'Plugin': 'plugin_id',
+    'Plugin name': 'plugin_name',
+    'Severity': 'severity',
+    'IP address': 'ip_address',
+    'DNS name': 'dns_name',
+    'synopsis': 'synopsis',
+    'Description': 'description',
+    'Steps to remediate': 'remediation',
+    'CVE': 'cve',
+    'First discovered': 'first_discovered',
+    'Last Observed': 'last_observed',
+    'Plugin Output': 'plugin_output',
+    'Port': 'port',
+    'Exploit?': 'exploit_available',
+    'Key': 'unique_key',
+}
+
+# Fields rewritten when a scan observes an existing finding again
+UPSERT_FIELDS = [
+    'scan', 'plugin', 'ip_address', 'dns_name', 'port', 'severity',
+    'severity_rank', 'cve', 'plugin_output', 'exploit_available',
+    'first_discovered', 'last_observed', 'updated_at',
+]
+
+# Plugin text stored once per plugin in the Plugin catalog
+PLUGIN_FIELDS = ['plugin_name', 'synopsis', 'description', 'remediation']
+
+# Scan export formats accepted for upload
+SCAN_FILE_EXTENSIONS = ('.xlsx', '.xls', '.csv', '.nessus')
+
+# Rows per unique_key lookup and per bulk_create / bulk_update statement
+BATCH_SIZE = 500
+
+# Rows read from a scan export before they are written to the database
+CHUNK_ROWS = 10000
+
+# Rejected rows stored as ScanRowError per scan; the rest are only counted
+MAX_ROW_ERRORS = 100
+
+# A running scan whose worker has not renewed its heartbeat for this long
+# is failed, so it can be uploaded again; workers renew it with every chunk,
+# and every SCAN_HEARTBEAT_SECONDS while they wait on a parser
+SCAN_LEASE = timedelta(minutes=10)
+SCAN_HEARTBEAT_SECONDS = 60
+
+# Leading spreadsheet rows searched for the header, and how many known
+# column names a row needs before it is taken as the header
+HEADER_SCAN_ROWS = 20
+HEADER_MIN_COLUMNS = 3
+
+
+# Scanner severity labels and Nessus risk factors (0-4) -> Vulnerability.severity
+SEVERITY_MAP = {
+    'critical': 'critical',
+    'high': 'high',
+    'medium': 'medium',
+    'low': 'low',
+    'info': 'info',
+    'informational': 'info',
+    'none': 'info',
+    '4': 'critical',
+    '3': 'high',
+    '2': 'medium',
+    '1': 'low',
+    '0': 'info',
+}
+
+EXPLOIT_TRUE_VALUES = ['yes', 'true', '1']
+
+TEXT_FIELDS = [
+    'plugin_id', 'plugin_name', 'ip_address', 'dns_name', 'synopsis',
+    'description', 'remediation', 'cve', 'plugin_output', 'unique_key',
+]
+
+# Identifiers longer than their column reject the row; cutting them could
+# merge two findings or plugins
+LENGTH_CHECKED_FIELDS = [
+    (Plugin, 'plugin_id'), (Vulnerability, 'dns_name'), (Vulnerability, 'unique_key'),
+]
+
+
+def iter_scan_frames(file_path, chunk_rows=CHUNK_ROWS):
+    """Yield a scan export as (DataFrame of strings, fraction of file read).
+
+    CSV files are streamed chunk_rows at a time, so memory stays bounded
+    whatever the size of the export.
+    """
+    if file_path.endswith('.nessus'):
+        yield from iter_nessus_frames(file_path, chunk_rows)
+    elif file_path.endswith('.xlsx'):
+        yield from iter_xlsx_frames(file_path, chunk_rows)
+    elif file_path.endswith('.csv'):
+        size = os.path.getsize(file_path) or 1
+        with open(file_path, 'rb') as fh:
+            with pd.read_csv(fh, dtype=str, chunksize=chunk_rows) as reader:
+                for frame in reader:
+                    yield frame, min(fh.tell() / size, 1.0)
+    else:
+        yield pd.read_excel(file_path, dtype=str), 1.0
+
+
+def _find_header(rows):
+    """Return (row number, header values) for the first row naming known columns"""
+    for number, row in enumerate(rows):
+        header = [str(value).strip() if value is not None else '' for value in row]
+        if sum(name in COLUMN_MAPPING for name in header) >= HEADER_MIN_COLUMNS:
+            return number, header
+        if number + 1 >= HEADER_SCAN_ROWS:
+            break
+    raise ValueError('No header row with the expected scan columns was found.')
+
+
+def iter_xlsx_frames(file_path, chunk_rows=CHUNK_ROWS):
+    """Yield an .xlsx export as (DataFrame of strings, fraction of sheet read).
+
+    Rows are streamed from a read-only worksheet, and only the mapped
+    columns are kept, so the workbook is never built in memory.
+    """
+    workbook = load_workbook(file_path, read_only=True, data_only=True)
+    try:
+        sheet = workbook.active
+        total = sheet.max_row or 0
+        rows = sheet.iter_rows(values_only=True)
+
+        header_row, header = _find_header(rows)
+        positions = [(i, name) for i, name in enumerate(header) if name in COLUMN_MAPPING]
+        columns = [name for i, name in positions]
+
+        batch = []
+        offset = 0
+        for row in rows:
+            batch.append([
+                None if i >= len(row) or row[i] is None else str(row[i])
+                for i, name in positions
+            ])
+            if len(batch) >= chunk_rows:
+                yield _frame(batch, columns, offset), _fraction(header_row + 1 + offset + len(batch), total)
+                offset += len(batch)
+                batch = []
+        if batch:
+            yield _frame(batch, columns, offset), 1.0
+    finally:
+        workbook.close()
+
+
+def _frame(rows, columns, offset):
+    return pd.DataFrame(rows, columns=columns, index=range(offset, offset + len(rows)), dtype=str)
+
+
+def _fraction(rows_read, total):
+    return min(rows_read / total, 1.0) if total else 0.0
+
+
+def _nessus_row(item, host):
+    plugin_id = item.get('pluginID', '')
+    port = item.get('port', '')
+    cve = item.find('cve')
+    return {
+        'Plugin': plugin_id,
+        'Plugin name': item.get('pluginName', ''),
+        'Severity': item.get('severity', ''),
+        'IP address': host['ip'],
+        'DNS name': host['dns'],
+        'synopsis': item.findtext('synopsis', ''),
+        'Description': item.findtext('description', ''),
+        'Steps to remediate': item.findtext('solution', ''),
+        'CVE': cve.text if cve is not None else '',
+        'First discovered': None,
+        'Last Observed': host['end'],
+        'Plugin Output': item.findtext('plugin_output', ''),
+        'Port': port,
+        'Exploit?': item.findtext('exploit_available', ''),
+        # Nessus reports a plugin once per port, so the port is part of the key
+        'Key': f"{host['ip']}-{plugin_id}-{port}",
+    }
+
+
+def iter_nessus_frames(file_path, chunk_rows=CHUNK_ROWS):
+    """Yield a .nessus (v2) export as (DataFrame of strings, fraction of file read).
+
+    The XML is parsed incrementally and every ReportHost is discarded once
+    its items have been emitted, so memory stays flat on multi-GB files.
+    Rows use the spreadsheet column names so they go through the same
+    normalization as CSV and Excel uploads.
+    """
+    size = os.path.getsize(file_path) or 1
+    columns = list(COLUMN_MAPPING)
+    rows = []
+    offset = 0
+    host = None
+    open_elements = []
+
+    with open(file_path, 'rb') as fh:
+        for event, elem in ElementTree.iterparse(fh, events=('start', 'end')):
+            if event == 'start':
+                open_elements.append(elem)
+                if elem.tag == 'ReportHost':
+                    host = {'ip': elem.get('name', ''), 'dns': '', 'end': None}
+                continue
+
+            open_elements.pop()
+
+            if elem.tag == 'tag' and host is not None:
+                name = elem.get('name')
+                if name == 'host-ip':
+                    host['ip'] = elem.text or host['ip']
+                elif name == 'host-fqdn' or (name == 'netbios-name' and not host['dns']):
+                    host['dns'] = elem.text or ''
+                elif name == 'HOST_END':
+                    host['end'] = elem.text
+            elif elem.tag == 'ReportItem':
+                rows.append(_nessus_row(elem, host))
+                elem.clear()
+            elif elem.tag in ('ReportHost', 'Policy'):
+                # Detach finished subtrees so the document never accumulates
+                elem.clear()
+                if open_elements:
+                    open_elements[-1].remove(elem)
+
+            if len(rows) >= chunk_rows:
+                frame = _frame(rows, columns, offset)
+                offset += len(rows)
+                rows = []
+                yield frame, min(fh.tell() / size, 1.0)
+
+        if rows:
+            yield _frame(rows, columns, offset), 1.0
+
+
+def _text(column):
+    return column.fillna('').astype(str).str.strip()
+
+
+def _dates(column):
+    # Exports mix formats and timezones, so parse each distinct value once
+    # and map the results back onto the column. A timestamp's date is the
+    # one it was written in, not its date in UTC
+    values = column.dropna().unique()
+    try:
+        with warnings.catch_warnings():
+            # pandas 2 warns, then returns objects, when offsets differ
+            warnings.simplefilter('ignore', FutureWarning)
+            parsed = pd.to_datetime(pd.Series(values, dtype=object), errors='coerce', format='mixed')
+    except ValueError:
+        # pandas 3 refuses offsets that differ, e.g. across a DST change
+        parsed = None
+    if parsed is not None and pd.api.types.is_datetime64_any_dtype(parsed):
+        dates = parsed.dt.date.astype(object).where(parsed.notna(), None)
+    else:
+        dates = [_date(value) for value in values]
+    lookup = dict(zip(values, dates))
+    return column.map(lookup).astype(object).where(column.notna(), None)
+
+
+def _date(value):
+    try:
+        parsed = pd.to_datetime(value)
+    except (ValueError, TypeError, OverflowError):
+        return None
+    return None if pd.isna(parsed) else parsed.date()
+
+
+def _fit_list(column, limit):
+    # Cut comma or space separated lists longer than limit after the last
+    # whole item that fits; a single over-long item is cut at limit
+    too_long = column.str.len() > limit
+    if not too_long.any():
+        return column
+    cut = column[too_long].str.slice(0, limit + 1).str.replace(r'[\s,;]*[^\s,;]*$', '', regex=True)
+    cut = cut.mask(cut == '', column[too_long].str.slice(0, limit))
+    return column.mask(too_long, cut)
+
+
+def _valid_ip(value):
+    try:
+        ipaddress.ip_address(value)
+    except ValueError:
+        return False
+    return True
+
+
+def normalize_frame(df):
+    """Convert a frame of scan rows into Vulnerability field values.
+
+    Every conversion runs on whole columns. Returns the clean records, ready
+    for VulnerabilityWriter, and a list of (row index, reason) for rows that
+    were rejected.
+    """
+    frame = df.reindex(columns=list(COLUMN_MAPPING)).rename(columns=COLUMN_MAPPING)
+    out = pd.DataFrame(index=frame.index)
+
+    for field in TEXT_FIELDS:
+        out[field] = _text(frame[field])
+
+    # Numeric IDs come back as "10180.0" from spreadsheets with blank cells
+    out['plugin_id'] = out['plugin_id'].str.replace(r'\.0$', '', regex=True)
+
+    severity = _text(frame['severity']).str.lower().str.replace(r'\.0$', '', regex=True)
+    out['severity'] = severity.map(SEVERITY_MAP).fillna('info')
+    out['severity_rank'] = out['severity'].map(Vulnerability.SEVERITY_RANKS)
+
+    port = pd.to_numeric(frame['port'], errors='coerce')
+    port = port.where(port.between(0, 65535) & (port % 1 == 0)).astype('Int64')
+    out['port'] = port.astype(object).where(port.notna(), None)
+
+    out['exploit_available'] = _text(frame['exploit_available']).str.lower().isin(EXPLOIT_TRUE_VALUES)
+    out['first_discovered'] = _dates(frame['first_discovered'])
+    out['last_observed'] = _dates(frame['last_observed'])
+
+    out['ip_address'] = out['ip_address'].mask(out['ip_address'] == '', '0.0.0.0')
+    out['dns_name'] = out['dns_name'].mask(out['dns_name'] == '', out['ip_address'])
+    out['unique_key'] = out['unique_key'].mask(
+        out['unique_key'] == '', out['ip_address'] + '-' + out['plugin_id']
+    )
+
+    # Values longer than their column would fail the whole batch on
+    # PostgreSQL. Plugin names are cut to fit, and CVE lists to the whole
+    # IDs that fit
+    out['plugin_name'] = out['plugin_name'].str.slice(0, Plugin._meta.get_field('plugin_name').max_length)
+    out['cve'] = _fit_list(out['cve'], Vulnerability._meta.get_field('cve').max_length)
+
+    # Validate each distinct address once; a bad inet value would fail the
+    # whole batch on PostgreSQL
+    ip_values = out['ip_address'].unique()
+    ip_ok = out['ip_address'].map(dict(zip(ip_values, map(_valid_ip, ip_values))))
+    blank = (out['plugin_id'] == '') & (_text(frame['ip_address']) == '') & (_text(frame['unique_key']) == '')
+
+    rejected = [(index, 'Blank row') for index in out.index[blank]]
+    rejected += [
+        (index, f"Invalid IP address '{out.at[index, 'ip_address']}'")
+        for index in out.index[~ip_ok & ~blank]
+    ]
+    valid = ip_ok & ~blank
+    for model, name in LENGTH_CHECKED_FIELDS:
+        field = model._meta.get_field(name)
+        too_long = valid & (out[name].str.len() > field.max_length)
+        rejected += [
+            (index, f'{field.verbose_name} is longer than {field.max_length} characters')
+            for index in out.index[too_long]
+        ]
+        valid &= ~too_long
+
+    records = out[valid].to_dict('records')
+    return records, rejected
+
+
+class VulnerabilityWriter:
+    """Upserts normalized finding records in batches keyed on unique_key.
+
+    Each batch costs one SELECT for the existing keys plus one bulk INSERT
+    for new findings and one bulk UPDATE for existing ones, instead of a
+    SELECT and a write per row. Plugin text is upserted into the Plugin
+    catalog the first time a scan mentions each plugin.
+
+    When the scan has a previous scan of the same scope, findings that are
+    new or were not seen by that scan are recorded as ScanDelta rows. The
+    SELECT already returns the scan that last observed each key, so the
+    comparison costs no extra queries. Findings a reconciling scan had
+    resolved are reopened when they are observed again.
+    """
+
+    def __init__(self, scan, batch_size=BATCH_SIZE):
+        self.scan = scan
+        self.batch_size = batch_size
+        self.created = 0
+        self.updated = 0
+        self.skipped = 0
+        self.duplicates = 0
+        self.reappeared = 0
+        self.reopened = 0
+        self.resolved = 0
+        self.hosts = set()
+        self.plugins = set()
+
+    def write(self, records):
+        batch = []
+        for record in records:
+            batch.append(record)
+            if len(batch) >= self.batch_size:
+                self._flush(batch)
+                batch = []
+        if batch:
+            self._flush(batch)
+
+    def _flush(self, records):
+        # A key repeated within a batch is written once; the last row wins,
+        # as it did when each row was saved in turn. The earlier rows add no
+        # finding, so they are counted as duplicates rather than updates
+        by_key = {}
+        for record in records:
+            by_key[record['unique_key']] = record
+        self.duplicates += len(records) - len(by_key)
+
+        # Plugin text goes to the catalog, once per plugin per scan
+        plugins = {}
+        for record in by_key.values():
+            fields = {field: record.pop(field) for field in PLUGIN_FIELDS}
+            if record['plugin_id'] not in self.plugins:
+                plugins[record['plugin_id']] = fields
+        self._upsert_plugins(plugins)
+
+        existing = {}
+        reopened = []
+        for key, pk, last_scan_id, resolved_by_scan_id in (
+            Vulnerability.objects.filter(unique_key__in=list(by_key))
+            .values_list('unique_key', 'id', 'scan_id', 'resolved_by_scan_id')
+        ):
+            existing[key] = (pk, last_scan_id)
+            if resolved_by_scan_id:
+                reopened.append(pk)
+
+        now = timezone.now()
+        to_create = []
+        to_update = []
+        reappeared = []
+        repeated = 0
+        for key, record in by_key.items():
+            vuln = Vulnerability(scan=self.scan, updated_at=now, **record)
+            if key in existing:
+                pk, last_scan_id = existing[key]
+                to_update.append((pk, vuln))
+                if last_scan_id == self.scan.pk:
+                    # Also in an earlier batch of this file
+                    repeated += 1
+                elif last_scan_id != self.scan.previous_scan_id:
+                    reappeared.append(pk)
+            else:
+                to_create.append(vuln)
+            self.hosts.add(record['dns_name'])
+
+        Vulnerability.objects.bulk_create(to_create, batch_size=self.batch_size)
+        self._bulk_update(to_update)
+        if reopened:
+            Vulnerability.objects.filter(pk__in=reopened).update(status='open', resolved_by_scan=None)
+            self.reopened += len(reopened)
+
+        self.created += len(to_create)
+        self.updated += len(to_update) - repeated
+        self.duplicates += repeated
+
+        if self.scan.previous_scan_id:
+            self.reappeared += len(reappeared)
+            self._record_deltas('new', self._created_ids(to_create))
+            self._record_deltas('reappeared', reappeared)
+
+    def _upsert_plugins(self, plugins):
+        if not plugins:
+            return
+        bulk_upsert(
+            Plugin,
+            [Plugin(plugin_id=plugin_id, **fields) for plugin_id, fields in plugins.items()],
+            unique_fields=['plugin_id'],
+            update_fields=PLUGIN_FIELDS + ['updated_at'],
+            batch_size=self.batch_size,
+        )
+        self.plugins.update(plugins)
+
+    def _created_ids(self, vulns):
+        ids = [vuln.pk for vuln in vulns]
+        if None in ids:
+            # Backends that cannot return ids from a bulk INSERT
+            ids = list(
+                Vulnerability.objects.filter(unique_key__in=[vuln.unique_key for vuln in vulns])
+                .values_list('id', flat=True)
+            )
+        return ids
+
+    def _record_deltas(self, change, vulnerability_ids):
+        ScanDelta.objects.bulk_create(
+            [ScanDelta(scan=self.scan, vulnerability_id=pk, change=change) for pk in vulnerability_ids],
+            batch_size=self.batch_size,
+        )
+
+    def record_missing(self):
+        """Record findings the previous scan saw that this scan did not.
+
+        Every finding this scan observed now points at it, so anything still
+        pointing at the previous scan was not observed this time.
+        """
+        if not self.scan.previous_scan_id:
+            return 0
+        missing = (
+            Vulnerability.objects.filter(scan_id=self.scan.previous_scan_id)
+            .values_list('id', flat=True)
+            .iterator(chunk_size=self.batch_size)
+        )
+        count = 0
+        batch = []
+        for pk in missing:
+            batch.append(pk)
+            if len(batch) >= self.batch_size:
+                self._record_deltas('missing', batch)
+                count += len(batch)
+                batch = []
+        self._record_deltas('missing', batch)
+        return count + len(batch)
+
+    def resolve_unobserved(self):
+        """Resolve the scope's open findings that this scan did not observe.
+
+        Every finding this scan observed now points at it, so the open and
+        in-progress findings last observed by another scan of the same scope
+        are the set difference; they are resolved in one UPDATE. Returns the
+        hosts of the resolved findings. Unscoped scans are not reconciled;
+        the blank scope is shared by every unscoped upload.
+        """
+        if not self.scan.scope:
+            return set()
+        unobserved = Vulnerability.objects.filter(
+            scan__in=VulnerabilityScan.objects.filter(scope=self.scan.scope).exclude(pk=self.scan.pk),
+            status__in=ACTIVE_STATUSES,
+        )
+        hosts = set(unobserved.order_by().values_list('dns_name', flat=True).distinct())
+        self.resolved = unobserved.update(
+            status='resolved', resolved_by_scan=self.scan, updated_at=timezone.now()
+        )
+        return hosts
+
+    def _bulk_update(self, pairs):
+        for pk, vuln in pairs:
+            vuln.pk = pk
+        # bulk_update() compiles a CASE WHEN per field per row, which costs
+        # more in Python than the write itself on wide batches, so backends
+        # with ON CONFLICT DO UPDATE get a single upsert statement instead;
+        # elsewhere the known pks spare bulk_upsert() its key lookup
+        bulk_upsert(
+            Vulnerability,
+            [vuln for pk, vuln in pairs],
+            unique_fields=['unique_key'],
+            update_fields=UPSERT_FIELDS,
+            batch_size=self.batch_size,
+        )
+
+
+def reset_peak_memory():
+    """Restart this process's peak RSS from its current RSS.
+
+    Returns False where that is not supported (anything but Linux), in
+    which case peak_memory_kb() would report the peak of the process's
+    whole life, earlier scans included.
+    """
+    try:
+        with open('/proc/self/clear_refs', 'w') as fh:
+            fh.write('5')
+    except OSError:
+        return False
+    return True
+
+
+def peak_memory_kb():
+    """Peak resident set size of this process since reset_peak_memory(), in KB (None if unknown)"""
+    try:
+        with open('/proc/self/status') as fh:
+            for line in fh:
+                if line.startswith('VmHWM:'):
+                    return int(line.split()[1])
+    except OSError:
+        pass
+    return None
+
+
+def normalized_chunks(file_path):
+    """Yield (records, rejected, rows read, fraction of file read, stats) per chunk.
+
+    stats is (parse seconds, normalize seconds, peak memory KB) measured in
+    the process doing the parsing, which may be a pool worker; the peak
+    counts from the start of this file, and is None where it cannot.
+    """
+    measured = reset_peak_memory()
+    frames = iter_scan_frames(file_path)
+    while True:
+        started = time.perf_counter()
+        try:
+            frame, fraction = next(frames)
+        except StopIteration:
+            return
+        parsed = time.perf_counter()
+        records, rejected = normalize_frame(frame)
+        stats = (parsed - started, time.perf_counter() - parsed, peak_memory_kb() if measured else None)
+        yield records, rejected, len(frame), fraction, stats
+
+
+def spool_scan_file(file_path, spool_dir):
+    """Parse and normalize a scan export into a spool file of pickled chunks.
+
+    Runs in a worker process: it touches no database, so parsing can fan
+    out across cores while a single writer drains the spools.
+    """
+    fd, spool_path = tempfile.mkstemp(suffix='.spool', dir=spool_dir)
+    with os.fdopen(fd, 'wb') as spool:
+        for chunk in normalized_chunks(file_path):
+            pickle.dump(chunk, spool, protocol=pickle.HIGHEST_PROTOCOL)
+    return spool_path
+
+
+def _spooled_chunks(future, held):
+    # Parse errors surface here, inside process_scan_file, so the scan is
+    # marked failed like any other processing error
+    while not wait([future], timeout=SCAN_HEARTBEAT_SECONDS).done:
+        renew_leases(held)
+    spool_path = future.result()
+    try:
+        with open(spool_path, 'rb') as spool:
+            while True:
+                try:
+                    yield pickle.load(spool)
+                except EOFError:
+                    return
+    finally:
+        os.remove(spool_path)
+
+
+def process_scan_file(scan, chunks=None, held=None):
+    """Process uploaded scan file and create vulnerability records.
+
+    Each chunk is normalized and committed before the next one is read; the
+    writer carries the host set and counters across chunks. Progress is
+    published on the scan after every chunk for the status endpoint, and
+    the heartbeats of the held scans (default: this one) are renewed.
+    chunks may supply pre-parsed output of normalized_chunks().
+    """
+    held = held or [scan.pk]
+    if chunks is None:
+        chunks = normalized_chunks(scan.file.path)
+    # Worker processes live across scans, so their peak is restarted per scan
+    measured = reset_peak_memory()
+
+    scan.previous_scan = find_previous_scan(scan)
+    scan.deltas.all().delete()
+    scan.row_errors.all().delete()
+    writer = VulnerabilityWriter(scan)
+    rows_processed = 0
+    errors_stored = 0
+    parse_seconds = normalize_seconds = write_seconds = 0.0
+    peak_kb = None
+
+    for records, rejected, rows, fraction, (parsed, normalized, chunk_peak_kb) in chunks:
+        parse_seconds += parsed
+        normalize_seconds += normalized
+        if chunk_peak_kb is not None:
+            peak_kb = max(peak_kb or 0, chunk_peak_kb)
+
+        if rejected:
+            logger.warning("Scan %s: %s rows rejected", scan.pk, len(rejected))
+        writer.skipped += len(rejected)
+        row_errors = [
+            ScanRowError(scan=scan, row_number=index + 1, message=reason[:255])
+            for index, reason in rejected[:MAX_ROW_ERRORS - errors_stored]
+        ]
+        errors_stored += len(row_errors)
+
+        started = time.perf_counter()
+        with transaction.atomic():
+            writer.write(records)
+            ScanRowError.objects.bulk_create(row_errors)
+
+        rows_processed += rows
+        VulnerabilityScan.objects.filter(pk=scan.pk).update(
+            rows_processed=rows_processed, progress=fraction
+        )
+        renew_leases(held)
+        write_seconds += time.perf_counter() - started
+
+    started = time.perf_counter()
+    resolved_hosts = set()
+    with transaction.atomic():
+        missing = writer.record_missing()
+        if scan.reconcile:
+            resolved_hosts = writer.resolve_unobserved()
+    refresh_hosts(writer.hosts | resolved_hosts)
+    snapshot_trends()
+    write_seconds += time.perf_counter() - started
+
+    # Update scan statistics
+    scan.findings_reappeared = writer.reappeared
+    scan.findings_missing = missing
+    scan.findings_resolved = writer.resolved
+    scan.vulnerabilities_found = writer.created + writer.updated
+    scan.vulnerabilities_created = writer.created
+    scan.vulnerabilities_updated = writer.updated
+    scan.rows_skipped = writer.skipped
+    scan.duplicate_rows = writer.duplicates
+    scan.hosts_scanned = len(writer.hosts)
+    scan.rows_processed = rows_processed
+    scan.progress = 1
+    scan.parse_seconds = parse_seconds
+    scan.normalize_seconds = normalize_seconds
+    scan.write_seconds = write_seconds
+    own_peak_kb = peak_memory_kb() if measured else None
+    scan.peak_memory_kb = max(peak_kb or 0, own_peak_kb or 0) or None
+    scan.save()
+
+
+def find_previous_scan(scan):
+    """Return the latest completed scan of the same scope uploaded before this one"""
+    return (
+        VulnerabilityScan.objects.filter(
+            scope=scan.scope, status='done', upload_date__lt=scan.upload_date
+        )
+        .exclude(pk=scan.pk)
+        .order_by('-upload_date')
+        .first()
+    )
+
+
+def claim_next_scan():
+    """Move the oldest queued scan to running and return it, or None.
+
+    The claim is a compare-and-set UPDATE, so several workers can poll the
+    same queue without picking up the same scan.
+    """
+    while True:
+        pk = (
+            VulnerabilityScan.objects.filter(status='queued')
+            .order_by('upload_date')
+            .values_list('pk', flat=True)
+            .first()
+        )
+        if pk is None:
+            return None
+        now = timezone.now()
+        claimed = VulnerabilityScan.objects.filter(pk=pk, status='queued').update(
+            status='running', started_at=now, heartbeat_at=now, error_message=''
+        )
+        if claimed:
+            return VulnerabilityScan.objects.get(pk=pk)
+
+
+def renew_leases(pks):
+    """Renew the heartbeat of the given scans that are still running"""
+    VulnerabilityScan.objects.filter(pk__in=pks, status='running').update(heartbeat_at=timezone.now())
+
+
+def fail_stale_scans():
+    """Fail running scans whose worker stopped renewing their heartbeat; return how many.
+
+    They are failed rather than requeued: the dead worker may have written
+    part of the file, and a second pass would count those rows as
+    duplicates. A failed scan's file can be uploaded again.
+    """
+    now = timezone.now()
+    return VulnerabilityScan.objects.filter(status='running', heartbeat_at__lt=now - SCAN_LEASE).update(
+        status='failed',
+        finished_at=now,
+        error_message='The worker processing this scan stopped. Upload the file again to retry.',
+    )
+
+
+def run_scan_job(scan, chunks=None, held=None):
+    """Process a claimed scan and record whether it finished or failed"""
+    try:
+        process_scan_file(scan, chunks, held)
+    except Exception as e:
+        logger.exception("Scan %s failed", scan.pk)
+        scan.status = 'failed'
+        scan.error_message = str(e)
+    else:
+        scan.status = 'done'
+    scan.finished_at = timezone.now()
+    scan.save(update_fields=['status', 'error_message', 'finished_at'])
+    return scan
+
+
+def run_scan_jobs_parallel(scans, workers):
+    """Parse claimed scans across a process pool and write them one at a time.
+
+    Parsing and normalization run in the pool; database writes stay in this
+    process, in upload order, so writes are serialized and deltas compare
+    against the right previous scan.
+    """
+    # Forked workers must not inherit open database connections
+    connections.close_all()
+    with tempfile.TemporaryDirectory() as spool_dir:
+        with ProcessPoolExecutor(max_workers=workers, initializer=django.setup) as pool:
+            futures = [pool.submit(spool_scan_file, scan.file.path, spool_dir) for scan in scans]
+            for index, (scan, future) in enumerate(zip(scans, futures)):
+                # Scans waiting their turn keep their heartbeat too
+                held = [waiting.pk for waiting in scans[index:]]
+                run_scan_job(scan, _spooled_chunks(future, held), held)
+    return scans
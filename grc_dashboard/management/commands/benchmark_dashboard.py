@@ -0,0 +1,109 @@
+import asyncio
+import statistics
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connections
+from django.test import AsyncClient, Client, override_settings
+from django.urls import reverse
+
+
+class Command(BaseCommand):
+    help = (
+        'Compare p50/p95 latency of a dashboard endpoint served through the WSGI handler '
+        '(a thread per concurrent request) and the ASGI handler (one event loop)'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--path', help='Path to request (default: the dashboard stats endpoint)')
+        parser.add_argument('--requests', type=int, default=200)
+        parser.add_argument('--concurrency', type=int, default=10)
+        parser.add_argument('--user', help='Username to log in as (default: the first superuser)')
+
+    def handle(self, *args, **options):
+        path = options['path'] or reverse('dashboard_stats')
+        total = options['requests']
+        concurrency = options['concurrency']
+        if total < 1 or concurrency < 1:
+            raise CommandError('--requests and --concurrency must be positive')
+
+        # The test clients address every request to 'testserver'
+        with override_settings(ALLOWED_HOSTS=[*settings.ALLOWED_HOSTS, 'testserver']):
+            # Log in once; both clients send the same session cookie
+            login = Client()
+            login.force_login(self._user(options['user']))
+            response = login.get(path)
+            if response.status_code != 200:
+                raise CommandError(f'GET {path} returned {response.status_code}')
+
+            self.stdout.write(f'{total} requests to {path}, {concurrency} at a time')
+            self.stdout.write(f"{'handler':<8} {'req/s':>8} {'p50 ms':>8} {'p95 ms':>8} {'max ms':>8}")
+            for label, run in [('wsgi', self._wsgi), ('asgi', self._asgi)]:
+                started = time.perf_counter()
+                latencies = run(path, total, concurrency, login.cookies)
+                elapsed = time.perf_counter() - started
+                self._report(label, latencies, elapsed)
+
+    def _user(self, username):
+        users = get_user_model().objects.filter(is_active=True)
+        if username:
+            user = users.filter(username=username).first()
+        else:
+            user = users.filter(is_superuser=True).order_by('pk').first() or users.order_by('pk').first()
+        if user is None:
+            raise CommandError('No user to log in as; create one or pass --user')
+        return user
+
+    def _wsgi(self, path, total, concurrency, cookies):
+        def worker(count):
+            client = Client()
+            client.cookies = cookies
+            latencies = []
+            try:
+                for _ in range(count):
+                    started = time.perf_counter()
+                    client.get(path)
+                    latencies.append(time.perf_counter() - started)
+            finally:
+                # Each worker thread opened its own connection
+                connections.close_all()
+            return latencies
+
+        with ThreadPoolExecutor(max_workers=concurrency) as pool:
+            results = pool.map(worker, self._split(total, concurrency))
+            return [latency for latencies in results for latency in latencies]
+
+    def _asgi(self, path, total, concurrency, cookies):
+        async def worker(count):
+            client = AsyncClient()
+            client.cookies = cookies
+            latencies = []
+            for _ in range(count):
+                started = time.perf_counter()
+                await client.get(path)
+                latencies.append(time.perf_counter() - started)
+            return latencies
+
+        async def run():
+            results = await asyncio.gather(*(worker(count) for count in self._split(total, concurrency)))
+            return [latency for latencies in results for latency in latencies]
+
+        return asyncio.run(run())
+
+    def _split(self, total, concurrency):
+        # Requests per worker, spread as evenly as possible
+        workers = min(total, concurrency)
+        return [total // workers + (i < total % workers) for i in range(workers)]
+
+    def _report(self, label, latencies, elapsed):
+        latencies = sorted(latency * 1000 for latency in latencies)
+        if len(latencies) > 1:
+            p50, p95 = [statistics.quantiles(latencies, n=100)[i] for i in (49, 94)]
+        else:
+            p50 = p95 = latencies[0]
+        self.stdout.write(
+            f'{label:<8} {len(latencies) / elapsed:>8.1f} {p50:>8.1f} {p95:>8.1f} {latencies[-1]:>8.1f}'
+        )
@@ -0,0 +1,66 @@
+import time
+import tracemalloc
+
+import pandas as pd
+from django.core.management.base import BaseCommand, CommandError
+
+from grc_dashboard.ingestion import CHUNK_ROWS, iter_scan_frames, normalize_frame
+
+
+class Command(BaseCommand):
+    help = 'Compare parse time and peak memory of the whole-file and streaming scan readers'
+
+    def add_arguments(self, parser):
+        parser.add_argument('file', help='Scan export to parse (.xlsx, .xls, .csv or .nessus)')
+        parser.add_argument('--chunk-rows', type=int, default=CHUNK_ROWS)
+
+    def handle(self, *args, **options):
+        file_path = options['file']
+        chunk_rows = options['chunk_rows']
+
+        if file_path.endswith('.nessus'):
+            readers = [('streaming', lambda: self._stream(file_path, chunk_rows))]
+        else:
+            readers = [
+                ('whole file', lambda: self._whole(file_path)),
+                ('streaming', lambda: self._stream(file_path, chunk_rows)),
+            ]
+
+        self.stdout.write(f"{'reader':<12} {'rows':>10} {'seconds':>9} {'rows/s':>10} {'peak MB':>9}")
+        for label, run in readers:
+            try:
+                # Time a plain run, then repeat under tracemalloc, whose
+                # bookkeeping would otherwise dominate the timing
+                started = time.perf_counter()
+                rows = run()
+                elapsed = time.perf_counter() - started
+
+                tracemalloc.start()
+                try:
+                    run()
+                    peak = tracemalloc.get_traced_memory()[1]
+                finally:
+                    tracemalloc.stop()
+            except (OSError, ValueError) as e:
+                raise CommandError(str(e))
+
+            self.stdout.write(
+                f'{label:<12} {rows:>10} {elapsed:>9.2f} {rows / elapsed if elapsed else 0:>10.0f} '
+                f'{peak / (1024 * 1024):>9.1f}'
+            )
+
+    def _whole(self, file_path):
+        # The reader used before streaming ingestion
+        if file_path.endswith('.csv'):
+            df = pd.read_csv(file_path, dtype=str)
+        else:
+            df = pd.read_excel(file_path, dtype=str)
+        records, rejected = normalize_frame(df)
+        return len(records) + len(rejected)
+
+    def _stream(self, file_path, chunk_rows):
+        rows = 0
+        for frame, fraction in iter_scan_frames(file_path, chunk_rows):
+            records, rejected = normalize_frame(frame)
+            rows += len(records) + len(rejected)
+        return rows
@@ -0,0 +1,29 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from grc_dashboard.exports import DATASETS, EXPORT_FORMATS, write_export
+
+
+class Command(BaseCommand):
+    help = 'Export vulnerabilities, risks, issues or compliance controls as Parquet or xlsx'
+
+    def add_arguments(self, parser):
+        parser.add_argument('dataset', choices=sorted(DATASETS))
+        parser.add_argument('--format', dest='fmt', choices=sorted(EXPORT_FORMATS), default='parquet')
+        parser.add_argument('--output', help='Output path (default: <dataset>.<format>)')
+
+    def handle(self, *args, **options):
+        dataset = options['dataset']
+        fmt = options['fmt']
+        output = options['output'] or f'{dataset}.{fmt}'
+
+        started = time.perf_counter()
+        try:
+            rows = write_export(dataset, fmt, output)
+        except (ImportError, ValueError) as e:
+            raise CommandError(str(e))
+
+        self.stdout.write(self.style.SUCCESS(
+            f'Wrote {rows} {dataset} to {output} in {time.perf_counter() - started:.1f}s'
+        ))
@@ -0,0 +1,66 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from grc_dashboard.ingestion import claim_next_scan, fail_stale_scans, run_scan_job, run_scan_jobs_parallel
+
+
+class Command(BaseCommand):
+    help = 'Process queued vulnerability scan uploads'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--once',
+            action='store_true',
+            help='Drain the current queue and exit instead of polling',
+        )
+        parser.add_argument(
+            '--workers',
+            type=int,
+            default=1,
+            help='Parse up to this many queued scans in parallel worker processes',
+        )
+        parser.add_argument(
+            '--poll-interval',
+            type=float,
+            default=5.0,
+            help='Seconds to wait between polls when the queue is empty',
+        )
+
+    def handle(self, *args, **options):
+        workers = max(options['workers'], 1)
+        while True:
+            # Scans left running by a worker that died
+            stale = fail_stale_scans()
+            if stale:
+                self.stdout.write(self.style.WARNING(f'Failed {stale} scan(s) whose worker stopped'))
+
+            scans = []
+            while len(scans) < workers:
+                scan = claim_next_scan()
+                if scan is None:
+                    break
+                self.stdout.write(f'Processing scan {scan.pk}: {scan.name}')
+                scans.append(scan)
+
+            if not scans:
+                if options['once']:
+                    return
+                time.sleep(options['poll_interval'])
+                continue
+
+            if workers > 1:
+                run_scan_jobs_parallel(scans, workers)
+            else:
+                run_scan_job(scans[0])
+            for scan in scans:
+                self._report(scan)
+
+    def _report(self, scan):
+        if scan.status == 'done':
+            self.stdout.write(self.style.SUCCESS(
+                f'Scan {scan.pk} done: {scan.vulnerabilities_found} vulnerabilities, '
+                f'{scan.hosts_scanned} hosts, {scan.rows_per_second:.0f} rows/s'
+            ))
+        else:
+            self.stdout.write(self.style.ERROR(f'Scan {scan.pk} failed: {scan.error_message}'))
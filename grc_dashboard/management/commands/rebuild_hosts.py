@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand
+
+from grc_dashboard.rollups import rebuild_hosts
+
+
+class Command(BaseCommand):
+    help = 'Rebuild the per-host vulnerability rollup from the findings table'
+
+    def handle(self, *args, **options):
+        count = rebuild_hosts()
+        self.stdout.write(self.style.SUCCESS(f'Rebuilt rollups for {count} hosts'))
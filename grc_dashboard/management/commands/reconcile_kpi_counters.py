@@ -0,0 +1,31 @@
+from django.core.management.base import BaseCommand
+
+from grc_dashboard.counters import rebuild_counters
+from grc_dashboard.metrics import invalidate_dashboard_metrics
+
+
+class Command(BaseCommand):
+    help = 'Rebuild the KPI counter table from the risk, control, audit and issue tables and report drift'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--dry-run',
+            action='store_true',
+            help='Report drift without rewriting the counters',
+        )
+
+    def handle(self, *args, **options):
+        drift = rebuild_counters(dry_run=options['dry_run'])
+        for (model, status, severity, department_id), (stored, actual) in sorted(drift.items()):
+            self.stdout.write(
+                f'{model} status={status} severity={severity or "-"} department={department_id}: '
+                f'stored {stored}, actual {actual}'
+            )
+
+        if not drift:
+            self.stdout.write(self.style.SUCCESS('Counters match the tables'))
+        elif options['dry_run']:
+            self.stdout.write(self.style.WARNING(f'{len(drift)} counters have drifted'))
+        else:
+            invalidate_dashboard_metrics()
+            self.stdout.write(self.style.SUCCESS(f'Rebuilt counters; corrected {len(drift)}'))
@@ -0,0 +1,12 @@
+from django.core.management.base import BaseCommand
+
+from grc_dashboard.rollups import snapshot_trends
+
+
+class Command(BaseCommand):
+    help = "Record today's vulnerability counts per severity and status; run nightly"
+
+    def handle(self, *args, **options):
+        snapshots = snapshot_trends()
+        total = sum(snapshot.count for snapshot in snapshots)
+        self.stdout.write(self.style.SUCCESS(f'Recorded {total} findings for {snapshots[0].date}'))
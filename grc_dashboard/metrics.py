@@ -0,0 +1,215 @@
+# grc_dashboard/metrics.py
+import asyncio
+
+from asgiref.sync import sync_to_async
+from django.core.cache import caches
+from django.db import close_old_connections, connection, transaction
+from django.utils import timezone
+
+from .counters import KpiTotals
+from .models import Audit, ComplianceControl, Host, Issue, Risk, Vulnerability
+from .stats import AuditStats, IssueStats, VulnerabilityStats
+
+
+# Cache alias configured in settings.CACHES
+DASHBOARD_CACHE = 'dashboard'
+
+# The bundle is dropped by the signal receivers in signals.py whenever one
+# of these models changes; the timeout only bounds how stale it can get if
+# a change bypasses signals (QuerySet.update(), raw SQL)
+DASHBOARD_CACHE_TIMEOUT = 60 * 60
+
+HITS_KEY = 'dashboard:hits'
+MISSES_KEY = 'dashboard:misses'
+INVALIDATIONS_KEY = 'dashboard:invalidations'
+
+
+def _metrics_key():
+    # Upcoming audits and overdue issues are relative to today, so each day
+    # gets its own entry
+    return f'dashboard:metrics:{timezone.localdate().isoformat()}'
+
+
+def _increment(cache, key):
+    try:
+        cache.incr(key)
+    except ValueError:
+        # First increment since the counter expired or the cache was cleared
+        cache.add(key, 0, timeout=None)
+        cache.incr(key)
+
+
+async def _aincrement(cache, key):
+    try:
+        await cache.aincr(key)
+    except ValueError:
+        await cache.aadd(key, 0, timeout=None)
+        await cache.aincr(key)
+
+
+def risk_metrics(kpis):
+    return {
+        'total_risks': kpis.total(Risk),
+        'critical_risks': kpis.total(Risk, status=['open', 'in_progress'], severity='critical'),
+        'open_risks': kpis.total(Risk, status='open'),
+        'risks_by_severity': kpis.breakdown(Risk, 'severity'),
+        'recent_risks': list(Risk.objects.select_related('department', 'owner').order_by('-created_at')[:5]),
+    }
+
+
+def compliance_metrics(kpis):
+    total_controls = kpis.total(ComplianceControl)
+    compliant_controls = kpis.total(ComplianceControl, status='compliant')
+    compliance_rate = (compliant_controls / total_controls * 100) if total_controls > 0 else 0
+    return {
+        'total_controls': total_controls,
+        'compliance_rate': round(compliance_rate, 1),
+        'non_compliant_controls': kpis.total(ComplianceControl, status='non_compliant'),
+        'compliance_by_status': kpis.breakdown(ComplianceControl, 'status'),
+    }
+
+
+def audit_metrics(kpis):
+    return {
+        'total_audits': kpis.total(Audit),
+        'upcoming_audits': AuditStats.for_queryset(Audit.objects.all()).upcoming,
+        'in_progress_audits': kpis.total(Audit, status='in_progress'),
+        'recent_audits': list(Audit.objects.select_related('department', 'auditor').order_by('-created_at')[:5]),
+    }
+
+
+def issue_metrics(kpis):
+    return {
+        'total_issues': kpis.total(Issue),
+        'open_issues': kpis.total(Issue, status=['open', 'in_progress']),
+        'overdue_issues': IssueStats.for_queryset(Issue.objects.all()).overdue,
+        'recent_issues': list(Issue.objects.select_related('department', 'assigned_to').order_by('-created_at')[:5]),
+    }
+
+
+def vulnerability_metrics(kpis):
+    stats = VulnerabilityStats.for_queryset(Vulnerability.objects.all())
+    return {
+        'total_vulnerabilities': stats.total,
+        'critical_vulnerabilities': stats.critical,
+        'high_vulnerabilities': stats.high,
+        'affected_hosts': Host.objects.count(),
+    }
+
+
+# The modules making up the dashboard bundle. Each runs its own queries
+# against the tables, so the async path can run them concurrently
+DASHBOARD_MODULES = [risk_metrics, compliance_metrics, audit_metrics, issue_metrics]
+
+# Modules reported by the stats endpoint; the dashboard page has no
+# vulnerability section
+STATS_MODULES = DASHBOARD_MODULES + [vulnerability_metrics]
+
+# Database vendors whose connections can serve one request's module queries
+# from several threads at once. Elsewhere (SQLite allows one writer and
+# Django shares one connection per thread) the modules run one after another
+CONCURRENT_VENDORS = {'postgresql'}
+
+
+def compute_dashboard_metrics(modules=DASHBOARD_MODULES):
+    """Compute the dashboard's metrics bundle.
+
+    Counts by status, severity and model come from the KpiCounter table in
+    one query; only the date-relative stat cards and recent lists hit the
+    tables themselves. Querysets are evaluated so the bundle can be pickled
+    into the cache.
+    """
+    kpis = KpiTotals()
+    metrics = {}
+    for module in modules:
+        metrics.update(module(kpis))
+    return metrics
+
+
+def _in_worker_thread(module, kpis):
+    # Worker threads keep their own connections, which the request cycle
+    # never closes; close them here once CONN_MAX_AGE has passed
+    close_old_connections()
+    try:
+        return module(kpis)
+    finally:
+        close_old_connections()
+
+
+async def acompute_dashboard_metrics(modules=DASHBOARD_MODULES):
+    """compute_dashboard_metrics() for async views, running the modules concurrently where the database allows"""
+    kpis = await sync_to_async(KpiTotals)()
+    # Threads other than the request's cannot see an open transaction (as
+    # in tests), so the modules share its connection instead
+    if connection.vendor in CONCURRENT_VENDORS and not connection.in_atomic_block:
+        parts = await asyncio.gather(*(
+            sync_to_async(_in_worker_thread, thread_sensitive=False)(module, kpis) for module in modules
+        ))
+    else:
+        parts = [await sync_to_async(module)(kpis) for module in modules]
+
+    metrics = {}
+    for part in parts:
+        metrics.update(part)
+    return metrics
+
+
+def get_dashboard_metrics():
+    """Return the dashboard metrics bundle, from the cache when it is current"""
+    cache = caches[DASHBOARD_CACHE]
+    key = _metrics_key()
+    metrics = cache.get(key)
+    if metrics is not None:
+        _increment(cache, HITS_KEY)
+        return metrics
+
+    _increment(cache, MISSES_KEY)
+    metrics = compute_dashboard_metrics()
+    cache.set(key, metrics, DASHBOARD_CACHE_TIMEOUT)
+    return metrics
+
+
+async def aget_dashboard_metrics():
+    """get_dashboard_metrics() for async views"""
+    cache = caches[DASHBOARD_CACHE]
+    key = _metrics_key()
+    metrics = await cache.aget(key)
+    if metrics is not None:
+        await _aincrement(cache, HITS_KEY)
+        return metrics
+
+    await _aincrement(cache, MISSES_KEY)
+    metrics = await acompute_dashboard_metrics()
+    await cache.aset(key, metrics, DASHBOARD_CACHE_TIMEOUT)
+    return metrics
+
+
+def invalidate_dashboard_metrics():
+    """Drop the cached bundle so the next dashboard load recomputes it.
+
+    Inside a transaction the bundle is dropped when it commits. Dropping it
+    earlier would let a concurrent load cache the pre-commit state until
+    the timeout.
+    """
+    transaction.on_commit(_drop_dashboard_metrics)
+
+
+def _drop_dashboard_metrics():
+    cache = caches[DASHBOARD_CACHE]
+    cache.delete(_metrics_key())
+    _increment(cache, INVALIDATIONS_KEY)
+
+
+def cache_stats():
+    """Hit, miss and invalidation counts for the dashboard cache"""
+    cache = caches[DASHBOARD_CACHE]
+    counts = cache.get_many([HITS_KEY, MISSES_KEY, INVALIDATIONS_KEY])
+    hits = counts.get(HITS_KEY, 0)
+    misses = counts.get(MISSES_KEY, 0)
+    return {
+        'backend': f'{type(cache).__module__}.{type(cache).__name__}',
+        'hits': hits,
+        'misses': misses,
+        'invalidations': counts.get(INVALIDATIONS_KEY, 0),
+        'hit_rate': round(hits / (hits + misses), 3) if hits + misses else None,
+    }
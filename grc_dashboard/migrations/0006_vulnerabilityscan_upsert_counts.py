@@ -0,0 +1,28 @@
+# Generated by Django 4.2.30 on 2026-10-17 12:10
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('grc_dashboard', '0005_vulnerability_alter_artifact_category_and_more'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='vulnerabilityscan',
+            name='rows_skipped',
+            field=models.IntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='vulnerabilityscan',
+            name='vulnerabilities_created',
+            field=models.IntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='vulnerabilityscan',
+            name='vulnerabilities_updated',
+            field=models.IntegerField(default=0),
+        ),
+    ]
@@ -0,0 +1,53 @@
+# Generated by Django 4.2.30 on 2026-10-17 12:15
+
+from django.db import migrations, models
+
+
+def processed_to_status(apps, schema_editor):
+    VulnerabilityScan = apps.get_model('grc_dashboard', 'VulnerabilityScan')
+    VulnerabilityScan.objects.filter(processed=True).update(status='done', progress=1)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('grc_dashboard', '0006_vulnerabilityscan_upsert_counts'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='vulnerabilityscan',
+            name='error_message',
+            field=models.TextField(blank=True),
+        ),
+        migrations.AddField(
+            model_name='vulnerabilityscan',
+            name='finished_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='vulnerabilityscan',
+            name='progress',
+            field=models.FloatField(default=0, help_text='Fraction of the file read (0-1)'),
+        ),
+        migrations.AddField(
+            model_name='vulnerabilityscan',
+            name='rows_processed',
+            field=models.IntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='vulnerabilityscan',
+            name='started_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='vulnerabilityscan',
+            name='status',
+            field=models.CharField(choices=[('queued', 'Queued'), ('running', 'Running'), ('done', 'Done'), ('failed', 'Failed')], db_index=True, default='queued', max_length=20),
+        ),
+        migrations.RunPython(processed_to_status, migrations.RunPython.noop),
+        migrations.RemoveField(
+            model_name='vulnerabilityscan',
+            name='processed',
+        ),
+    ]
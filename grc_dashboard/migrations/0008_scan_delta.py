@@ -0,0 +1,47 @@
+# Generated by Django 4.2.30 on 2026-10-17 12:24
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('grc_dashboard', '0007_vulnerabilityscan_job_status'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='vulnerabilityscan',
+            name='findings_missing',
+            field=models.IntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='vulnerabilityscan',
+            name='findings_reappeared',
+            field=models.IntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='vulnerabilityscan',
+            name='previous_scan',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='grc_dashboard.vulnerabilityscan'),
+        ),
+        migrations.AddField(
+            model_name='vulnerabilityscan',
+            name='scope',
+            field=models.CharField(blank=True, db_index=True, help_text='Network segment or asset group the scan covers', max_length=100),
+        ),
+        migrations.CreateModel(
+            name='ScanDelta',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('change', models.CharField(choices=[('new', 'New'), ('reappeared', 'Reappeared'), ('missing', 'No Longer Observed')], max_length=20)),
+                ('scan', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='deltas', to='grc_dashboard.vulnerabilityscan')),
+                ('vulnerability', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='scan_deltas', to='grc_dashboard.vulnerability')),
+            ],
+            options={
+                'ordering': ['id'],
+                'indexes': [models.Index(fields=['scan', 'change', 'id'], name='grc_dashboa_scan_id_cb1112_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 4.2.30 on 2026-10-17 12:25
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('grc_dashboard', '0008_scan_delta'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='vulnerabilityscan',
+            name='file_sha256',
+            field=models.CharField(blank=True, db_index=True, max_length=64, verbose_name='File SHA-256'),
+        ),
+    ]
@@ -0,0 +1,46 @@
+# Generated by Django 4.2.30 on 2026-10-17 12:30
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('grc_dashboard', '0009_vulnerabilityscan_file_sha256'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='vulnerabilityscan',
+            name='normalize_seconds',
+            field=models.FloatField(default=0),
+        ),
+        migrations.AddField(
+            model_name='vulnerabilityscan',
+            name='parse_seconds',
+            field=models.FloatField(default=0),
+        ),
+        migrations.AddField(
+            model_name='vulnerabilityscan',
+            name='peak_memory_kb',
+            field=models.IntegerField(blank=True, null=True, verbose_name='Peak memory (KB)'),
+        ),
+        migrations.AddField(
+            model_name='vulnerabilityscan',
+            name='write_seconds',
+            field=models.FloatField(default=0),
+        ),
+        migrations.CreateModel(
+            name='ScanRowError',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('row_number', models.IntegerField(help_text='1-based data row in the file, header excluded')),
+                ('message', models.CharField(max_length=255)),
+                ('scan', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='row_errors', to='grc_dashboard.vulnerabilityscan')),
+            ],
+            options={
+                'ordering': ['scan', 'row_number'],
+            },
+        ),
+    ]
@@ -0,0 +1,42 @@
+# Generated by Django 4.2.30 on 2026-10-17 12:31
+
+from django.db import migrations, models
+
+
+SEVERITY_RANKS = {
+    'critical': 4,
+    'high': 3,
+    'medium': 2,
+    'low': 1,
+    'info': 0,
+}
+
+
+def backfill_severity_rank(apps, schema_editor):
+    Vulnerability = apps.get_model('grc_dashboard', 'Vulnerability')
+    for severity, rank in SEVERITY_RANKS.items():
+        Vulnerability.objects.filter(severity=severity).update(severity_rank=rank)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('grc_dashboard', '0010_scan_telemetry'),
+    ]
+
+    operations = [
+        migrations.AlterModelOptions(
+            name='vulnerability',
+            options={'ordering': ['-severity_rank', '-last_observed', '-id']},
+        ),
+        migrations.AddField(
+            model_name='vulnerability',
+            name='severity_rank',
+            field=models.PositiveSmallIntegerField(default=0, editable=False),
+        ),
+        migrations.RunPython(backfill_severity_rank, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='vulnerability',
+            index=models.Index(fields=['-severity_rank', '-last_observed', '-id'], name='vuln_list_order_idx'),
+        ),
+    ]
@@ -0,0 +1,96 @@
+# Generated by Django 4.2.30 on 2026-10-17 12:33
+
+from django.db import migrations, OperationalError
+
+
+SQLITE_FORWARD = [
+    """
+    CREATE VIRTUAL TABLE grc_dashboard_vulnerability_fts USING fts5(
+        cve, dns_name, ip_address, plugin_name, synopsis,
+        content='grc_dashboard_vulnerability', content_rowid='id'
+    )
+    """,
+    """
+    CREATE TRIGGER grc_dashboard_vulnerability_fts_ai AFTER INSERT ON grc_dashboard_vulnerability BEGIN
+        INSERT INTO grc_dashboard_vulnerability_fts (rowid, cve, dns_name, ip_address, plugin_name, synopsis)
+        VALUES (new.id, new.cve, new.dns_name, new.ip_address, new.plugin_name, new.synopsis);
+    END
+    """,
+    """
+    CREATE TRIGGER grc_dashboard_vulnerability_fts_ad AFTER DELETE ON grc_dashboard_vulnerability BEGIN
+        INSERT INTO grc_dashboard_vulnerability_fts (grc_dashboard_vulnerability_fts, rowid, cve, dns_name, ip_address, plugin_name, synopsis)
+        VALUES ('delete', old.id, old.cve, old.dns_name, old.ip_address, old.plugin_name, old.synopsis);
+    END
+    """,
+    # Status and other untracked columns change without touching the index
+    """
+    CREATE TRIGGER grc_dashboard_vulnerability_fts_au
+    AFTER UPDATE OF cve, dns_name, ip_address, plugin_name, synopsis ON grc_dashboard_vulnerability BEGIN
+        INSERT INTO grc_dashboard_vulnerability_fts (grc_dashboard_vulnerability_fts, rowid, cve, dns_name, ip_address, plugin_name, synopsis)
+        VALUES ('delete', old.id, old.cve, old.dns_name, old.ip_address, old.plugin_name, old.synopsis);
+        INSERT INTO grc_dashboard_vulnerability_fts (rowid, cve, dns_name, ip_address, plugin_name, synopsis)
+        VALUES (new.id, new.cve, new.dns_name, new.ip_address, new.plugin_name, new.synopsis);
+    END
+    """,
+    "INSERT INTO grc_dashboard_vulnerability_fts (grc_dashboard_vulnerability_fts) VALUES ('rebuild')",
+]
+
+SQLITE_REVERSE = [
+    'DROP TRIGGER IF EXISTS grc_dashboard_vulnerability_fts_ai',
+    'DROP TRIGGER IF EXISTS grc_dashboard_vulnerability_fts_ad',
+    'DROP TRIGGER IF EXISTS grc_dashboard_vulnerability_fts_au',
+    'DROP TABLE IF EXISTS grc_dashboard_vulnerability_fts',
+]
+
+POSTGRESQL_FORWARD = [
+    """
+    ALTER TABLE grc_dashboard_vulnerability ADD COLUMN search_vector tsvector
+    GENERATED ALWAYS AS (to_tsvector('simple',
+        coalesce(cve, '') || ' ' || coalesce(dns_name, '') || ' ' || coalesce(host(ip_address), '') || ' ' ||
+        coalesce(plugin_name, '') || ' ' || coalesce(synopsis, '')
+    )) STORED
+    """,
+    'CREATE INDEX grc_dashboard_vulnerability_search_idx ON grc_dashboard_vulnerability USING GIN (search_vector)',
+]
+
+POSTGRESQL_REVERSE = [
+    'DROP INDEX IF EXISTS grc_dashboard_vulnerability_search_idx',
+    'ALTER TABLE grc_dashboard_vulnerability DROP COLUMN IF EXISTS search_vector',
+]
+
+
+def _run(schema_editor, statements):
+    for statement in statements:
+        schema_editor.execute(statement)
+
+
+def create_search_index(apps, schema_editor):
+    vendor = schema_editor.connection.vendor
+    if vendor == 'sqlite':
+        try:
+            _run(schema_editor, SQLITE_FORWARD[:1])
+        except OperationalError:
+            # SQLite built without FTS5; search falls back to icontains
+            return
+        _run(schema_editor, SQLITE_FORWARD[1:])
+    elif vendor == 'postgresql':
+        _run(schema_editor, POSTGRESQL_FORWARD)
+
+
+def drop_search_index(apps, schema_editor):
+    vendor = schema_editor.connection.vendor
+    if vendor == 'sqlite':
+        _run(schema_editor, SQLITE_REVERSE)
+    elif vendor == 'postgresql':
+        _run(schema_editor, POSTGRESQL_REVERSE)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('grc_dashboard', '0011_vulnerability_severity_rank'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_search_index, drop_search_index),
+    ]
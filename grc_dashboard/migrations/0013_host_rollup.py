@@ -0,0 +1,64 @@
+# Generated by Django 4.2.30 on 2026-10-17 12:34
+
+from django.db import migrations, models
+from django.db.models import Count, Max, Q
+
+
+def build_hosts(apps, schema_editor):
+    Host = apps.get_model('grc_dashboard', 'Host')
+    Vulnerability = apps.get_model('grc_dashboard', 'Vulnerability')
+    active = Q(status__in=['open', 'in_progress'])
+    rows = (
+        Vulnerability.objects.order_by()
+        .values('dns_name')
+        .annotate(
+            ip_address=Max('ip_address'),
+            total_count=Count('id'),
+            max_severity_rank=Max('severity_rank', filter=active),
+            last_observed=Max('last_observed'),
+            **{
+                f'{severity}_count': Count('id', filter=active & Q(severity=severity))
+                for severity in ['critical', 'high', 'medium', 'low', 'info']
+            },
+            **{
+                f'{status}_count': Count('id', filter=Q(status=status))
+                for status in ['open', 'in_progress', 'resolved', 'false_positive']
+            },
+        )
+    )
+    Host.objects.bulk_create((Host(**row) for row in rows.iterator()), batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('grc_dashboard', '0012_vulnerability_search_index'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Host',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('dns_name', models.CharField(max_length=255, unique=True, verbose_name='DNS Name')),
+                ('ip_address', models.GenericIPAddressField(blank=True, null=True, verbose_name='IP Address')),
+                ('critical_count', models.IntegerField(default=0)),
+                ('high_count', models.IntegerField(default=0)),
+                ('medium_count', models.IntegerField(default=0)),
+                ('low_count', models.IntegerField(default=0)),
+                ('info_count', models.IntegerField(default=0)),
+                ('open_count', models.IntegerField(default=0)),
+                ('in_progress_count', models.IntegerField(default=0)),
+                ('resolved_count', models.IntegerField(default=0)),
+                ('false_positive_count', models.IntegerField(default=0)),
+                ('total_count', models.IntegerField(default=0)),
+                ('max_severity_rank', models.PositiveSmallIntegerField(blank=True, help_text='Highest Vulnerability.severity_rank among open and in-progress findings', null=True)),
+                ('last_observed', models.DateField(blank=True, null=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'ordering': ['-max_severity_rank', '-critical_count', '-high_count', 'dns_name'],
+            },
+        ),
+        migrations.RunPython(build_hosts, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,194 @@
+# Generated by Django 4.2.30 on 2026-10-17 12:44
+
+from django.db import migrations, models, OperationalError
+import django.db.models.deletion
+
+
+# The search index covered plugin_name and synopsis on the vulnerability
+# table; it is dropped before those columns move and rebuilt as one index
+# on findings (cve, dns_name, ip_address) and one on plugins
+
+SQLITE_DROP_SEARCH = [
+    'DROP TRIGGER IF EXISTS grc_dashboard_vulnerability_fts_ai',
+    'DROP TRIGGER IF EXISTS grc_dashboard_vulnerability_fts_ad',
+    'DROP TRIGGER IF EXISTS grc_dashboard_vulnerability_fts_au',
+    'DROP TABLE IF EXISTS grc_dashboard_vulnerability_fts',
+]
+
+POSTGRESQL_DROP_SEARCH = [
+    'DROP INDEX IF EXISTS grc_dashboard_vulnerability_search_idx',
+    'ALTER TABLE grc_dashboard_vulnerability DROP COLUMN IF EXISTS search_vector',
+]
+
+
+def _sqlite_fts(table, columns):
+    fts = f'{table}_fts'
+    names = ', '.join(columns)
+    new_values = ', '.join(f'new.{column}' for column in columns)
+    old_values = ', '.join(f'old.{column}' for column in columns)
+    return [
+        f"CREATE VIRTUAL TABLE {fts} USING fts5({names}, content='{table}', content_rowid='id')",
+        f"""
+        CREATE TRIGGER {fts}_ai AFTER INSERT ON {table} BEGIN
+            INSERT INTO {fts} (rowid, {names}) VALUES (new.id, {new_values});
+        END
+        """,
+        f"""
+        CREATE TRIGGER {fts}_ad AFTER DELETE ON {table} BEGIN
+            INSERT INTO {fts} ({fts}, rowid, {names}) VALUES ('delete', old.id, {old_values});
+        END
+        """,
+        # Upserts rewrite unchanged text, so only real changes reindex
+        f"""
+        CREATE TRIGGER {fts}_au AFTER UPDATE OF {names} ON {table}
+        WHEN {' OR '.join(f'old.{column} IS NOT new.{column}' for column in columns)} BEGIN
+            INSERT INTO {fts} ({fts}, rowid, {names}) VALUES ('delete', old.id, {old_values});
+            INSERT INTO {fts} (rowid, {names}) VALUES (new.id, {new_values});
+        END
+        """,
+        f"INSERT INTO {fts} ({fts}) VALUES ('rebuild')",
+    ]
+
+
+SQLITE_CREATE_SEARCH = (
+    _sqlite_fts('grc_dashboard_vulnerability', ['cve', 'dns_name', 'ip_address'])
+    + _sqlite_fts('grc_dashboard_plugin', ['plugin_name', 'synopsis'])
+)
+
+POSTGRESQL_CREATE_SEARCH = [
+    """
+    ALTER TABLE grc_dashboard_vulnerability ADD COLUMN search_vector tsvector
+    GENERATED ALWAYS AS (to_tsvector('simple',
+        coalesce(cve, '') || ' ' || coalesce(dns_name, '') || ' ' || coalesce(host(ip_address), '')
+    )) STORED
+    """,
+    'CREATE INDEX grc_dashboard_vulnerability_search_idx ON grc_dashboard_vulnerability USING GIN (search_vector)',
+    """
+    ALTER TABLE grc_dashboard_plugin ADD COLUMN search_vector tsvector
+    GENERATED ALWAYS AS (to_tsvector('simple',
+        coalesce(plugin_name, '') || ' ' || coalesce(synopsis, '')
+    )) STORED
+    """,
+    'CREATE INDEX grc_dashboard_plugin_search_idx ON grc_dashboard_plugin USING GIN (search_vector)',
+]
+
+
+def _run(schema_editor, statements):
+    for statement in statements:
+        schema_editor.execute(statement)
+
+
+def drop_search_index(apps, schema_editor):
+    vendor = schema_editor.connection.vendor
+    if vendor == 'sqlite':
+        _run(schema_editor, SQLITE_DROP_SEARCH)
+    elif vendor == 'postgresql':
+        _run(schema_editor, POSTGRESQL_DROP_SEARCH)
+
+
+def create_search_index(apps, schema_editor):
+    vendor = schema_editor.connection.vendor
+    if vendor == 'sqlite':
+        try:
+            _run(schema_editor, SQLITE_CREATE_SEARCH[:1])
+        except OperationalError:
+            # SQLite built without FTS5; search falls back to icontains
+            return
+        _run(schema_editor, SQLITE_CREATE_SEARCH[1:])
+    elif vendor == 'postgresql':
+        _run(schema_editor, POSTGRESQL_CREATE_SEARCH)
+
+
+def populate_plugins(apps, schema_editor):
+    Plugin = apps.get_model('grc_dashboard', 'Plugin')
+    Vulnerability = apps.get_model('grc_dashboard', 'Vulnerability')
+
+    # Each plugin takes its text from the most recently updated finding
+    latest_ids = (
+        Vulnerability.objects.order_by()
+        .values('plugin_id')
+        .annotate(latest_id=models.Max('id'))
+        .values_list('latest_id', flat=True)
+    )
+    rows = (
+        Vulnerability.objects.filter(id__in=latest_ids)
+        .values_list('plugin_id', 'plugin_name', 'synopsis', 'description', 'remediation')
+        .iterator(chunk_size=500)
+    )
+    Plugin.objects.bulk_create(
+        (
+            Plugin(
+                plugin_id=plugin_id,
+                plugin_name=plugin_name,
+                synopsis=synopsis,
+                description=description,
+                remediation=remediation,
+            )
+            for plugin_id, plugin_name, synopsis, description, remediation in rows
+        ),
+        batch_size=500,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('grc_dashboard', '0013_host_rollup'),
+    ]
+
+    # Irreversible: the plugin text leaves the vulnerability table, and the
+    # RunPython steps have no reverse, so Django refuses to unapply this
+    # migration instead of failing halfway through
+    operations = [
+        migrations.RunPython(drop_search_index),
+        migrations.CreateModel(
+            name='Plugin',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('plugin_id', models.CharField(max_length=50, unique=True, verbose_name='Plugin ID')),
+                ('plugin_name', models.CharField(max_length=255, verbose_name='Plugin Name')),
+                ('synopsis', models.TextField(blank=True, verbose_name='Synopsis')),
+                ('description', models.TextField(blank=True, verbose_name='Description')),
+                ('remediation', models.TextField(blank=True, verbose_name='Steps to Remediate')),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'ordering': ['plugin_id'],
+            },
+        ),
+        migrations.RunPython(populate_plugins),
+        migrations.RemoveField(
+            model_name='vulnerability',
+            name='plugin_name',
+        ),
+        migrations.RemoveField(
+            model_name='vulnerability',
+            name='synopsis',
+        ),
+        migrations.RemoveField(
+            model_name='vulnerability',
+            name='description',
+        ),
+        migrations.RemoveField(
+            model_name='vulnerability',
+            name='remediation',
+        ),
+        # Keep the plugin_id column while the field becomes a foreign key
+        # to Plugin.plugin_id
+        migrations.AlterField(
+            model_name='vulnerability',
+            name='plugin_id',
+            field=models.CharField(db_column='plugin_id', max_length=50, verbose_name='Plugin ID'),
+        ),
+        migrations.RenameField(
+            model_name='vulnerability',
+            old_name='plugin_id',
+            new_name='plugin',
+        ),
+        migrations.AlterField(
+            model_name='vulnerability',
+            name='plugin',
+            field=models.ForeignKey(db_column='plugin_id', on_delete=django.db.models.deletion.PROTECT, related_name='vulnerabilities', to='grc_dashboard.plugin', to_field='plugin_id'),
+        ),
+        migrations.RunPython(create_search_index),
+    ]
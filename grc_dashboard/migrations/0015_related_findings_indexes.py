@@ -0,0 +1,25 @@
+# Generated by Django 4.2.30 on 2026-10-17 12:45
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('grc_dashboard', '0014_plugin_catalog'),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name='vulnerability',
+            name='grc_dashboa_cve_1f812c_idx',
+        ),
+        migrations.AddIndex(
+            model_name='vulnerability',
+            index=models.Index(fields=['cve', 'dns_name', 'status'], name='vuln_cve_host_status_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='vulnerability',
+            index=models.Index(fields=['plugin', 'dns_name', 'status'], name='vuln_plugin_host_status_idx'),
+        ),
+    ]
@@ -0,0 +1,31 @@
+# Generated by Django 4.2.30 on 2026-10-17 12:46
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+        ('grc_dashboard', '0015_related_findings_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='VulnerabilityStatusChange',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('status', models.CharField(choices=[('open', 'Open'), ('in_progress', 'In Progress'), ('resolved', 'Resolved'), ('false_positive', 'False Positive')], max_length=20)),
+                ('criteria', models.JSONField(default=dict)),
+                ('findings_updated', models.PositiveIntegerField(default=0)),
+                ('hosts_affected', models.PositiveIntegerField(default=0)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('user', models.ForeignKey(null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='vulnerability_status_changes', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'ordering': ['-created_at'],
+            },
+        ),
+    ]
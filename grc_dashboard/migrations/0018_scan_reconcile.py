@@ -0,0 +1,29 @@
+# Generated by Django 4.2.30 on 2026-10-17 12:48
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('grc_dashboard', '0017_vulnerability_trend_snapshot'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='vulnerability',
+            name='resolved_by_scan',
+            field=models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='resolved_vulnerabilities', to='grc_dashboard.vulnerabilityscan'),
+        ),
+        migrations.AddField(
+            model_name='vulnerabilityscan',
+            name='findings_resolved',
+            field=models.IntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='vulnerabilityscan',
+            name='reconcile',
+            field=models.BooleanField(default=False, help_text='Resolve open findings in this scope that the scan no longer observes'),
+        ),
+    ]
@@ -0,0 +1,56 @@
+# Generated by Django 4.2.30 on 2026-10-17 12:51
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+# Model name -> field tallied as severity, as in counters.COUNTED_MODELS
+COUNTED_MODELS = {
+    'risk': 'severity',
+    'issue': 'priority',
+    'compliancecontrol': None,
+    'audit': None,
+}
+
+
+def populate_counters(apps, schema_editor):
+    KpiCounter = apps.get_model('grc_dashboard', 'KpiCounter')
+    counters = []
+    for model_name, severity in COUNTED_MODELS.items():
+        model = apps.get_model('grc_dashboard', model_name)
+        fields = ['status', 'department_id'] + ([severity] if severity else [])
+        for row in model.objects.order_by().values(*fields).annotate(count=models.Count('pk')):
+            counters.append(KpiCounter(
+                model=model_name,
+                status=row['status'],
+                severity=row[severity] if severity else '',
+                department_id=row['department_id'],
+                count=row['count'],
+            ))
+    KpiCounter.objects.bulk_create(counters)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('grc_dashboard', '0018_scan_reconcile'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='KpiCounter',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('model', models.CharField(max_length=50)),
+                ('status', models.CharField(max_length=20)),
+                ('severity', models.CharField(blank=True, max_length=20)),
+                ('count', models.IntegerField(default=0)),
+                ('department', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='kpi_counters', to='grc_dashboard.department')),
+            ],
+            options={
+                'ordering': ['model', 'status', 'severity', 'department'],
+                'unique_together': {('model', 'status', 'severity', 'department')},
+            },
+        ),
+        migrations.RunPython(populate_counters, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 4.2.30 on 2026-10-17 13:12
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('grc_dashboard', '0019_kpi_counter'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='vulnerabilityscan',
+            name='duplicate_rows',
+            field=models.IntegerField(default=0),
+        ),
+    ]
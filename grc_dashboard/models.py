@@ -1,5 +1,7 @@
 # grc_dashboard/models.py
-from django.db import models
+from collections import Counter
+
+from django.db import models, transaction
 from django.contrib.auth.models import User
 from django.core.validators import MinValueValidator, MaxValueValidator
 from django.utils import timezone
@@ -8,6 +10,64 @@ from django.db.models.signals import post_save
 from django.dispatch import receiver
 
 
+class KpiQuerySet(models.QuerySet):
+    """QuerySet for the models tallied in KpiCounter.
+
+    Single saves and deletes are counted by the receivers in signals.py.
+    bulk_create() and update() send no signals, so they count their own
+    changes, and delete() applies its per-row signals as one batch.
+    """
+
+    def bulk_create(self, objs, batch_size=None, ignore_conflicts=False, update_conflicts=False,
+                    update_fields=None, unique_fields=None):
+        from .counters import counter_key, record, tally
+        from .metrics import invalidate_dashboard_metrics
+
+        with transaction.atomic(using=self.db):
+            conflicts = ignore_conflicts or update_conflicts
+            if conflicts:
+                # Conflicting rows are skipped or overwritten, so count the table
+                before = tally(self.model, self.model._base_manager.all())
+            objs = super().bulk_create(
+                objs, batch_size, ignore_conflicts, update_conflicts, update_fields, unique_fields
+            )
+            if conflicts:
+                changes = tally(self.model, self.model._base_manager.all())
+                changes.subtract(before)
+            else:
+                changes = Counter(counter_key(obj) for obj in objs)
+            record(changes)
+        invalidate_dashboard_metrics()
+        return objs
+
+    def update(self, **kwargs):
+        from .counters import counted_fields, record, tally_pks
+        from .metrics import invalidate_dashboard_metrics
+
+        if not counted_fields(self.model) & set(kwargs):
+            return super().update(**kwargs)
+        with transaction.atomic(using=self.db):
+            pks = list(self.values_list('pk', flat=True))
+            before = tally_pks(self.model, pks)
+            rows = super().update(**kwargs)
+            changes = tally_pks(self.model, pks)
+            changes.subtract(before)
+            record(changes)
+        invalidate_dashboard_metrics()
+        return rows
+
+    def delete(self):
+        from .counters import batched_changes
+        from .metrics import invalidate_dashboard_metrics
+
+        with transaction.atomic(using=self.db):
+            with batched_changes():
+                deleted = super().delete()
+            # The per-row signals ran before the batch was applied
+            invalidate_dashboard_metrics()
+        return deleted
+
+
 class Department(models.Model):
     name = models.CharField(max_length=100)
     description = models.TextField(blank=True)
@@ -85,6 +145,8 @@ class Risk(models.Model):
         verbose_name="Last Evidence Update"
     )
 
+    objects = KpiQuerySet.as_manager()
+
     @property
     def risk_score(self):
         return self.likelihood * self.impact
@@ -153,6 +215,8 @@ class ComplianceControl(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    objects = KpiQuerySet.as_manager()
+
     def __str__(self):
         return f"{self.control_id}: {self.title}"
 
@@ -189,6 +253,8 @@ class Audit(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    objects = KpiQuerySet.as_manager()
+
     def __str__(self):
         return f"{self.title} ({self.get_status_display()})"
 
@@ -224,6 +290,8 @@ class Issue(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    objects = KpiQuerySet.as_manager()
+
     def __str__(self):
         return f"{self.title} ({self.priority})"
 
@@ -298,22 +366,108 @@ def save_user_profile(sender, instance, **kwargs):
 # Add at the end of your existing models.py file
 
 class VulnerabilityScan(models.Model):
-    """Uploaded vulnerability scan file"""
+    """Uploaded vulnerability scan file, processed as a background job"""
+    STATUS_CHOICES = [
+        ('queued', 'Queued'),
+        ('running', 'Running'),
+        ('done', 'Done'),
+        ('failed', 'Failed'),
+    ]
+
     name = models.CharField(max_length=255)
+    scope = models.CharField(
+        max_length=100,
+        blank=True,
+        db_index=True,
+        help_text="Network segment or asset group the scan covers"
+    )
     file = models.FileField(upload_to='vulnerability_scans/%Y/%m/')
+    file_sha256 = models.CharField(max_length=64, blank=True, db_index=True, verbose_name='File SHA-256')
     uploaded_by = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, related_name='uploaded_scans')
     upload_date = models.DateTimeField(auto_now_add=True)
     vulnerabilities_found = models.IntegerField(default=0)
+    vulnerabilities_created = models.IntegerField(default=0)
+    vulnerabilities_updated = models.IntegerField(default=0)
+    rows_skipped = models.IntegerField(default=0)
+    # Rows repeating a unique key seen earlier in the same file
+    duplicate_rows = models.IntegerField(default=0)
     hosts_scanned = models.IntegerField(default=0)
-    processed = models.BooleanField(default=False)
+
+    # Changes against the previous completed scan of the same scope; new
+    # findings are counted by vulnerabilities_created
+    previous_scan = models.ForeignKey('self', on_delete=models.SET_NULL, null=True, blank=True, related_name='+')
+    findings_reappeared = models.IntegerField(default=0)
+    findings_missing = models.IntegerField(default=0)
+
+    # Reconcile mode: open findings of the scope that this scan did not
+    # observe are resolved when it finishes
+    reconcile = models.BooleanField(
+        default=False,
+        help_text="Resolve open findings in this scope that the scan no longer observes"
+    )
+    findings_resolved = models.IntegerField(default=0)
+
+    # Job state, maintained by the process_scans worker
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='queued', db_index=True)
+    started_at = models.DateTimeField(null=True, blank=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+    # Renewed by the worker while the scan is running; a stale one means
+    # the worker died
+    heartbeat_at = models.DateTimeField(null=True, blank=True)
+    rows_processed = models.IntegerField(default=0)
+    progress = models.FloatField(default=0, help_text="Fraction of the file read (0-1)")
+    error_message = models.TextField(blank=True)
+
+    # Ingest telemetry: seconds spent in each phase, and the peak RSS of the
+    # processes that parsed and wrote this scan, measured from its start
+    parse_seconds = models.FloatField(default=0)
+    normalize_seconds = models.FloatField(default=0)
+    write_seconds = models.FloatField(default=0)
+    peak_memory_kb = models.IntegerField(null=True, blank=True, verbose_name='Peak memory (KB)')
     
     def __str__(self):
         return f"{self.name} - {self.upload_date.strftime('%Y-%m-%d')}"
+
+    @property
+    def processed(self):
+        return self.status == 'done'
+
+    @property
+    def rows_per_second(self):
+        """Ingest rate over the time the job has been running"""
+        if not self.started_at:
+            return 0.0
+        elapsed = ((self.finished_at or timezone.now()) - self.started_at).total_seconds()
+        return self.rows_processed / elapsed if elapsed > 0 else 0.0
+
+    @property
+    def eta_seconds(self):
+        """Estimated seconds remaining, extrapolated from the bytes read so far"""
+        if self.status != 'running' or not self.started_at or not 0 < self.progress < 1:
+            return None
+        elapsed = (timezone.now() - self.started_at).total_seconds()
+        return elapsed * (1 - self.progress) / self.progress
     
     class Meta:
         ordering = ['-upload_date']
 
 
+class Plugin(models.Model):
+    """Scanner plugin definition, shared by every finding the plugin reports"""
+    plugin_id = models.CharField(max_length=50, unique=True, verbose_name='Plugin ID')
+    plugin_name = models.CharField(max_length=255, verbose_name='Plugin Name')
+    synopsis = models.TextField(verbose_name='Synopsis', blank=True)
+    description = models.TextField(verbose_name='Description', blank=True)
+    remediation = models.TextField(verbose_name='Steps to Remediate', blank=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"{self.plugin_id}: {self.plugin_name}"
+
+    class Meta:
+        ordering = ['plugin_id']
+
+
 class Vulnerability(models.Model):
     """Individual vulnerability finding from scans"""
     SEVERITY_CHOICES = [
@@ -324,6 +478,15 @@ class Vulnerability(models.Model):
         ('info', 'Info'),
     ]
     
+    # Numeric severity, so "most severe first" sorts and indexes correctly
+    SEVERITY_RANKS = {
+        'critical': 4,
+        'high': 3,
+        'medium': 2,
+        'low': 1,
+        'info': 0,
+    }
+    
     STATUS_CHOICES = [
         ('open', 'Open'),
         ('in_progress', 'In Progress'),
@@ -334,9 +497,15 @@ class Vulnerability(models.Model):
     # Scan reference
     scan = models.ForeignKey(VulnerabilityScan, on_delete=models.CASCADE, related_name='vulnerabilities')
     
-    # Plugin information
-    plugin_id = models.CharField(max_length=50, verbose_name='Plugin ID')
-    plugin_name = models.CharField(max_length=255, verbose_name='Plugin Name')
+    # Plugin definition; the column still holds the scanner's plugin ID, so
+    # vuln.plugin_id needs no join
+    plugin = models.ForeignKey(
+        Plugin,
+        on_delete=models.PROTECT,
+        to_field='plugin_id',
+        db_column='plugin_id',
+        related_name='vulnerabilities',
+    )
     
     # Host information  
     ip_address = models.GenericIPAddressField(verbose_name='IP Address')
@@ -345,10 +514,8 @@ class Vulnerability(models.Model):
     
     # Vulnerability details
     severity = models.CharField(max_length=20, choices=SEVERITY_CHOICES, db_index=True)
+    severity_rank = models.PositiveSmallIntegerField(default=0, editable=False)
     cve = models.CharField(max_length=50, blank=True, verbose_name='CVE', db_index=True)
-    synopsis = models.TextField(verbose_name='Synopsis')
-    description = models.TextField(verbose_name='Description')
-    remediation = models.TextField(verbose_name='Steps to Remediate', blank=True)
     plugin_output = models.TextField(verbose_name='Plugin Output', blank=True)
     
     # Exploit information
@@ -358,6 +525,11 @@ class Vulnerability(models.Model):
     first_discovered = models.DateField(null=True, blank=True)
     last_observed = models.DateField(null=True, blank=True)
     status = models.CharField(max_length=20, choices=STATUS_CHOICES, default='open', db_index=True)
+    # Set when a reconciling scan resolved the finding, and cleared when it
+    # is seen again or its status is changed by hand
+    resolved_by_scan = models.ForeignKey(
+        VulnerabilityScan, on_delete=models.SET_NULL, null=True, blank=True, related_name='resolved_vulnerabilities'
+    )
     
     # Unique key for deduplication
     unique_key = models.CharField(max_length=255, unique=True, verbose_name='Unique Key')
@@ -369,6 +541,10 @@ class Vulnerability(models.Model):
     def __str__(self):
         return f"{self.cve or self.plugin_id} - {self.dns_name}"
     
+    def save(self, *args, **kwargs):
+        self.severity_rank = self.SEVERITY_RANKS.get(self.severity, 0)
+        super().save(*args, **kwargs)
+    
     @property
     def cvss_score(self):
         """Estimated CVSS score based on severity"""
@@ -382,10 +558,15 @@ class Vulnerability(models.Model):
         return scores.get(self.severity, 0.0)
     
     class Meta:
-        ordering = ['-severity', '-last_observed']
+        ordering = ['-severity_rank', '-last_observed', '-id']
         indexes = [
+            # Sort key for the keyset-paginated vulnerability list
+            models.Index(fields=['-severity_rank', '-last_observed', '-id'], name='vuln_list_order_idx'),
             models.Index(fields=['dns_name', 'severity']),
-            models.Index(fields=['cve']),
+            # Related findings on the detail page: counts and the first
+            # hosts by name, without reading the table
+            models.Index(fields=['cve', 'dns_name', 'status'], name='vuln_cve_host_status_idx'),
+            models.Index(fields=['plugin', 'dns_name', 'status'], name='vuln_plugin_host_status_idx'),
             models.Index(fields=['status']),
         ]
 
@@ -401,4 +582,135 @@ class VulnerabilityNote(models.Model):
         return f"Note on {self.vulnerability} by {self.user}"
     
     class Meta:
-        ordering = ['-created_at']
\ No newline at end of file
+        ordering = ['-created_at']
+
+
+class VulnerabilityStatusChange(models.Model):
+    """Audit entry for one bulk status change"""
+    user = models.ForeignKey(User, on_delete=models.SET_NULL, null=True, related_name='vulnerability_status_changes')
+    status = models.CharField(max_length=20, choices=Vulnerability.STATUS_CHOICES)
+    # The id list, or the filter fields that were applied
+    criteria = models.JSONField(default=dict)
+    findings_updated = models.PositiveIntegerField(default=0)
+    hosts_affected = models.PositiveIntegerField(default=0)
+    created_at = models.DateTimeField(auto_now_add=True)
+    
+    def __str__(self):
+        return f"{self.findings_updated} findings set to {self.get_status_display()} by {self.user}"
+    
+    class Meta:
+        ordering = ['-created_at']
+
+
+class ScanDelta(models.Model):
+    """A finding that changed state between a scan and the previous scan of its scope"""
+    CHANGE_CHOICES = [
+        ('new', 'New'),
+        ('reappeared', 'Reappeared'),
+        ('missing', 'No Longer Observed'),
+    ]
+
+    scan = models.ForeignKey(VulnerabilityScan, on_delete=models.CASCADE, related_name='deltas')
+    vulnerability = models.ForeignKey(Vulnerability, on_delete=models.CASCADE, related_name='scan_deltas')
+    change = models.CharField(max_length=20, choices=CHANGE_CHOICES)
+
+    def __str__(self):
+        return f"{self.get_change_display()}: {self.vulnerability} ({self.scan})"
+
+    class Meta:
+        ordering = ['id']
+        indexes = [
+            models.Index(fields=['scan', 'change', 'id']),
+        ]
+
+
+class ScanRowError(models.Model):
+    """A row rejected while ingesting a scan; only the first few per scan are kept"""
+    scan = models.ForeignKey(VulnerabilityScan, on_delete=models.CASCADE, related_name='row_errors')
+    row_number = models.IntegerField(help_text="1-based data row in the file, header excluded")
+    message = models.CharField(max_length=255)
+
+    def __str__(self):
+        return f"Row {self.row_number}: {self.message}"
+
+    class Meta:
+        ordering = ['scan', 'row_number']
+
+
+class Host(models.Model):
+    """Per-host rollup of vulnerability findings, refreshed by rollups.refresh_hosts"""
+    dns_name = models.CharField(max_length=255, unique=True, verbose_name='DNS Name')
+    ip_address = models.GenericIPAddressField(null=True, blank=True, verbose_name='IP Address')
+
+    # Open and in-progress findings by severity
+    critical_count = models.IntegerField(default=0)
+    high_count = models.IntegerField(default=0)
+    medium_count = models.IntegerField(default=0)
+    low_count = models.IntegerField(default=0)
+    info_count = models.IntegerField(default=0)
+
+    # All findings by status
+    open_count = models.IntegerField(default=0)
+    in_progress_count = models.IntegerField(default=0)
+    resolved_count = models.IntegerField(default=0)
+    false_positive_count = models.IntegerField(default=0)
+    total_count = models.IntegerField(default=0)
+
+    max_severity_rank = models.PositiveSmallIntegerField(
+        null=True, blank=True,
+        help_text="Highest Vulnerability.severity_rank among open and in-progress findings"
+    )
+    last_observed = models.DateField(null=True, blank=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return self.dns_name
+
+    @property
+    def max_severity(self):
+        ranks = {rank: severity for severity, rank in Vulnerability.SEVERITY_RANKS.items()}
+        return ranks.get(self.max_severity_rank)
+
+    @property
+    def active_count(self):
+        return self.open_count + self.in_progress_count
+
+    class Meta:
+        ordering = ['-max_severity_rank', '-critical_count', '-high_count', 'dns_name']
+
+
+class VulnerabilityTrendSnapshot(models.Model):
+    """Finding counts per severity and status on one day, written by rollups.snapshot_trends"""
+    date = models.DateField()
+    severity = models.CharField(max_length=20, choices=Vulnerability.SEVERITY_CHOICES)
+    status = models.CharField(max_length=20, choices=Vulnerability.STATUS_CHOICES)
+    count = models.IntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"{self.date}: {self.count} {self.severity} {self.status}"
+
+    class Meta:
+        ordering = ['date', 'severity', 'status']
+        unique_together = ['date', 'severity', 'status']
+
+
+class KpiCounter(models.Model):
+    """Running row count of a GRC model per status, severity and department.
+
+    Kept in step by the receivers in signals.py and KpiQuerySet's bulk
+    paths; reconcile_kpi_counters rebuilds it and reports drift.
+    """
+    model = models.CharField(max_length=50)
+    status = models.CharField(max_length=20)
+    # Risk severity or issue priority; blank for models without one
+    severity = models.CharField(max_length=20, blank=True)
+    department = models.ForeignKey(Department, on_delete=models.CASCADE, related_name='kpi_counters')
+    count = models.IntegerField(default=0)
+
+    def __str__(self):
+        return f"{self.model} {self.status} {self.severity} {self.department_id}: {self.count}"
+
+    class Meta:
+        ordering = ['model', 'status', 'severity', 'department']
+        unique_together = ['model', 'status', 'severity', 'department']
@@ -0,0 +1,84 @@
+# grc_dashboard/pagination.py
+import base64
+import json
+from datetime import date
+
+from django.db import connections
+from django.db.models import Q
+
+
+# Findings shown per page of the vulnerability list
+PAGE_SIZE = 50
+
+# Counts stop at this many rows; larger results show as "1000+"
+COUNT_LIMIT = 1000
+
+
+def encode_cursor(vuln):
+    """Opaque cursor for the position just after vuln in list order"""
+    last_observed = vuln.last_observed.isoformat() if vuln.last_observed else None
+    data = json.dumps([vuln.severity_rank, last_observed, vuln.pk], separators=(',', ':'))
+    return base64.urlsafe_b64encode(data.encode()).decode().rstrip('=')
+
+
+def decode_cursor(cursor):
+    """Return (severity_rank, last_observed, id) from a cursor, or None if it is invalid"""
+    try:
+        data = base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4))
+        rank, last_observed, pk = json.loads(data)
+        return int(rank), date.fromisoformat(last_observed) if last_observed else None, int(pk)
+    except (ValueError, TypeError):
+        return None
+
+
+# List order; matches the vuln_list_order_idx index
+ORDERING = ['-severity_rank', '-last_observed', '-id']
+
+
+def _segments(rank, last_observed, pk, nulls_first):
+    # Rows after the cursor, as filters whose results follow one another in
+    # list order. Each is an equality prefix plus one range on the index,
+    # so it seeks straight to its first row; an OR of them would not.
+    # Where NULL last_observed rows fall depends on the backend.
+    if last_observed is None:
+        segments = [Q(severity_rank=rank, last_observed__isnull=True, id__lt=pk)]
+        if nulls_first:
+            segments.append(Q(severity_rank=rank, last_observed__isnull=False))
+    else:
+        segments = [
+            Q(severity_rank=rank, last_observed=last_observed, id__lt=pk),
+            Q(severity_rank=rank, last_observed__lt=last_observed),
+        ]
+        if not nulls_first:
+            segments.append(Q(severity_rank=rank, last_observed__isnull=True))
+    segments.append(Q(severity_rank__lt=rank))
+    return segments
+
+
+def keyset_page(queryset, cursor=None, page_size=PAGE_SIZE):
+    """Return (rows, next cursor or None) for the page after cursor.
+
+    Pages seek on the indexed list order instead of using OFFSET, so every
+    page costs the same however deep it is.
+    """
+    queryset = queryset.order_by(*ORDERING)
+    position = decode_cursor(cursor) if cursor else None
+    if position:
+        nulls_first = connections[queryset.db].features.nulls_order_largest
+        segments = _segments(*position, nulls_first)
+    else:
+        segments = [Q()]
+
+    rows = []
+    for segment in segments:
+        rows += queryset.filter(segment)[:page_size + 1 - len(rows)]
+        if len(rows) > page_size:
+            rows = rows[:page_size]
+            return rows, encode_cursor(rows[-1])
+    return rows, None
+
+
+def capped_count(queryset, limit=COUNT_LIMIT):
+    """Return (count, whether it reached the limit), counting at most limit + 1 rows"""
+    count = queryset.order_by()[:limit + 1].count()
+    return min(count, limit), count > limit
@@ -0,0 +1,98 @@
+# grc_dashboard/rollups.py
+from django.db import transaction
+from django.db.models import Count, Max, Q
+from django.utils import timezone
+
+from .models import Host, Vulnerability, VulnerabilityTrendSnapshot
+from .upserts import bulk_upsert
+
+
+# Statuses that count toward a host's severity breakdown
+ACTIVE_STATUSES = ['open', 'in_progress']
+
+# Host columns rewritten on every refresh
+ROLLUP_FIELDS = [
+    'ip_address', 'critical_count', 'high_count', 'medium_count', 'low_count',
+    'info_count', 'open_count', 'in_progress_count', 'resolved_count',
+    'false_positive_count', 'total_count', 'max_severity_rank', 'last_observed',
+    'updated_at',
+]
+
+# Hosts recomputed per aggregate query
+HOST_BATCH_SIZE = 500
+
+
+def _host_rollups(dns_names):
+    active = Q(status__in=ACTIVE_STATUSES)
+    aggregates = {
+        f'{severity}_count': Count('id', filter=active & Q(severity=severity))
+        for severity, label in Vulnerability.SEVERITY_CHOICES
+    }
+    aggregates.update({
+        f'{status}_count': Count('id', filter=Q(status=status))
+        for status, label in Vulnerability.STATUS_CHOICES
+    })
+    return (
+        Vulnerability.objects.filter(dns_name__in=dns_names)
+        .order_by()
+        .values('dns_name')
+        .annotate(
+            ip_address=Max('ip_address'),
+            total_count=Count('id'),
+            max_severity_rank=Max('severity_rank', filter=active),
+            last_observed=Max('last_observed'),
+            **aggregates,
+        )
+    )
+
+
+def refresh_hosts(dns_names):
+    """Recompute the Host rows for the given hosts from their findings.
+
+    One grouped query per batch of hosts, upserted on dns_name; hosts left
+    without findings are removed.
+    """
+    dns_names = sorted(set(dns_names))
+    for start in range(0, len(dns_names), HOST_BATCH_SIZE):
+        batch = dns_names[start:start + HOST_BATCH_SIZE]
+        hosts = [Host(**row) for row in _host_rollups(batch)]
+        with transaction.atomic():
+            Host.objects.filter(dns_name__in=batch).exclude(
+                dns_name__in=[host.dns_name for host in hosts]
+            ).delete()
+            bulk_upsert(Host, hosts, unique_fields=['dns_name'], update_fields=ROLLUP_FIELDS)
+
+
+def rebuild_hosts():
+    """Rebuild the whole Host table from the findings table"""
+    dns_names = Vulnerability.objects.order_by().values_list('dns_name', flat=True).distinct()
+    with transaction.atomic():
+        Host.objects.all().delete()
+        refresh_hosts(dns_names)
+    return Host.objects.count()
+
+
+def snapshot_trends(date=None):
+    """Record today's (or date's) finding counts per severity and status.
+
+    One grouped query over the findings table; every severity and status
+    pair gets a row, zero included, so each day's series is complete.
+    Running it again on the same day overwrites that day's rows.
+    """
+    date = date or timezone.localdate()
+    counts = {
+        (row['severity'], row['status']): row['count']
+        for row in Vulnerability.objects.order_by().values('severity', 'status').annotate(count=Count('id'))
+    }
+    snapshots = [
+        VulnerabilityTrendSnapshot(
+            date=date, severity=severity, status=status, count=counts.get((severity, status), 0)
+        )
+        for severity, severity_label in Vulnerability.SEVERITY_CHOICES
+        for status, status_label in Vulnerability.STATUS_CHOICES
+    ]
+    bulk_upsert(
+        VulnerabilityTrendSnapshot, snapshots,
+        unique_fields=['date', 'severity', 'status'], update_fields=['count', 'updated_at'],
+    )
+    return snapshots
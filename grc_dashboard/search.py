@@ -0,0 +1,205 @@
+# grc_dashboard/search.py
+import re
+
+from django.db import connections
+from django.db.models import Case, Count, FloatField, Q, Value, When
+from django.db.models.expressions import RawSQL
+
+from .models import Plugin, Vulnerability
+
+
+# Fields covered by the full-text indexes: one over findings and one over
+# the plugin catalog, joined on plugin_id
+VULNERABILITY_SEARCH_FIELDS = ['cve', 'dns_name', 'ip_address']
+PLUGIN_SEARCH_FIELDS = ['plugin_name', 'synopsis']
+
+# SQLite: FTS5 tables over each table, kept in sync by triggers
+VULNERABILITY_FTS_TABLE = 'grc_dashboard_vulnerability_fts'
+PLUGIN_FTS_TABLE = 'grc_dashboard_plugin_fts'
+
+# PostgreSQL: generated tsvector column with a GIN index on each table
+SEARCH_VECTOR_COLUMN = 'search_vector'
+
+# Search terms; quotes and other query syntax are dropped, so terms can be
+# quoted into FTS5 and tsquery expressions as-is
+TERM_PATTERN = re.compile(r'[\w.:/-]*[^\W_][\w.:/-]*')
+
+# Best matches taken from each index when ranking a search
+RANK_CANDIDATES = 500
+
+# Index backend per database alias, looked up once per process
+_backends = {}
+
+
+def _terms(text):
+    return TERM_PATTERN.findall(text or '')
+
+
+def _backend(using):
+    if using not in _backends:
+        connection = connections[using]
+        backend = None
+        if connection.vendor == 'sqlite':
+            # The migration skips the tables where SQLite lacks FTS5
+            with connection.cursor() as cursor:
+                if VULNERABILITY_FTS_TABLE in connection.introspection.table_names(cursor):
+                    backend = 'fts5'
+        elif connection.vendor == 'postgresql':
+            backend = 'tsvector'
+        _backends[using] = backend
+    return _backends[using]
+
+
+def _fts_match(terms):
+    # Each term is a quoted phrase (so "10.0.0.5" or "CVE-2021-44228" match
+    # their tokens in sequence) with a prefix match on its last token
+    return ' OR '.join(f'"{term}"*' for term in terms)
+
+
+def _tsquery(terms):
+    return ' | '.join(f"'{term}':*" for term in terms)
+
+
+def _index_filters(term, backend):
+    # (finding ids, plugin ids) subqueries matching one term
+    vulnerability_table = Vulnerability._meta.db_table
+    plugin_table = Plugin._meta.db_table
+    if backend == 'fts5':
+        match = _fts_match([term])
+        return (
+            RawSQL(f'SELECT rowid FROM {VULNERABILITY_FTS_TABLE} WHERE {VULNERABILITY_FTS_TABLE} MATCH %s', [match]),
+            RawSQL(
+                f'SELECT plugin_id FROM {plugin_table} WHERE id IN '
+                f'(SELECT rowid FROM {PLUGIN_FTS_TABLE} WHERE {PLUGIN_FTS_TABLE} MATCH %s)', [match]
+            ),
+        )
+    query = _tsquery([term])
+    return (
+        RawSQL(
+            f"SELECT id FROM {vulnerability_table} "
+            f"WHERE {SEARCH_VECTOR_COLUMN} @@ to_tsquery('simple', %s)", [query]
+        ),
+        RawSQL(
+            f"SELECT plugin_id FROM {plugin_table} "
+            f"WHERE {SEARCH_VECTOR_COLUMN} @@ to_tsquery('simple', %s)", [query]
+        ),
+    )
+
+
+def search_filter(text, using='default'):
+    """Return a Q matching vulnerabilities for a free-text search.
+
+    Every term must match the finding (cve, dns_name, ip_address) or its
+    plugin (plugin_name, synopsis). Uses the full-text indexes on SQLite
+    (FTS5) and PostgreSQL (tsvector); on other backends, or where the index
+    is missing, falls back to icontains.
+    """
+    terms = _terms(text)
+    if not terms:
+        return Q(pk__in=[])
+
+    backend = _backend(using)
+    condition = Q()
+    for term in terms:
+        if backend:
+            vulnerability_ids, plugin_ids = _index_filters(term, backend)
+            condition &= Q(pk__in=vulnerability_ids) | Q(plugin_id__in=plugin_ids)
+        else:
+            term_condition = Q()
+            for field in VULNERABILITY_SEARCH_FIELDS:
+                term_condition |= Q(**{f'{field}__icontains': term})
+            for field in PLUGIN_SEARCH_FIELDS:
+                term_condition |= Q(**{f'plugin__{field}__icontains': term})
+            condition &= term_condition
+    return condition
+
+
+def _top_matches(terms, backend, using):
+    # ({finding id: score}, {plugin_id: score}) for the best matches of each
+    # index, one query apiece; lower scores are better (FTS5 bm25 is
+    # negative, so ts_rank is negated to match)
+    vulnerability_table = Vulnerability._meta.db_table
+    plugin_table = Plugin._meta.db_table
+    if backend == 'fts5':
+        match = _fts_match(terms)
+        queries = [
+            (
+                f'SELECT rowid, rank FROM {VULNERABILITY_FTS_TABLE} '
+                f'WHERE {VULNERABILITY_FTS_TABLE} MATCH %s ORDER BY rank LIMIT %s',
+                [match, RANK_CANDIDATES],
+            ),
+            (
+                f'SELECT plugin.plugin_id, matched.rank FROM '
+                f'(SELECT rowid, rank FROM {PLUGIN_FTS_TABLE} '
+                f'WHERE {PLUGIN_FTS_TABLE} MATCH %s ORDER BY rank LIMIT %s) matched '
+                f'JOIN {plugin_table} plugin ON plugin.id = matched.rowid',
+                [match, RANK_CANDIDATES],
+            ),
+        ]
+    else:
+        query = _tsquery(terms)
+        queries = [
+            (
+                f"SELECT {key}, -ts_rank({SEARCH_VECTOR_COLUMN}, query) AS score "
+                f"FROM {table}, to_tsquery('simple', %s) query "
+                f"WHERE {SEARCH_VECTOR_COLUMN} @@ query ORDER BY score LIMIT %s",
+                [query, RANK_CANDIDATES],
+            )
+            for table, key in [(vulnerability_table, 'id'), (plugin_table, 'plugin_id')]
+        ]
+    scores = []
+    with connections[using].cursor() as cursor:
+        for sql, params in queries:
+            cursor.execute(sql, params)
+            scores.append(dict(cursor.fetchall()))
+    return scores
+
+
+def ranked_search_ids(text, limit=50, using='default'):
+    """Return up to limit vulnerability ids for a search, best match first.
+
+    Each index is queried once for its best RANK_CANDIDATES matches; a
+    finding scores the sum of its own and its plugin's match. Findings in
+    neither set are left out.
+    """
+    terms = _terms(text)
+    if not terms:
+        return []
+
+    matches = Vulnerability.objects.using(using).filter(search_filter(text, using))
+    backend = _backend(using)
+    if not backend:
+        # Without an index to rank with, most severe first
+        return list(matches.order_by('-severity_rank', 'id').values_list('pk', flat=True)[:limit])
+
+    finding_scores, plugin_scores = _top_matches(terms, backend, using)
+    fields = ['pk', 'plugin_id', 'severity_rank']
+    candidates = list(matches.filter(pk__in=list(finding_scores)).values_list(*fields))
+    if plugin_scores:
+        # Findings matched through their plugin alone score their plugin's
+        # match, so only the best plugins holding limit of them (and any
+        # tied with the last) can make the cut; ranking those is cheap
+        by_plugin = matches.filter(plugin_id__in=list(plugin_scores)).exclude(pk__in=list(finding_scores))
+        counts = dict(by_plugin.order_by().values_list('plugin_id').annotate(Count('pk')))
+        best = []
+        found = 0
+        for plugin_id in sorted(counts, key=plugin_scores.get):
+            if found >= limit and plugin_scores[plugin_id] > plugin_scores[best[-1]]:
+                break
+            best.append(plugin_id)
+            found += counts[plugin_id]
+        if best:
+            plugin_score = Case(
+                *[When(plugin_id=plugin_id, then=Value(plugin_scores[plugin_id])) for plugin_id in best],
+                output_field=FloatField(),
+            )
+            candidates += (
+                by_plugin.filter(plugin_id__in=best)
+                .annotate(plugin_score=plugin_score)
+                .order_by('plugin_score', '-severity_rank', 'id')
+                .values_list(*fields)[:limit]
+            )
+    candidates.sort(key=lambda row: (
+        finding_scores.get(row[0], 0) + plugin_scores.get(row[1], 0), -row[2], row[0],
+    ))
+    return [pk for pk, plugin_id, severity_rank in candidates[:limit]]
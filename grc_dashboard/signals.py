@@ -0,0 +1,47 @@
+# grc_dashboard/signals.py
+from collections import Counter
+
+from django.db.models.signals import post_delete, post_save, pre_save
+from django.dispatch import receiver
+
+from .counters import COUNTED_MODELS, counter_key, record, tally
+from .metrics import invalidate_dashboard_metrics
+from .models import Audit, ComplianceControl, Department, Issue, Risk
+
+
+# Models whose rows feed the dashboard metrics bundle; departments appear
+# in its recent activity lists
+DASHBOARD_MODELS = [Risk, ComplianceControl, Audit, Issue, Department]
+
+
+@receiver(pre_save)
+def remember_counter_key(sender, instance, **kwargs):
+    # The stored row's key, so an update can move it between counters
+    if sender in COUNTED_MODELS:
+        instance._kpi_previous = (
+            Counter() if instance._state.adding
+            else tally(sender, sender._base_manager.filter(pk=instance.pk))
+        )
+
+
+@receiver(post_save)
+def count_saved(sender, instance, **kwargs):
+    if sender in COUNTED_MODELS:
+        changes = Counter({counter_key(instance): 1})
+        changes.subtract(instance.__dict__.pop('_kpi_previous', Counter()))
+        record(changes)
+
+
+@receiver(post_delete)
+def count_deleted(sender, instance, **kwargs):
+    if sender in COUNTED_MODELS:
+        record(Counter({counter_key(instance): -1}))
+
+
+# Connected after the counting receivers, so that outside a transaction the
+# counters have changed by the time the bundle is dropped
+@receiver(post_save)
+@receiver(post_delete)
+def invalidate_dashboard(sender, **kwargs):
+    if sender in DASHBOARD_MODELS:
+        invalidate_dashboard_metrics()
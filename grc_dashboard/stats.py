@@ -0,0 +1,66 @@
+# grc_dashboard/stats.py
+from dataclasses import dataclass, field, fields
+from datetime import timedelta
+
+from django.db.models import Count, Q
+from django.utils import timezone
+
+
+def card(condition=None):
+    """A stat card counting the rows that match condition (all rows if None).
+
+    condition is a Q, or a callable returning one for cards relative to
+    the current date.
+    """
+    return field(default=0, metadata={'condition': condition})
+
+
+class StatCards:
+    """Base for a page's stat cards; every card is counted in one query"""
+
+    @classmethod
+    def for_queryset(cls, queryset):
+        aggregates = {}
+        for card_field in fields(cls):
+            condition = card_field.metadata['condition']
+            if callable(condition):
+                condition = condition()
+            aggregates[card_field.name] = Count('pk', filter=condition)
+        return cls(**queryset.order_by().aggregate(**aggregates))
+
+
+def _overdue():
+    return Q(status__in=['open', 'in_progress'], due_date__lt=timezone.localdate())
+
+
+def _upcoming():
+    return Q(status='planned', start_date__lte=timezone.localdate() + timedelta(days=30))
+
+
+@dataclass(frozen=True)
+class ArtifactStats(StatCards):
+    total: int = card()
+    policy: int = card(Q(category='policy'))
+    certification: int = card(Q(category='certification'))
+    evidence: int = card(Q(category='evidence'))
+    documents: int = card(Q(category__in=['policy', 'procedure']))
+
+
+@dataclass(frozen=True)
+class IssueStats(StatCards):
+    total: int = card()
+    open: int = card(Q(status__in=['open', 'in_progress']))
+    resolved: int = card(Q(status__in=['resolved', 'closed']))
+    overdue: int = card(_overdue)
+
+
+@dataclass(frozen=True)
+class AuditStats(StatCards):
+    upcoming: int = card(_upcoming)
+
+
+@dataclass(frozen=True)
+class VulnerabilityStats(StatCards):
+    total: int = card()
+    critical: int = card(Q(severity='critical', status='open'))
+    high: int = card(Q(severity='high', status='open'))
@@ -1,3 +1,1493 @@
-from django.test import TestCase
+import hashlib
+import io
+import os
+import shutil
+import tempfile
+import zipfile
+from datetime import date, timedelta
+from unittest import mock
+from xml.etree import ElementTree
 
-# Create your tests here.
+import openpyxl
+import pandas as pd
+from django.contrib.auth.models import User
+from django.contrib.messages import get_messages
+from django.core.cache import caches
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.db import connection, transaction
+from django.db.models.signals import post_delete
+from django.test import AsyncClient, SimpleTestCase, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+from django.utils.http import http_date
+
+from . import exports
+from .counters import batched_changes, rebuild_counters
+from .ingestion import (
+    SCAN_LEASE, VulnerabilityWriter, claim_next_scan, fail_stale_scans, iter_nessus_frames, iter_scan_frames,
+    iter_xlsx_frames, normalize_frame, peak_memory_kb, reset_peak_memory,
+)
+from .uploadhandlers import MAX_ZIP_MEMBERS
+from .models import (
+    Artifact, Audit, Department, Host, Issue, KpiCounter, Plugin, Risk, ScanRowError, Vulnerability,
+    VulnerabilityNote, VulnerabilityScan, VulnerabilityStatusChange, VulnerabilityTrendSnapshot,
+)
+from .pagination import _segments, capped_count, decode_cursor, encode_cursor, keyset_page
+from .rollups import refresh_hosts, snapshot_trends
+from .search import _backend, _backends, ranked_search_ids, search_filter
+from .metrics import get_dashboard_metrics
+from .stats import ArtifactStats, IssueStats, VulnerabilityStats
+
+
+def scan_csv(*rows):
+    """A scan export of (unique key, host, plugin id) rows"""
+    lines = ['Plugin,Plugin name,Severity,IP address,DNS name,Key']
+    lines += [f'{plugin_id},Plugin {plugin_id},High,10.0.0.1,{host},{key}' for key, host, plugin_id in rows]
+    return ('\n'.join(lines) + '\n').encode()
+
+
+def process_queued_scans():
+    call_command('process_scans', once=True, stdout=io.StringIO())
+
+
+def process_scan(name, content, **fields):
+    """Queue a scan of content, process it and return it refreshed"""
+    scan = VulnerabilityScan.objects.create(name=name, file=SimpleUploadedFile(name, content), **fields)
+    process_queued_scans()
+    scan.refresh_from_db()
+    return scan
+
+
+def write_temp_file(test, name, content):
+    """Write content to a file that is removed after the test and return its path"""
+    directory = tempfile.mkdtemp()
+    test.addCleanup(shutil.rmtree, directory)
+    path = os.path.join(directory, name)
+    with open(path, 'wb') as fh:
+        fh.write(content)
+    return path
+
+
+class MediaRootTestCase(TestCase):
+    """Stores uploads in a temporary MEDIA_ROOT"""
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.media_root = tempfile.mkdtemp()
+        cls.addClassCleanup(shutil.rmtree, cls.media_root)
+        media_override = override_settings(MEDIA_ROOT=cls.media_root)
+        media_override.enable()
+        cls.addClassCleanup(media_override.disable)
+
+
+class StatCardsTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.department = Department.objects.create(name='Security')
+        for category in ['policy', 'policy', 'procedure', 'certification', 'evidence']:
+            Artifact.objects.create(title=category, category=category, department=cls.department, file='a.pdf')
+        yesterday = date.today() - timedelta(days=1)
+        for status, due_date in [('open', yesterday), ('in_progress', None), ('resolved', yesterday), ('closed', None)]:
+            Issue.objects.create(
+                title=status, description='', priority='high', status=status,
+                department=cls.department, due_date=due_date,
+            )
+
+    def test_artifact_stats_in_one_query(self):
+        with self.assertNumQueries(1):
+            stats = ArtifactStats.for_queryset(Artifact.objects.all())
+        self.assertEqual(stats, ArtifactStats(total=5, policy=2, certification=1, evidence=1, documents=3))
+
+    def test_issue_stats(self):
+        with self.assertNumQueries(1):
+            stats = IssueStats.for_queryset(Issue.objects.all())
+        self.assertEqual(stats, IssueStats(total=4, open=2, resolved=2, overdue=1))
+
+    def test_stats_follow_queryset_filters(self):
+        stats = IssueStats.for_queryset(Issue.objects.filter(status='open'))
+        self.assertEqual(stats, IssueStats(total=1, open=1, resolved=0, overdue=1))
+
+
+class PageQueryCountTests(TestCase):
+    """Each page costs a fixed number of queries, however many rows there are"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user('analyst', password='x')
+        cls.department = Department.objects.create(name='Security')
+        today = date.today()
+        for i in range(10):
+            Risk.objects.create(
+                title=f'Risk {i}', description='', department=cls.department,
+                severity=['critical', 'high', 'low'][i % 3], likelihood=2, impact=3, owner=cls.user,
+            )
+            Issue.objects.create(
+                title=f'Issue {i}', description='', priority='medium', department=cls.department,
+                due_date=today - timedelta(days=i), assigned_to=cls.user,
+            )
+            Audit.objects.create(
+                title=f'Audit {i}', audit_type='internal', department=cls.department,
+                scope='', start_date=today + timedelta(days=i), auditor=cls.user,
+            )
+            Artifact.objects.create(
+                title=f'Artifact {i}', category='policy', department=cls.department,
+                file='a.pdf', uploaded_by=cls.user,
+            )
+
+        scan = VulnerabilityScan.objects.create(name='scan', file='scan.csv', status='done')
+        plugin = Plugin.objects.create(plugin_id='10001', plugin_name='Test plugin')
+        for i in range(10):
+            Vulnerability.objects.create(
+                scan=scan, plugin=plugin, ip_address=f'10.0.0.{i}', dns_name=f'host{i}',
+                severity=['critical', 'high'][i % 2], unique_key=f'key-{i}',
+            )
+
+    def setUp(self):
+        self.client.force_login(self.user)
+        caches['dashboard'].clear()
+
+    def test_dashboard(self):
+        # Session, user, KPI counters, upcoming audits, overdue issues and
+        # the three recent lists
+        with self.assertNumQueries(8):
+            self.client.get(reverse('dashboard'))
+        # Served from the metrics cache
+        with self.assertNumQueries(2):
+            response = self.client.get(reverse('dashboard'))
+        self.assertEqual(response.context['total_risks'], 10)
+        self.assertEqual(response.context['overdue_issues'], 9)
+
+    def test_artifacts(self):
+        with self.assertNumQueries(5):
+            response = self.client.get(reverse('artifacts'))
+        self.assertEqual(response.context['stats'].total, 10)
+
+    def test_issue_tracking(self):
+        with self.assertNumQueries(4):
+            response = self.client.get(reverse('issue_tracking'))
+        self.assertEqual(response.context['stats'], IssueStats(total=10, open=10, resolved=0, overdue=9))
+
+    def test_vulnerability_management(self):
+        with self.assertNumQueries(7):
+            response = self.client.get(reverse('vulnerability_management'))
+        self.assertEqual(response.context['stats'], VulnerabilityStats(total=10, critical=5, high=5))
+
+
+    def test_vulnerability_detail(self):
+        vulnerability = Vulnerability.objects.get(unique_key='key-0')
+        url = reverse('vulnerability_detail', args=[vulnerability.pk])
+
+        def add_related_rows(start):
+            # Notes, findings on the same host and the same plugin elsewhere
+            for i in range(start, start + 5):
+                VulnerabilityNote.objects.create(vulnerability=vulnerability, user=self.user, note=f'Note {i}')
+                Vulnerability.objects.create(
+                    scan=vulnerability.scan, plugin=vulnerability.plugin, ip_address='10.0.0.0', dns_name='host0',
+                    severity='low', port=i, unique_key=f'same-host-{i}',
+                )
+
+        add_related_rows(0)
+        Host.objects.create(dns_name='host0', total_count=6)
+        # Session, user, vulnerability, notes, related stats, related
+        # findings, same-host findings and the host rollup
+        with self.assertNumQueries(8):
+            self.client.get(url)
+        add_related_rows(5)
+        with self.assertNumQueries(8):
+            response = self.client.get(url)
+        self.assertEqual(len(response.context['notes']), 10)
+        self.assertEqual(response.context['related_stats']['findings'], 20)
+        self.assertEqual(len(response.context['same_host_vulns']), 10)
+
+
+class RiskHeatmapTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user('analyst', password='x')
+        cls.department = Department.objects.create(name='Security')
+        for severity in ['low', 'critical', 'medium', 'critical']:
+            Risk.objects.create(
+                title=severity, description='', department=cls.department,
+                severity=severity, likelihood=4, impact=5,
+            )
+        Risk.objects.create(
+            title='other cell', description='', department=cls.department,
+            severity='high', likelihood=1, impact=2,
+        )
+
+    def setUp(self):
+        self.client.force_login(self.user)
+
+    def test_cells_are_aggregated(self):
+        # Session, user, the ETag aggregate and the cells
+        with self.assertNumQueries(4):
+            response = self.client.get(reverse('risk_heatmap_data'), {'top': 2})
+        data = response.json()
+        self.assertEqual(data['total'], 5)
+        cell = data['cells'][0]
+        self.assertEqual((cell['likelihood'], cell['impact'], cell['count']), (4, 5, 4))
+        critical = Risk.objects.filter(severity='critical').order_by('-id').values_list('id', flat=True)
+        self.assertEqual(cell['top_risk_ids'], list(critical))
+
+    def test_filters(self):
+        data = self.client.get(reverse('risk_heatmap_data'), {'severity': 'high'}).json()
+        self.assertEqual(data['total'], 1)
+        self.assertEqual(data['cells'][0]['likelihood'], 1)
+
+    def test_conditional_get(self):
+        url = reverse('risk_heatmap_data')
+        etag = self.client.get(url)['ETag']
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, 304)
+
+        Risk.objects.filter(title='other cell').delete()
+        self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=etag).status_code, 200)
+
+    def test_delete_is_not_served_as_not_modified(self):
+        url = reverse('risk_heatmap_data')
+        response = self.client.get(url)
+        # A date validator cannot see deletes, so only the ETag is sent
+        self.assertNotIn('Last-Modified', response)
+        since = http_date(timezone.now().timestamp() + 60)
+        Risk.objects.filter(severity='critical').first().delete()
+        response = self.client.get(url, HTTP_IF_MODIFIED_SINCE=since)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['total'], 4)
+
+
+class DashboardCacheTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.department = Department.objects.create(name='Security')
+
+    def setUp(self):
+        caches['dashboard'].clear()
+
+    def create_risk(self, severity='high'):
+        return Risk.objects.create(
+            title='Risk', description='', department=self.department,
+            severity=severity, likelihood=2, impact=3,
+        )
+
+    def test_invalidated_when_the_transaction_commits(self):
+        get_dashboard_metrics()
+        with self.captureOnCommitCallbacks(execute=True):
+            self.create_risk()
+            # A load before the commit still gets the committed bundle, and
+            # must not be what stays cached afterwards
+            self.assertEqual(get_dashboard_metrics()['total_risks'], 0)
+        self.assertEqual(get_dashboard_metrics()['total_risks'], 1)
+
+    def test_rolled_back_writes_keep_the_bundle(self):
+        get_dashboard_metrics()
+        with self.captureOnCommitCallbacks() as callbacks:
+            try:
+                with transaction.atomic():
+                    self.create_risk()
+                    raise ValueError
+            except ValueError:
+                pass
+        self.assertEqual(callbacks, [])
+
+    def test_bulk_delete_is_cached_after_the_counters_change(self):
+        self.create_risk()
+        self.create_risk()
+        get_dashboard_metrics()
+
+        def concurrent_load(sender, **kwargs):
+            # A dashboard load landing between a row's delete and the end of
+            # the batch sees the old counters
+            get_dashboard_metrics()
+
+        post_delete.connect(concurrent_load, sender=Risk)
+        self.addCleanup(post_delete.disconnect, concurrent_load, sender=Risk)
+        with self.captureOnCommitCallbacks(execute=True):
+            Risk.objects.all().delete()
+        self.assertEqual(get_dashboard_metrics()['total_risks'], 0)
+
+
+class KpiCounterTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.security = Department.objects.create(name='Security')
+        cls.finance = Department.objects.create(name='Finance')
+
+    def create_risk(self, severity='high', status='open', department=None):
+        return Risk.objects.create(
+            title='Risk', description='', department=department or self.security,
+            severity=severity, likelihood=2, impact=3, status=status,
+        )
+
+    def counters(self):
+        return {
+            (model, status, severity, department_id): count
+            for model, status, severity, department_id, count in KpiCounter.objects.values_list(
+                'model', 'status', 'severity', 'department_id', 'count'
+            )
+            if count
+        }
+
+    def assertCountersMatchTables(self):
+        self.assertEqual(rebuild_counters(dry_run=True), {})
+
+    def test_status_change_moves_the_row(self):
+        risk = self.create_risk()
+        risk.status = 'mitigated'
+        risk.save()
+        self.assertEqual(self.counters(), {('risk', 'mitigated', 'high', self.security.pk): 1})
+        self.assertCountersMatchTables()
+
+    def test_department_move_moves_the_row(self):
+        issue = Issue.objects.create(
+            title='Issue', description='', priority='low', department=self.security,
+        )
+        issue.department = self.finance
+        issue.priority = 'critical'
+        issue.save()
+        self.assertEqual(self.counters(), {('issue', 'open', 'critical', self.finance.pk): 1})
+        self.assertCountersMatchTables()
+
+    def test_save_without_counted_change(self):
+        risk = self.create_risk()
+        risk.title = 'Renamed'
+        risk.save()
+        self.assertEqual(self.counters(), {('risk', 'open', 'high', self.security.pk): 1})
+
+    def test_queryset_update_moves_every_row(self):
+        for _ in range(3):
+            self.create_risk()
+        self.create_risk(severity='low')
+        Risk.objects.filter(severity='high').update(status='closed', department=self.finance)
+        self.assertEqual(self.counters(), {
+            ('risk', 'closed', 'high', self.finance.pk): 3,
+            ('risk', 'open', 'low', self.security.pk): 1,
+        })
+        self.assertCountersMatchTables()
+
+    def test_queryset_update_of_uncounted_fields_skips_the_tally(self):
+        self.create_risk()
+        with self.assertNumQueries(1):
+            Risk.objects.update(mitigation_plan='Patch')
+
+    def test_bulk_create(self):
+        Risk.objects.bulk_create([
+            Risk(title='Risk', description='', department=department, severity='medium', likelihood=1, impact=1)
+            for department in [self.security, self.security, self.finance]
+        ])
+        self.assertEqual(self.counters(), {
+            ('risk', 'open', 'medium', self.security.pk): 2,
+            ('risk', 'open', 'medium', self.finance.pk): 1,
+        })
+
+    def test_bulk_create_ignoring_conflicts_counts_inserted_rows_only(self):
+        risk = self.create_risk()
+        Risk.objects.bulk_create([
+            Risk(pk=risk.pk, title='Risk', description='', department=self.finance, severity='low',
+                 likelihood=1, impact=1),
+            Risk(title='Risk', description='', department=self.finance, severity='low', likelihood=1, impact=1),
+        ], ignore_conflicts=True)
+        self.assertEqual(self.counters(), {
+            ('risk', 'open', 'high', self.security.pk): 1,
+            ('risk', 'open', 'low', self.finance.pk): 1,
+        })
+        self.assertCountersMatchTables()
+
+    def test_batched_changes_apply_at_the_end_of_the_block(self):
+        risk = self.create_risk()
+        with batched_changes():
+            risk.status = 'mitigated'
+            risk.save()
+            risk.status = 'closed'
+            risk.save()
+            self.create_risk()
+            with batched_changes():
+                self.create_risk(severity='low')
+            # The nested block leaves its changes to the outer one
+            self.assertEqual(self.counters(), {('risk', 'open', 'high', self.security.pk): 1})
+        self.assertEqual(self.counters(), {
+            ('risk', 'closed', 'high', self.security.pk): 1,
+            ('risk', 'open', 'high', self.security.pk): 1,
+            ('risk', 'open', 'low', self.security.pk): 1,
+        })
+        self.assertCountersMatchTables()
+
+    def test_bulk_delete_applies_one_change_per_counter(self):
+        for _ in range(5):
+            self.create_risk()
+        with CaptureQueriesContext(connection) as queries:
+            Risk.objects.all().delete()
+        counter_updates = [q for q in queries if q['sql'].startswith('UPDATE') and 'kpicounter' in q['sql']]
+        self.assertEqual(len(counter_updates), 1)
+        self.assertEqual(self.counters(), {})
+
+    def test_reconcile_reports_and_fixes_drift(self):
+        self.create_risk()
+        self.create_risk(severity='low')
+        KpiCounter.objects.filter(severity='high').update(count=5)
+        KpiCounter.objects.filter(severity='low').delete()
+        KpiCounter.objects.create(model='audit', status='planned', severity='', department=self.finance, count=2)
+        expected = {
+            ('risk', 'open', 'high', self.security.pk): (5, 1),
+            ('risk', 'open', 'low', self.security.pk): (0, 1),
+            ('audit', 'planned', '', self.finance.pk): (2, 0),
+        }
+
+        out = io.StringIO()
+        call_command('reconcile_kpi_counters', dry_run=True, stdout=out)
+        self.assertIn(
+            f'risk status=open severity=high department={self.security.pk}: stored 5, actual 1', out.getvalue()
+        )
+        self.assertIn('3 counters have drifted', out.getvalue())
+        self.assertEqual(rebuild_counters(dry_run=True), expected)
+
+        out = io.StringIO()
+        call_command('reconcile_kpi_counters', stdout=out)
+        self.assertIn('Rebuilt counters; corrected 3', out.getvalue())
+        self.assertEqual(self.counters(), {
+            ('risk', 'open', 'high', self.security.pk): 1,
+            ('risk', 'open', 'low', self.security.pk): 1,
+        })
+
+        out = io.StringIO()
+        call_command('reconcile_kpi_counters', stdout=out)
+        self.assertIn('Counters match the tables', out.getvalue())
+
+
+class AsyncDashboardTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user('analyst', password='x')
+        cls.department = Department.objects.create(name='Security')
+        Risk.objects.create(
+            title='Risk', description='', department=cls.department,
+            severity='critical', likelihood=2, impact=3,
+        )
+        scan = VulnerabilityScan.objects.create(name='scan', file='scan.csv', status='done')
+        plugin = Plugin.objects.create(plugin_id='10001', plugin_name='Test plugin')
+        Vulnerability.objects.create(
+            scan=scan, plugin=plugin, ip_address='10.0.0.1', dns_name='host1', severity='critical', unique_key='key-1',
+        )
+
+    def setUp(self):
+        self.async_client = AsyncClient()
+        self.async_client.force_login(self.user)
+        caches['dashboard'].clear()
+
+    async def test_stats_endpoint(self):
+        response = await self.async_client.get(reverse('dashboard_stats'))
+        data = response.json()
+        self.assertEqual(data['total_risks'], 1)
+        self.assertEqual(data['critical_vulnerabilities'], 1)
+        self.assertNotIn('recent_risks', data)
+
+    async def test_dashboard_over_asgi(self):
+        response = await self.async_client.get(reverse('dashboard'))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.context['critical_risks'], 1)
+
+    async def test_login_required(self):
+        response = await AsyncClient().get(reverse('dashboard_stats'))
+        self.assertEqual(response.status_code, 302)
+
+
+class KeysetPaginationTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        scan = VulnerabilityScan.objects.create(name='scan', file='scan.csv', status='done')
+        plugin = Plugin.objects.create(plugin_id='10001', plugin_name='Test plugin')
+        today = date.today()
+        # Ties on severity and date, and NULL dates within each severity
+        for i, (severity, days_ago) in enumerate([
+            ('critical', 1), ('critical', 1), ('critical', None), ('critical', 3), ('high', None),
+            ('high', None), ('high', 2), ('medium', 5), ('medium', 5), ('low', None), ('info', 1),
+        ]):
+            Vulnerability.objects.create(
+                scan=scan, plugin=plugin, ip_address='10.0.0.1', dns_name=f'host{i}', severity=severity,
+                unique_key=f'key-{i}', last_observed=today - timedelta(days=days_ago) if days_ago else None,
+            )
+
+    def list_order(self, nulls_first):
+        """Primary keys in list order on a backend that sorts NULL dates first or last"""
+        def key(vuln):
+            if vuln.last_observed is None:
+                observed = (0 if nulls_first else 2, 0)
+            else:
+                observed = (1, -vuln.last_observed.toordinal())
+            return (-vuln.severity_rank, observed, -vuln.pk)
+        return [vuln.pk for vuln in sorted(Vulnerability.objects.all(), key=key)]
+
+    def test_pages_cover_every_row_once(self):
+        expected = list(Vulnerability.objects.order_by('-severity_rank', '-last_observed', '-id')
+                        .values_list('pk', flat=True))
+        seen = []
+        cursor = None
+        while True:
+            rows, cursor = keyset_page(Vulnerability.objects.all(), cursor, page_size=3)
+            seen += [vuln.pk for vuln in rows]
+            if cursor is None:
+                break
+        self.assertEqual(seen, expected)
+
+    def test_segments_follow_the_cursor_for_either_null_order(self):
+        vulns = {vuln.pk: vuln for vuln in Vulnerability.objects.all()}
+        for nulls_first in [True, False]:
+            order = self.list_order(nulls_first)
+            for position, pk in enumerate(order):
+                vuln = vulns[pk]
+                with self.subTest(nulls_first=nulls_first, after=pk):
+                    rows = []
+                    for segment in _segments(vuln.severity_rank, vuln.last_observed, pk, nulls_first):
+                        matched = set(Vulnerability.objects.filter(segment).values_list('pk', flat=True))
+                        rows += [row for row in order if row in matched]
+                    self.assertEqual(rows, order[position + 1:])
+
+    def test_cursor_round_trip(self):
+        vuln = Vulnerability.objects.filter(last_observed__isnull=True).first()
+        self.assertEqual(decode_cursor(encode_cursor(vuln)), (vuln.severity_rank, None, vuln.pk))
+        for cursor in ['', 'not-a-cursor', 'W10']:
+            self.assertIsNone(decode_cursor(cursor))
+
+    def test_invalid_cursor_starts_over(self):
+        rows, cursor = keyset_page(Vulnerability.objects.all(), 'not-a-cursor', page_size=3)
+        self.assertEqual(rows, list(Vulnerability.objects.order_by('-severity_rank', '-last_observed', '-id')[:3]))
+
+    def test_capped_count(self):
+        self.assertEqual(capped_count(Vulnerability.objects.all(), limit=20), (11, False))
+        self.assertEqual(capped_count(Vulnerability.objects.all(), limit=5), (5, True))
+
+
+class SearchTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        scan = VulnerabilityScan.objects.create(name='scan', file='scan.csv', status='done')
+        heartbleed = Plugin.objects.create(
+            plugin_id='73412', plugin_name='OpenSSL Heartbleed', synopsis='Heartbleed in OpenSSL',
+        )
+        apache = Plugin.objects.create(
+            plugin_id='10107', plugin_name='Apache httpd',
+            synopsis='The bundled OpenSSL library has many issues, Heartbleed among them, and more besides',
+        )
+        cls.findings = {}
+        for name, plugin, severity, ip_address, dns_name, cve in [
+            ('web1', heartbleed, 'high', '10.0.0.5', 'web1.example.com', 'CVE-2014-0160'),
+            ('web2', apache, 'critical', '10.0.0.6', 'web2.example.com', ''),
+            ('db1', apache, 'low', '10.1.0.7', 'db1.example.com', 'CVE-2021-44228'),
+        ]:
+            cls.findings[name] = Vulnerability.objects.create(
+                scan=scan, plugin=plugin, severity=severity, ip_address=ip_address,
+                dns_name=dns_name, cve=cve, unique_key=name,
+            )
+
+    def search(self, text):
+        return set(
+            Vulnerability.objects.filter(search_filter(text)).values_list('unique_key', flat=True)
+        )
+
+    def assert_search_matches(self):
+        self.assertEqual(self.search('CVE-2014-0160'), {'web1'})
+        self.assertEqual(self.search('10.0.0.5'), {'web1'})
+        self.assertEqual(self.search('web2.example'), {'web2'})
+        self.assertEqual(self.search('heartbleed'), {'web1', 'web2', 'db1'})
+        # Every term must match the finding or its plugin
+        self.assertEqual(self.search('apache db1'), {'db1'})
+        self.assertEqual(self.search('apache nomatch'), set())
+        # Quotes, brackets and operators are not passed to the index
+        self.assertEqual(self.search('"web1" (10.0.0.5*)'), {'web1'})
+        self.assertEqual(self.search('""'), set())
+
+    def test_index_search(self):
+        if not _backend('default'):
+            self.skipTest('No full-text index on this database')
+        self.assert_search_matches()
+
+    def test_fallback_search(self):
+        with mock.patch.dict(_backends, {'default': None}):
+            self.assert_search_matches()
+
+    def test_index_follows_updates(self):
+        Plugin.objects.filter(plugin_id='10107').update(plugin_name='Nginx')
+        Vulnerability.objects.filter(unique_key='db1').update(dns_name='db9.example.com')
+        self.assertEqual(self.search('nginx'), {'web2', 'db1'})
+        self.assertEqual(self.search('db1'), set())
+        self.assertEqual(self.search('db9'), {'db1'})
+
+    def test_ranking(self):
+        # web1's plugin is about nothing else; ties go to the most severe
+        self.assertEqual(
+            ranked_search_ids('openssl heartbleed'),
+            [self.findings[name].pk for name in ['web1', 'web2', 'db1']],
+        )
+        self.assertEqual(ranked_search_ids('   '), [])
+
+    def test_ranking_queries_each_index_once(self):
+        if not _backend('default'):
+            self.skipTest('No full-text index on this database')
+        hosts = [
+            Vulnerability.objects.create(
+                scan=self.findings['web1'].scan, plugin=self.findings['web2'].plugin, severity='low',
+                ip_address='10.2.0.1', dns_name=f'{name}.example.com', unique_key=name,
+            )
+            for name in ['apache0'] + [f'host{i}' for i in range(1, 20)]
+        ]
+        # The two index queries, the findings matched directly, and the
+        # count per plugin and best of those matched through their plugin
+        with self.assertNumQueries(5):
+            ids = ranked_search_ids('apache', limit=5)
+        self.assertEqual(ids, [hosts[0].pk, self.findings['web2'].pk, self.findings['db1'].pk] + [
+            host.pk for host in hosts[1:3]
+        ])
+        # Nothing matches through its plugin alone
+        with self.assertNumQueries(4):
+            ids = ranked_search_ids('heartbleed web1', limit=5)
+        self.assertEqual(ids, [self.findings['web1'].pk])
+
+
+class VulnerabilityExportTests(TestCase):
+    header = (
+        'CVE,Plugin ID,Plugin Name,Severity,Status,DNS Name,IP Address,Port,Synopsis,Description,'
+        'Remediation,First Discovered,Last Observed,Scan Name'
+    )
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user('analyst', password='x')
+        cls.scan = VulnerabilityScan.objects.create(name='week1.csv', file='scan.csv', status='done')
+        cls.plugin = Plugin.objects.create(plugin_id='10001', plugin_name='Test plugin', synopsis='Short')
+        cls.add_findings(['critical', 'low', 'critical'])
+
+    @classmethod
+    def add_findings(cls, severities):
+        for severity in severities:
+            Vulnerability.objects.create(
+                scan=cls.scan, plugin=cls.plugin, ip_address='10.0.0.1', dns_name='web1', port=443,
+                severity=severity, cve='CVE-2021-44228', unique_key=f'k{Vulnerability.objects.count()}',
+                first_discovered=date(2021, 10, 14),
+            )
+
+    def setUp(self):
+        self.client.force_login(self.user)
+        self.async_client = AsyncClient()
+        self.async_client.force_login(self.user)
+
+    def export(self, **params):
+        response = self.client.get(reverse('vulnerability_export'), params)
+        return b''.join(response.streaming_content).decode().splitlines()
+
+    def test_header_and_rows(self):
+        lines = self.export()
+        self.assertEqual(lines[0], self.header)
+        self.assertEqual(len(lines), 4)
+        self.assertEqual(
+            lines[1],
+            'CVE-2021-44228,10001,Test plugin,Critical,Open,web1,10.0.0.1,443,Short,,,2021-10-14,,week1.csv',
+        )
+
+    def test_filters(self):
+        self.assertEqual(len(self.export(severity='critical')), 3)
+        self.assertEqual(len(self.export(severity='low', status='open')), 2)
+        self.assertEqual(self.export(status='resolved'), [self.header])
+        self.assertEqual(self.export(scan='x'), self.export())
+
+    def test_query_count_does_not_grow_with_rows(self):
+        # Session, user and one query for the rows and their plugin and scan
+        for severities in [[], ['high'] * 20]:
+            self.add_findings(severities)
+            with self.assertNumQueries(3):
+                lines = self.export()
+            self.assertEqual(len(lines), Vulnerability.objects.count() + 1)
+
+    async def test_streams_asynchronously_under_asgi(self):
+        # A synchronous iterator would be read into a list before sending
+        with mock.patch('grc_dashboard.views.EXPORT_ROWS_PER_WRITE', 1):
+            response = await self.async_client.get(reverse('vulnerability_export'))
+            self.assertTrue(response.is_async)
+            chunks = [chunk async for chunk in response.streaming_content]
+        self.assertEqual(len(chunks), 4)
+        self.assertEqual(b''.join(chunks).decode().splitlines()[0], self.header)
+
+class DataExportTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user('analyst', password='x')
+        department = Department.objects.create(name='Security')
+        for severity in ['critical', 'low']:
+            Risk.objects.create(
+                title=f'{severity} risk\x07', description='', department=department,
+                severity=severity, likelihood=2, impact=3,
+            )
+
+    def setUp(self):
+        self.client.force_login(self.user)
+
+    def test_xlsx(self):
+        response = self.client.get(reverse('data_export', args=['risks', 'xlsx']))
+        sheet = openpyxl.load_workbook(io.BytesIO(b''.join(response.streaming_content)))['risks']
+        rows = list(sheet.values)
+        self.assertEqual(rows[0][:2], ('id', 'title'))
+        # Control characters are dropped from cells
+        self.assertEqual([row[1] for row in rows[1:]], ['critical risk', 'low risk'])
+
+    def test_parquet_without_pyarrow(self):
+        with mock.patch.object(exports, 'pyarrow', None):
+            response = self.client.get(reverse('data_export', args=['risks', 'parquet']))
+        self.assertEqual(response.status_code, 501)
+
+    def test_unknown_export(self):
+        self.assertEqual(self.client.get(reverse('data_export', args=['users', 'xlsx'])).status_code, 404)
+
+
+class VulnerabilityBulkStatusTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user('analyst', password='x')
+        cls.scan = VulnerabilityScan.objects.create(name='scan', file='scan.csv', status='done')
+        cls.plugin = Plugin.objects.create(plugin_id='10001', plugin_name='Test plugin')
+        other = Plugin.objects.create(plugin_id='10002', plugin_name='Other plugin')
+        for i, (plugin, status) in enumerate([
+            (cls.plugin, 'open'), (cls.plugin, 'open'), (other, 'open'), (other, 'false_positive'),
+        ]):
+            Vulnerability.objects.create(
+                scan=cls.scan, plugin=plugin, ip_address=f'10.0.0.{i}', dns_name=f'host{i}',
+                severity='high', status=status, unique_key=f'key-{i}',
+            )
+
+    def setUp(self):
+        self.client.force_login(self.user)
+
+    def post(self, body):
+        return self.client.post(reverse('vulnerability_bulk_status'), body, content_type='application/json')
+
+    def test_ids(self):
+        ids = list(Vulnerability.objects.filter(plugin=self.plugin).values_list('id', flat=True))
+        response = self.post({'status': 'resolved', 'ids': ids})
+        self.assertEqual(response.json()['updated'], 2)
+        self.assertEqual(Vulnerability.objects.filter(status='resolved').count(), 2)
+
+    def test_filter(self):
+        response = self.post({'status': 'resolved', 'filter': {'plugin': '10001', 'scan': self.scan.id}})
+        self.assertEqual(response.json()['updated'], 2)
+        self.assertEqual(set(Vulnerability.objects.filter(status='resolved').values_list('plugin_id', flat=True)), {'10001'})
+
+    def test_ids_must_be_integers(self):
+        pk = Vulnerability.objects.first().pk
+        for ids in [[True], [False], [pk, True], [str(pk)], [1.0], pk]:
+            with self.subTest(ids=ids):
+                self.assertEqual(self.post({'status': 'resolved', 'ids': ids}).status_code, 400)
+        self.assertFalse(Vulnerability.objects.filter(status='resolved').exists())
+
+    def test_filters_that_cannot_be_applied_are_rejected(self):
+        for criteria in [{}, {'plugin': ''}, {'scan': 'x'}, {'scan': 1.5}, {'scan': True}, {'scan': '-1'},
+                         {'scan': '²'}, {'plugin': ['10001']}, {'owner': 'x'}]:
+            with self.subTest(criteria=criteria):
+                self.assertEqual(self.post({'status': 'resolved', 'filter': criteria}).status_code, 400)
+        self.assertFalse(Vulnerability.objects.filter(status='resolved').exists())
+        self.assertEqual(Vulnerability.objects.filter(status='false_positive').count(), 1)
+
+    def test_audit_row(self):
+        self.post({'status': 'in_progress', 'filter': {'plugin': '10002', 'host': ''}})
+        change = VulnerabilityStatusChange.objects.get()
+        self.assertEqual(change.user, self.user)
+        self.assertEqual(change.criteria, {'plugin': '10002'})
+        # The false positive matches too; only findings already in the
+        # target status are skipped
+        self.assertEqual((change.findings_updated, change.hosts_affected), (2, 2))
+
+
+NESSUS_REPORT = b"""<?xml version="1.0" ?>
+<NessusClientData_v2>
+  <Policy><policyName>Weekly</policyName></Policy>
+  <Report name="weekly">
+    <ReportHost name="10.0.0.5">
+      <HostProperties>
+        <tag name="HOST_END">Thu Oct 14 23:30:00 2021</tag>
+        <tag name="netbios-name">WEB1</tag>
+        <tag name="host-fqdn">web1.example.com</tag>
+        <tag name="host-ip">10.0.0.5</tag>
+      </HostProperties>
+      <ReportItem port="443" svc_name="www" protocol="tcp" severity="4" pluginID="73412" pluginName="OpenSSL Heartbleed">
+        <synopsis>Memory disclosure</synopsis>
+        <description>Heartbeat over-read</description>
+        <solution>Upgrade OpenSSL</solution>
+        <cve>CVE-2014-0160</cve>
+        <plugin_output>Leaked 64KB</plugin_output>
+        <exploit_available>true</exploit_available>
+      </ReportItem>
+      <ReportItem port="0" svc_name="general" protocol="tcp" severity="0" pluginID="19506" pluginName="Scan Information">
+      </ReportItem>
+    </ReportHost>
+    <ReportHost name="db1">
+      <HostProperties>
+        <tag name="host-ip">10.0.0.9</tag>
+        <tag name="netbios-name">DB1</tag>
+      </HostProperties>
+      <ReportItem port="5432" severity="2" pluginID="10001" pluginName="Postgres">
+      </ReportItem>
+    </ReportHost>
+  </Report>
+</NessusClientData_v2>
+"""
+
+
+class CsvChunkTests(TestCase):
+    def test_a_finding_across_a_chunk_boundary(self):
+        # k2's plugin output spans lines, so the second line of the file ends
+        # inside it; chunks must still hold whole rows
+        content = (
+            b'Plugin,Plugin name,Severity,IP address,DNS name,Plugin Output,Key\n'
+            b'1001,Plugin 1001,High,10.0.0.1,web1,one line,k1\n'
+            b'1001,Plugin 1001,High,10.0.0.2,web2,"first line\nsecond line\nthird line",k2\n'
+            b'1001,Plugin 1001,High,10.0.0.3,web3,,k3\n'
+            b'1001,Plugin 1001,High,bad-ip,web4,,k4\n'
+            b'1001,Plugin 1001,High,10.0.0.5,web5,,k5\n'
+        )
+        path = write_temp_file(self, 'weekly.csv', content)
+        chunks = list(iter_scan_frames(path, chunk_rows=2))
+
+        self.assertEqual([list(frame.index) for frame, fraction in chunks], [[0, 1], [2, 3], [4]])
+        fractions = [fraction for frame, fraction in chunks]
+        self.assertEqual(fractions, sorted(fractions))
+        self.assertEqual(fractions[-1], 1.0)
+        frame = pd.concat(frame for frame, fraction in chunks)
+        self.assertEqual(frame['Key'].tolist(), ['k1', 'k2', 'k3', 'k4', 'k5'])
+        self.assertEqual(frame.loc[1, 'Plugin Output'], 'first line\nsecond line\nthird line')
+
+        scan = VulnerabilityScan.objects.create(name='weekly.csv', file='weekly.csv')
+        writer = VulnerabilityWriter(scan)
+        rejected = []
+        for chunk, fraction in chunks:
+            records, chunk_rejected = normalize_frame(chunk)
+            writer.write(records)
+            rejected += chunk_rejected
+        self.assertEqual((writer.created, writer.updated, writer.duplicates), (4, 0, 0))
+        self.assertEqual(rejected, [(3, "Invalid IP address 'bad-ip'")])
+        self.assertEqual(
+            Vulnerability.objects.get(unique_key='k2').plugin_output, 'first line\nsecond line\nthird line'
+        )
+
+
+class NessusParserTests(SimpleTestCase):
+    def frames(self, chunk_rows=10):
+        path = write_temp_file(self, 'weekly.nessus', NESSUS_REPORT)
+        return [frame for frame, fraction in iter_nessus_frames(path, chunk_rows)]
+
+    def test_report_items_become_rows(self):
+        frame = pd.concat(self.frames())
+        self.assertEqual(list(frame.index), [0, 1, 2])
+        heartbleed = frame.loc[0]
+        self.assertEqual(
+            heartbleed[['Plugin', 'Plugin name', 'Severity', 'IP address', 'DNS name', 'Port', 'Key']].tolist(),
+            ['73412', 'OpenSSL Heartbleed', '4', '10.0.0.5', 'web1.example.com', '443', '10.0.0.5-73412-443'],
+        )
+        self.assertEqual(
+            heartbleed[['synopsis', 'Description', 'Steps to remediate', 'CVE', 'Plugin Output', 'Exploit?']].tolist(),
+            ['Memory disclosure', 'Heartbeat over-read', 'Upgrade OpenSSL', 'CVE-2014-0160', 'Leaked 64KB', 'true'],
+        )
+        self.assertEqual(heartbleed['Last Observed'], 'Thu Oct 14 23:30:00 2021')
+        # host-ip wins over the ReportHost name; netbios-name stands in for a missing FQDN
+        self.assertEqual(
+            frame.loc[2, ['IP address', 'DNS name', 'Key']].tolist(), ['10.0.0.9', 'DB1', '10.0.0.9-10001-5432'],
+        )
+        self.assertTrue(pd.isna(frame.loc[2, 'Last Observed']))
+
+        records, rejected = normalize_frame(frame)
+        self.assertEqual([record['severity'] for record in records], ['critical', 'info', 'medium'])
+        self.assertEqual(records[0]['last_observed'], date(2021, 10, 14))
+        self.assertTrue(records[0]['exploit_available'])
+
+    def test_chunks_continue_the_row_numbers(self):
+        frames = self.frames(chunk_rows=2)
+        self.assertEqual([list(frame.index) for frame in frames], [[0, 1], [2]])
+
+    def test_finished_elements_are_released(self):
+        elements = []
+        iterparse = ElementTree.iterparse
+
+        def recording_iterparse(*args, **kwargs):
+            for event, elem in iterparse(*args, **kwargs):
+                elements.append(elem)
+                yield event, elem
+
+        with mock.patch('grc_dashboard.ingestion.ElementTree.iterparse', recording_iterparse):
+            self.frames()
+        for elem in elements:
+            if elem.tag in ('ReportItem', 'ReportHost', 'Policy'):
+                self.assertEqual((len(elem), elem.attrib), (0, {}), elem.tag)
+        report = next(elem for elem in elements if elem.tag == 'Report')
+        self.assertEqual(len(report), 0)
+
+
+class XlsxParserTests(SimpleTestCase):
+    def workbook(self, *rows):
+        workbook = openpyxl.Workbook()
+        for row in rows:
+            workbook.active.append(row)
+        content = io.BytesIO()
+        workbook.save(content)
+        return write_temp_file(self, 'report.xlsx', content.getvalue())
+
+    def test_header_below_a_preamble(self):
+        path = self.workbook(
+            ['Weekly vulnerability report'],
+            [],
+            ['Generated', '2021-10-14', 'Key'],
+            ['Plugin', 'Plugin name', 'Notes', 'IP address', 'Port', 'Key'],
+            [10001, 'Test plugin', 'ignored', '10.0.0.1', 443, 'k1'],
+            [10002, 'Short row'],
+        )
+        frames = list(iter_xlsx_frames(path, chunk_rows=1))
+        self.assertEqual([list(frame.index) for frame, fraction in frames], [[0], [1]])
+        self.assertEqual(frames[-1][1], 1.0)
+
+        frame = pd.concat(frame for frame, fraction in frames)
+        # Only mapped columns are kept, as strings; short rows are padded
+        self.assertEqual(list(frame.columns), ['Plugin', 'Plugin name', 'IP address', 'Port', 'Key'])
+        self.assertEqual(frame.loc[0].tolist(), ['10001', 'Test plugin', '10.0.0.1', '443', 'k1'])
+        self.assertEqual(frame.loc[1, 'Plugin'], '10002')
+        self.assertTrue(frame.loc[1, ['IP address', 'Port', 'Key']].isna().all())
+
+    def test_no_header_row(self):
+        path = self.workbook(*[['Summary', i] for i in range(30)], ['Plugin', 'Plugin name', 'IP address'])
+        with self.assertRaisesMessage(ValueError, 'No header row'):
+            list(iter_xlsx_frames(path))
+
+
+class NormalizeFrameTests(SimpleTestCase):
+    def normalize(self, **columns):
+        """Normalize one row per value, with defaults for the columns not given"""
+        rows = len(next(iter(columns.values())))
+        data = {'Plugin': ['1001'] * rows, 'IP address': ['10.0.0.1'] * rows}
+        data.update({column: list(values) for column, values in columns.items()})
+        if 'Key' not in columns:
+            data['Key'] = [f'k{i}' for i in range(rows)]
+        return normalize_frame(pd.DataFrame(data, dtype=object))
+
+    def test_severity(self):
+        records, rejected = self.normalize(Severity=['Critical', ' high ', '3', '3.0', 'Informational', 'bogus', None])
+        self.assertEqual(
+            [(record['severity'], record['severity_rank']) for record in records],
+            [('critical', 4), ('high', 3), ('high', 3), ('high', 3), ('info', 0), ('info', 0), ('info', 0)],
+        )
+
+    def test_port(self):
+        records, rejected = self.normalize(Port=['443', '8080.0', '-1', '70000', '1.5', 'tcp', None])
+        self.assertEqual([record['port'] for record in records], [443, 8080, None, None, None, None, None])
+
+    def test_dates_keep_the_written_day(self):
+        records, rejected = self.normalize(**{
+            'First discovered': ['2021-10-14T23:30:00-05:00', '2021-03-01T23:30:00-04:00', 'Oct 14, 2021', 'soon', None],
+        })
+        self.assertEqual(
+            [record['first_discovered'] for record in records],
+            [date(2021, 10, 14), date(2021, 3, 1), date(2021, 10, 14), None, None],
+        )
+        records, rejected = self.normalize(**{'Last Observed': ['2021-10-14T23:30:00-05:00']})
+        self.assertEqual(records[0]['last_observed'], date(2021, 10, 14))
+
+    def test_defaults(self):
+        records, rejected = self.normalize(**{'IP address': [None], 'Key': [''], 'Exploit?': ['Yes']})
+        self.assertEqual(
+            {field: records[0][field] for field in ['ip_address', 'dns_name', 'unique_key', 'exploit_available']},
+            {'ip_address': '0.0.0.0', 'dns_name': '0.0.0.0', 'unique_key': '0.0.0.0-1001', 'exploit_available': True},
+        )
+
+    def test_row_errors(self):
+        records, rejected = self.normalize(
+            Plugin=['1001', None, '1001', '1001', '1' * 51],
+            **{'IP address': ['10.0.0.1', None, 'not-an-ip', '10.0.0.1', '10.0.0.1']},
+            **{'DNS name': ['web1', None, 'web3', 'h' * 256, 'web5']},
+            Key=['k1', None, 'k3', 'k4', 'k5'],
+        )
+        self.assertEqual([record['unique_key'] for record in records], ['k1'])
+        self.assertEqual(sorted(rejected), [
+            (1, 'Blank row'),
+            (2, "Invalid IP address 'not-an-ip'"),
+            (3, 'DNS Name is longer than 255 characters'),
+            (4, 'Plugin ID is longer than 50 characters'),
+        ])
+
+    def test_long_text_is_cut_to_fit(self):
+        cves = ', '.join(f'CVE-2021-{44228 + i}' for i in range(5))
+        records, rejected = self.normalize(CVE=[cves], **{'Plugin name': ['p' * 300]})
+        self.assertEqual(records[0]['cve'], 'CVE-2021-44228, CVE-2021-44229, CVE-2021-44230')
+        self.assertEqual(len(records[0]['plugin_name']), 255)
+
+
+class VulnerabilityWriterTests(MediaRootTestCase):
+    def test_counts(self):
+        content = scan_csv(('k1', 'web1', '1001'), ('k2', 'web2', '1002'), ('k1', 'web1', '1001'))
+        content += b'1003,Plugin 1003,High,not-an-ip,web3,k3\n,,,,,\n'
+        scan = process_scan('week1.csv', content)
+
+        self.assertEqual(scan.status, 'done')
+        self.assertEqual(
+            (scan.vulnerabilities_found, scan.vulnerabilities_created, scan.vulnerabilities_updated),
+            (2, 2, 0),
+        )
+        self.assertEqual((scan.duplicate_rows, scan.rows_skipped), (1, 2))
+        self.assertEqual(
+            sorted(ScanRowError.objects.filter(scan=scan).values_list('message', flat=True)),
+            ['Blank row', "Invalid IP address 'not-an-ip'"],
+        )
+        self.assertEqual(Vulnerability.objects.count(), 2)
+        self.assertEqual(Plugin.objects.get(plugin_id='1002').plugin_name, 'Plugin 1002')
+
+    def test_a_later_scan_updates_existing_findings(self):
+        process_scan('week1.csv', scan_csv(('k1', 'web1', '1001'), ('k2', 'web2', '1001')))
+        scan = process_scan('week2.csv', scan_csv(('k1', 'web1-renamed', '1001'), ('k3', 'web3', '1001')))
+
+        self.assertEqual((scan.vulnerabilities_created, scan.vulnerabilities_updated), (1, 1))
+        finding = Vulnerability.objects.get(unique_key='k1')
+        self.assertEqual((finding.dns_name, finding.scan), ('web1-renamed', scan))
+        self.assertEqual(Vulnerability.objects.count(), 3)
+
+    def test_update_without_on_conflict(self):
+        process_scan('week1.csv', scan_csv(('k1', 'web1', '1001')))
+        with mock.patch.object(connection.features, 'supports_update_conflicts_with_target', False):
+            scan = process_scan('week2.csv', scan_csv(('k1', 'web1-renamed', '1001'), ('k2', 'web2', '1002')))
+
+        self.assertEqual((scan.vulnerabilities_created, scan.vulnerabilities_updated), (1, 1))
+        self.assertEqual(Vulnerability.objects.get(unique_key='k1').dns_name, 'web1-renamed')
+        self.assertEqual(Plugin.objects.get(plugin_id='1002').plugin_name, 'Plugin 1002')
+
+    def test_plugin_catalog_without_on_conflict(self):
+        process_scan('week1.csv', scan_csv(('k1', 'web1', '1001')))
+        plugin = Plugin.objects.get()
+        content = scan_csv(('k1', 'web1', '1001')).replace(b'Plugin 1001', b'Renamed plugin')
+        with mock.patch.object(connection.features, 'supports_update_conflicts_with_target', False):
+            process_scan('week2.csv', content)
+
+        renamed = Plugin.objects.get()
+        self.assertEqual((renamed.pk, renamed.plugin_name), (plugin.pk, 'Renamed plugin'))
+        self.assertGreater(renamed.updated_at, plugin.updated_at)
+
+    def test_update_without_on_conflict_looks_keys_up_once(self):
+        process_scan('week1.csv', scan_csv(('k1', 'web1', '1001'), ('k2', 'web2', '1001')))
+        scan = VulnerabilityScan.objects.create(name='week2.csv', file='week2.csv')
+        records, rejected = normalize_frame(pd.read_csv(
+            io.BytesIO(scan_csv(('k1', 'web1', '1001'), ('k2', 'web2', '1001'))), dtype=str,
+        ))
+        writer = VulnerabilityWriter(scan)
+        with mock.patch.object(connection.features, 'supports_update_conflicts_with_target', False), \
+                CaptureQueriesContext(connection) as queries:
+            writer.write(records)
+
+        self.assertEqual(writer.updated, 2)
+        lookups = [
+            query['sql'] for query in queries
+            if query['sql'].startswith('SELECT') and '"unique_key" IN' in query['sql']
+        ]
+        self.assertEqual(len(lookups), 1)
+
+    def test_duplicates_across_batches(self):
+        scan = VulnerabilityScan.objects.create(name='scan.csv', file='scan.csv')
+        records, rejected = normalize_frame(pd.read_csv(
+            io.BytesIO(scan_csv(('k1', 'web1', '1001'), ('k2', 'web2', '1001'), ('k1', 'web1', '1001'))),
+            dtype=str,
+        ))
+        writer = VulnerabilityWriter(scan, batch_size=2)
+        writer.write(records)
+        self.assertEqual((writer.created, writer.updated, writer.duplicates), (2, 0, 1))
+
+
+class RollupUpsertTests(TestCase):
+    """Rollups are rewritten in place, with or without ON CONFLICT DO UPDATE"""
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.scan = VulnerabilityScan.objects.create(name='scan', file='scan.csv', status='done')
+        cls.plugin = Plugin.objects.create(plugin_id='10001', plugin_name='Test plugin')
+
+    def add_finding(self, key, severity='high'):
+        return Vulnerability.objects.create(
+            scan=self.scan, plugin=self.plugin, ip_address='10.0.0.1', dns_name='web1',
+            severity=severity, unique_key=key,
+        )
+
+    def check_rollups(self):
+        self.add_finding('k1')
+        refresh_hosts(['web1'])
+        snapshot_trends()
+        host_pk = Host.objects.get().pk
+        snapshot_pks = set(VulnerabilityTrendSnapshot.objects.values_list('pk', flat=True))
+
+        self.add_finding('k2', severity='critical')
+        refresh_hosts(['web1'])
+        snapshot_trends()
+        host = Host.objects.get()
+        self.assertEqual((host.pk, host.total_count, host.critical_count), (host_pk, 2, 1))
+        self.assertEqual(set(VulnerabilityTrendSnapshot.objects.values_list('pk', flat=True)), snapshot_pks)
+        self.assertEqual(VulnerabilityTrendSnapshot.objects.get(severity='critical', status='open').count, 1)
+
+    def test_on_conflict(self):
+        if not connection.features.supports_update_conflicts_with_target:
+            self.skipTest('No ON CONFLICT DO UPDATE on this database')
+        self.check_rollups()
+
+    def test_without_on_conflict(self):
+        with mock.patch.object(connection.features, 'supports_update_conflicts_with_target', False):
+            self.check_rollups()
+
+
+class VulnerabilityTrendsTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user('analyst', password='x')
+        today = timezone.localdate()
+        for day, severity, status, count in [
+            (today - timedelta(days=10), 'high', 'open', 4),
+            (today - timedelta(days=1), 'high', 'open', 3),
+            (today - timedelta(days=1), 'high', 'in_progress', 2),
+            (today - timedelta(days=1), 'critical', 'resolved', 5),
+            (today, 'critical', 'open', 1),
+        ]:
+            VulnerabilityTrendSnapshot.objects.create(date=day, severity=severity, status=status, count=count)
+
+    def setUp(self):
+        self.client.force_login(self.user)
+
+    def trends(self, **params):
+        return self.client.get(reverse('vulnerability_trends'), params).json()
+
+    def test_series_per_severity(self):
+        today = timezone.localdate()
+        data = self.trends(days=2)
+        self.assertEqual(data['statuses'], ['open', 'in_progress'])
+        self.assertEqual(data['dates'], [(today - timedelta(days=1)).isoformat(), today.isoformat()])
+        self.assertEqual((data['series']['high'], data['series']['critical']), ([5, 0], [0, 1]))
+        self.assertEqual(data['series']['low'], [0, 0])
+
+    def test_window_and_status_filter(self):
+        self.assertEqual(len(self.trends()['dates']), 3)
+        data = self.trends(status='resolved')
+        self.assertEqual(data['series']['critical'], [5])
+
+    def test_invalid_parameters(self):
+        for params in [{'days': 'week'}, {'status': 'open,bogus'}]:
+            response = self.client.get(reverse('vulnerability_trends'), params)
+            self.assertEqual(response.status_code, 400)
+
+
+class ScanJobTests(MediaRootTestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user('analyst', password='x')
+
+    def queue(self, name, content, uploaded):
+        scan = VulnerabilityScan.objects.create(name=name, file=SimpleUploadedFile(name, content))
+        VulnerabilityScan.objects.filter(pk=scan.pk).update(upload_date=uploaded)
+        return scan
+
+    def status(self, scan):
+        self.client.force_login(self.user)
+        return self.client.get(reverse('vulnerability_scan_status', args=[scan.pk])).json()
+
+    def test_claims_the_oldest_queued_scan(self):
+        now = timezone.now()
+        newer = self.queue('newer.csv', scan_csv(('k1', 'web1', '1001')), now)
+        older = self.queue('older.csv', scan_csv(('k2', 'web2', '1001')), now - timedelta(hours=1))
+
+        claimed = claim_next_scan()
+        self.assertEqual(claimed, older)
+        self.assertEqual(claimed.status, 'running')
+        self.assertIsNotNone(claimed.started_at)
+        self.assertEqual(claimed.heartbeat_at, claimed.started_at)
+        # A running scan is not claimed again
+        self.assertEqual(claim_next_scan(), newer)
+        self.assertIsNone(claim_next_scan())
+
+    def test_status_while_queued_and_when_done(self):
+        scan = self.queue('week1.csv', scan_csv(('k1', 'web1', '1001')) + b'1002,Plugin 1002,High,bad-ip,web2,k2\n',
+                          timezone.now())
+        data = self.status(scan)
+        self.assertEqual((data['status'], data['progress'], data['eta_seconds']), ('queued', 0, None))
+
+        process_queued_scans()
+        data = self.status(scan)
+        self.assertEqual((data['status'], data['progress'], data['error']), ('done', 100.0, ''))
+        self.assertEqual((data['vulnerabilities_found'], data['rows_skipped'], data['hosts_scanned']), (1, 1, 1))
+        self.assertEqual(data['row_errors'], [{'row_number': 2, 'message': "Invalid IP address 'bad-ip'"}])
+        self.assertEqual(set(data['timings']), {'parse_seconds', 'normalize_seconds', 'write_seconds'})
+
+    def test_a_scan_that_cannot_be_read_fails(self):
+        scan = self.queue('broken.xlsx', b'not a workbook', timezone.now())
+        with self.assertLogs('grc_dashboard.ingestion', 'ERROR'):
+            process_queued_scans()
+        data = self.status(scan)
+        self.assertEqual(data['status'], 'failed')
+        self.assertTrue(data['error'])
+        self.assertIsNotNone(data['finished_at'])
+
+    def test_scans_left_running_by_a_dead_worker_fail(self):
+        now = timezone.now()
+        stale = self.queue('stale.csv', b'', now)
+        live = self.queue('live.csv', b'', now)
+        VulnerabilityScan.objects.filter(pk=stale.pk).update(
+            status='running', heartbeat_at=now - SCAN_LEASE - timedelta(minutes=1)
+        )
+        VulnerabilityScan.objects.filter(pk=live.pk).update(status='running', heartbeat_at=now)
+
+        self.assertEqual(fail_stale_scans(), 1)
+        data = self.status(stale)
+        self.assertEqual(data['status'], 'failed')
+        self.assertIn('Upload the file again', data['error'])
+        self.assertEqual(self.status(live)['status'], 'running')
+
+    def test_the_worker_fails_stale_scans_when_it_polls(self):
+        stale = self.queue('stale.csv', b'', timezone.now())
+        VulnerabilityScan.objects.filter(pk=stale.pk).update(
+            status='running', heartbeat_at=timezone.now() - SCAN_LEASE * 2
+        )
+        out = io.StringIO()
+        call_command('process_scans', once=True, stdout=out)
+        self.assertIn('Failed 1 scan(s)', out.getvalue())
+        stale.refresh_from_db()
+        self.assertEqual(stale.status, 'failed')
+
+
+class ScanTelemetryTests(MediaRootTestCase):
+    def test_phase_timings(self):
+        scan = process_scan('week1.csv', scan_csv(*[(f'k{i}', f'web{i}', '1001') for i in range(50)]))
+        self.assertEqual(scan.rows_processed, 50)
+        for field in ['parse_seconds', 'normalize_seconds', 'write_seconds']:
+            self.assertGreater(getattr(scan, field), 0, field)
+
+    def test_peak_memory_is_measured_per_scan(self):
+        if not reset_peak_memory():
+            self.skipTest('Peak RSS cannot be restarted on this platform')
+        # An earlier peak in the same worker process is not reported
+        resident_kb = peak_memory_kb()
+        ballast = bytearray(256 * 1024 * 1024)
+        for offset in range(0, len(ballast), 4096):
+            ballast[offset] = 1
+        del ballast
+        scan = process_scan('week1.csv', scan_csv(('k1', 'web1', '1001')))
+        self.assertGreater(scan.peak_memory_kb, 0)
+        self.assertLess(scan.peak_memory_kb, resident_kb + 128 * 1024)
+
+
+class ScanDeltaTests(MediaRootTestCase):
+    def deltas(self, scan):
+        return {
+            change: sorted(scan.deltas.filter(change=change).values_list('vulnerability__unique_key', flat=True))
+            for change in ['new', 'reappeared', 'missing']
+        }
+
+    def test_first_scan_of_a_scope_has_no_deltas(self):
+        scan = process_scan('week1.csv', scan_csv(('k1', 'web1', '1001')), scope='DMZ')
+        self.assertIsNone(scan.previous_scan)
+        self.assertFalse(scan.deltas.exists())
+
+    def test_changes_against_the_previous_scan(self):
+        week1 = process_scan('week1.csv', scan_csv(('k1', 'web1', '1001'), ('k2', 'web2', '1001')), scope='DMZ')
+        week2 = process_scan('week2.csv', scan_csv(('k1', 'web1', '1001'), ('k3', 'web3', '1001')), scope='DMZ')
+        self.assertEqual(week2.previous_scan, week1)
+        self.assertEqual(self.deltas(week2), {'new': ['k3'], 'reappeared': [], 'missing': ['k2']})
+        self.assertEqual((week2.vulnerabilities_created, week2.findings_missing), (1, 1))
+
+        # k2 was last seen two scans ago
+        week3 = process_scan('week3.csv', scan_csv(('k2', 'web2', '1001'), ('k3', 'web3', '1001')), scope='DMZ')
+        self.assertEqual(self.deltas(week3), {'new': [], 'reappeared': ['k2'], 'missing': ['k1']})
+        self.assertEqual(week3.findings_reappeared, 1)
+
+    def test_scans_of_other_scopes_are_not_compared(self):
+        process_scan('dmz.csv', scan_csv(('k1', 'web1', '1001')), scope='DMZ')
+        scan = process_scan('lan.csv', scan_csv(('k2', 'web2', '1001')), scope='LAN')
+        self.assertIsNone(scan.previous_scan)
+        self.assertEqual(scan.findings_missing, 0)
+
+    def test_failed_scans_are_not_compared(self):
+        week1 = process_scan('week1.csv', scan_csv(('k1', 'web1', '1001')), scope='DMZ')
+        with self.assertLogs('grc_dashboard.ingestion', 'ERROR'):
+            broken = process_scan('broken.csv', b'', scope='DMZ')
+        self.assertEqual(broken.status, 'failed')
+        week3 = process_scan('week3.csv', scan_csv(('k1', 'web1', '1001'), ('k2', 'web2', '1001')), scope='DMZ')
+        self.assertEqual(week3.previous_scan, week1)
+        self.assertEqual(self.deltas(week3), {'new': ['k2'], 'reappeared': [], 'missing': []})
+
+
+class ScanUploadTests(MediaRootTestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user('analyst', password='x')
+
+    def setUp(self):
+        self.client.force_login(self.user)
+
+    def upload(self, *files, **data):
+        return self.client.post(reverse('vulnerability_upload_scan'), {'scan_file': list(files), **data})
+
+    def zip_of(self, members):
+        archive = io.BytesIO()
+        with zipfile.ZipFile(archive, 'w') as zf:
+            for name, content in members.items():
+                zf.writestr(name, content)
+        return SimpleUploadedFile('scans.zip', archive.getvalue())
+
+    def test_single_file_keeps_the_entered_scope(self):
+        self.upload(SimpleUploadedFile('weekly.csv', scan_csv(('k1', 'web1', '1001'))), scope='DMZ')
+        self.assertEqual(VulnerabilityScan.objects.get().scope, 'DMZ')
+
+    def test_batch_members_get_their_own_scope(self):
+        self.upload(SimpleUploadedFile('first.csv', scan_csv(('k0', 'web0', '1001'))), scope='DMZ')
+        self.upload(self.zip_of({
+            'seg-a.csv': scan_csv(('k1', 'web1', '1001')),
+            'seg-b.csv': scan_csv(('k2', 'web2', '1001')),
+        }), scope='DMZ')
+        process_queued_scans()
+
+        scans = {scan.name: scan for scan in VulnerabilityScan.objects.all()}
+        self.assertEqual(scans['seg-a.csv'].scope, 'DMZ/seg-a')
+        self.assertEqual(scans['seg-b.csv'].scope, 'DMZ/seg-b')
+        # Neither segment is compared with the other, or with the DMZ scan
+        self.assertIsNone(scans['seg-b.csv'].previous_scan)
+        self.assertEqual(scans['seg-b.csv'].findings_missing, 0)
+
+    def test_batch_without_scope_is_scoped_by_file_name(self):
+        self.upload(
+            SimpleUploadedFile('seg-a.csv', scan_csv(('k1', 'web1', '1001'))),
+            SimpleUploadedFile('seg-b.csv', scan_csv(('k2', 'web2', '1001'))),
+        )
+        self.assertEqual(set(VulnerabilityScan.objects.values_list('scope', flat=True)), {'seg-a', 'seg-b'})
+
+    def test_zip_members_are_scoped_by_their_path(self):
+        self.upload(self.zip_of({
+            'east/export.csv': scan_csv(('k1', 'web1', '1001')),
+            'west/export.csv': scan_csv(('k2', 'web2', '1001')),
+        }), scope='DMZ', reconcile='on')
+        process_queued_scans()
+
+        self.assertEqual(
+            sorted(VulnerabilityScan.objects.values_list('name', 'scope')),
+            [('export.csv', 'DMZ/east/export'), ('export.csv', 'DMZ/west/export')],
+        )
+        # Reconciling west does not resolve east's findings
+        self.assertFalse(Vulnerability.objects.filter(status='resolved').exists())
+
+    def test_batch_with_repeated_scopes_is_rejected(self):
+        response = self.upload(
+            self.zip_of({'east/export.csv': scan_csv(('k1', 'web1', '1001'))}),
+            SimpleUploadedFile('export.csv', scan_csv(('k2', 'web2', '1001'))),
+            SimpleUploadedFile('export.xlsx', b''),
+            scope='DMZ',
+        )
+        self.assertRedirects(response, reverse('vulnerability_upload_scan'))
+        self.assertIn('would have the scope DMZ/export.', str(list(get_messages(response.wsgi_request))[-1]))
+        self.assertFalse(VulnerabilityScan.objects.exists())
+
+
+class ScanUploadDedupTests(MediaRootTestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user('analyst', password='x')
+
+    def setUp(self):
+        self.client.force_login(self.user)
+
+    def upload(self, *files):
+        response = self.client.post(reverse('vulnerability_upload_scan'), {'scan_file': list(files)})
+        return [str(message) for message in get_messages(response.wsgi_request)]
+
+    def test_digest_is_recorded(self):
+        content = scan_csv(('k1', 'web1', '1001'))
+        self.upload(SimpleUploadedFile('week1.csv', content))
+        self.assertEqual(VulnerabilityScan.objects.get().file_sha256, hashlib.sha256(content).hexdigest())
+
+    def test_identical_file_is_not_queued_again(self):
+        content = scan_csv(('k1', 'web1', '1001'))
+        self.upload(SimpleUploadedFile('week1.csv', content))
+        messages = self.upload(SimpleUploadedFile('renamed.csv', content))
+        self.assertEqual(VulnerabilityScan.objects.count(), 1)
+        self.assertIn('"week1.csv" was already uploaded', messages[-1])
+
+    def test_failed_scan_can_be_retried(self):
+        VulnerabilityScan.objects.create(
+            name='week1.csv', file='week1.csv', status='failed',
+            file_sha256=hashlib.sha256(scan_csv(('k1', 'web1', '1001'))).hexdigest(),
+        )
+        self.upload(SimpleUploadedFile('week1.csv', scan_csv(('k1', 'web1', '1001'))))
+        self.assertEqual(VulnerabilityScan.objects.filter(status='queued').count(), 1)
+
+    def test_zip_members_are_hashed_and_filtered(self):
+        member = scan_csv(('k1', 'web1', '1001'))
+        archive = io.BytesIO()
+        with zipfile.ZipFile(archive, 'w') as zf:
+            zf.writestr('exports/seg-a.csv', member)
+            zf.writestr('exports/.seg-a.csv', member)
+            zf.writestr('__MACOSX/exports/seg-a.csv', member)
+            zf.writestr('exports/notes.txt', b'not a scan')
+        self.upload(SimpleUploadedFile('scans.zip', archive.getvalue()))
+
+        scan = VulnerabilityScan.objects.get()
+        self.assertEqual((scan.name, scan.file_sha256), ('seg-a.csv', hashlib.sha256(member).hexdigest()))
+        with scan.file.open('rb') as stored:
+            self.assertEqual(stored.read(), member)
+
+    def test_zip_member_limit(self):
+        archive = io.BytesIO()
+        with zipfile.ZipFile(archive, 'w') as zf:
+            for i in range(MAX_ZIP_MEMBERS + 1):
+                zf.writestr(f'seg-{i}.csv', scan_csv((f'k{i}', 'web1', '1001')))
+        messages = self.upload(SimpleUploadedFile('scans.zip', archive.getvalue()))
+        self.assertIn(f'the limit is {MAX_ZIP_MEMBERS}', messages[-1])
+        self.assertFalse(VulnerabilityScan.objects.exists())
+
+
+class ScanReconcileTests(MediaRootTestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = User.objects.create_user('analyst', password='x')
+
+    def setUp(self):
+        self.client.force_login(self.user)
+
+    def upload(self, *files, **data):
+        response = self.client.post(reverse('vulnerability_upload_scan'), {'scan_file': list(files), **data})
+        process_queued_scans()
+        return response
+
+    def test_unobserved_findings_are_resolved_and_reopen(self):
+        self.upload(SimpleUploadedFile('week1.csv', scan_csv(('k1', 'web1', '1001'), ('k2', 'web2', '1001'))),
+                    scope='DMZ')
+        self.upload(SimpleUploadedFile('week2.csv', scan_csv(('k1', 'web1', '1001'))), scope='DMZ', reconcile='on')
+        week2 = VulnerabilityScan.objects.get(name='week2.csv')
+        resolved = Vulnerability.objects.get(unique_key='k2')
+        self.assertEqual((resolved.status, resolved.resolved_by_scan), ('resolved', week2))
+        self.assertEqual(week2.findings_resolved, 1)
+
+        self.upload(SimpleUploadedFile('week3.csv', scan_csv(('k2', 'web2', '1001'))), scope='DMZ')
+        reopened = Vulnerability.objects.get(unique_key='k2')
+        self.assertEqual((reopened.status, reopened.resolved_by_scan), ('open', None))
+
+    def test_other_scopes_are_left_alone(self):
+        self.upload(SimpleUploadedFile('lan.csv', scan_csv(('k1', 'web1', '1001'))), scope='LAN')
+        self.upload(SimpleUploadedFile('dmz.csv', scan_csv(('k2', 'web2', '1001'))), scope='DMZ', reconcile='on')
+        self.assertEqual(Vulnerability.objects.get(unique_key='k1').status, 'open')
+
+    def test_batch_members_do_not_resolve_each_other(self):
+        archive = io.BytesIO()
+        with zipfile.ZipFile(archive, 'w') as zf:
+            zf.writestr('seg-a.csv', scan_csv(('k1', 'web1', '1001')))
+            zf.writestr('seg-b.csv', scan_csv(('k2', 'web2', '1001')))
+        self.upload(SimpleUploadedFile('scans.zip', archive.getvalue()), reconcile='on')
+        self.assertFalse(Vulnerability.objects.filter(status='resolved').exists())
+
+    def test_reconcile_without_scope_is_rejected(self):
+        self.upload(SimpleUploadedFile('week1.csv', scan_csv(('k1', 'web1', '1001'))))
+        response = self.upload(SimpleUploadedFile('week2.csv', scan_csv(('k2', 'web2', '1001'))), reconcile='on')
+        self.assertRedirects(response, reverse('vulnerability_upload_scan'))
+        self.assertFalse(VulnerabilityScan.objects.filter(name='week2.csv').exists())
+        self.assertEqual(Vulnerability.objects.get(unique_key='k1').status, 'open')
+
+    def test_unscoped_scans_are_never_reconciled(self):
+        # Scans queued outside the upload form skip the view's check
+        self.upload(SimpleUploadedFile('week1.csv', scan_csv(('k1', 'web1', '1001'))))
+        scan = VulnerabilityScan.objects.create(
+            name='week2.csv', reconcile=True,
+            file=SimpleUploadedFile('week2.csv', scan_csv(('k2', 'web2', '1001'))),
+        )
+        process_queued_scans()
+        scan.refresh_from_db()
+        self.assertEqual(scan.findings_resolved, 0)
+        self.assertEqual(Vulnerability.objects.get(unique_key='k1').status, 'open')
@@ -0,0 +1,95 @@
+# grc_dashboard/uploadhandlers.py
+import hashlib
+import os
+import tempfile
+import zipfile
+
+from django.core.files import File
+from django.core.files.uploadhandler import FileUploadHandler
+
+
+# Upper bound on scan files accepted from one zip archive
+MAX_ZIP_MEMBERS = 100
+
+ZIP_READ_SIZE = 64 * 1024
+
+
+class HashingUploadHandler(FileUploadHandler):
+    """Computes a SHA-256 digest of each uploaded file while it is received.
+
+    Runs ahead of Django's storing handlers and passes every chunk through
+    unchanged. Digests are published on request.upload_digests, a dict of
+    field name -> list of hex digests in upload order.
+    """
+
+    def new_file(self, *args, **kwargs):
+        super().new_file(*args, **kwargs)
+        self.sha256 = hashlib.sha256()
+
+    def receive_data_chunk(self, raw_data, start):
+        self.sha256.update(raw_data)
+        return raw_data
+
+    def file_complete(self, file_size):
+        if self.request is not None:
+            if not hasattr(self.request, 'upload_digests'):
+                self.request.upload_digests = {}
+            self.request.upload_digests.setdefault(self.field_name, []).append(self.sha256.hexdigest())
+        # Let the next handler build the uploaded file object
+        return None
+
+
+def uploaded_file_digest(request, field_name, index=0):
+    """Return the SHA-256 of the index-th file uploaded under field_name"""
+    digests = getattr(request, 'upload_digests', {}).get(field_name, [])
+    if index < len(digests):
+        return digests[index]
+
+    # The handler is not installed (e.g. custom FILE_UPLOAD_HANDLERS)
+    uploaded = request.FILES.getlist(field_name)[index]
+    sha256 = hashlib.sha256()
+    for chunk in uploaded.chunks():
+        sha256.update(chunk)
+    uploaded.seek(0)
+    return sha256.hexdigest()
+
+
+def _scan_members(archive, extensions):
+    members = [
+        info for info in archive.infolist()
+        if not info.is_dir()
+        and not os.path.basename(info.filename).startswith('.')
+        and not info.filename.startswith('__MACOSX/')
+        and info.filename.endswith(extensions)
+    ]
+    if len(members) > MAX_ZIP_MEMBERS:
+        raise ValueError(f'Archive contains {len(members)} scan files; the limit is {MAX_ZIP_MEMBERS}.')
+    return members
+
+
+def zip_member_names(uploaded, extensions):
+    """Return the paths inside an uploaded zip of the files iter_zip_members() yields"""
+    with zipfile.ZipFile(uploaded) as archive:
+        names = [info.filename for info in _scan_members(archive, extensions)]
+    uploaded.seek(0)
+    return names
+
+
+def iter_zip_members(uploaded, extensions):
+    """Yield (path, File, sha256) for each file in an uploaded zip with a matching extension.
+
+    The path is the member's path inside the archive; the File is named
+    after its base name. Members are extracted one at a time to a temporary
+    file, hashed on the way, and closed once the caller has stored them.
+    """
+    with zipfile.ZipFile(uploaded) as archive:
+        for info in _scan_members(archive, extensions):
+            name = os.path.basename(info.filename)
+            sha256 = hashlib.sha256()
+            with tempfile.TemporaryFile() as extracted:
+                with archive.open(info) as member:
+                    for chunk in iter(lambda: member.read(ZIP_READ_SIZE), b''):
+                        sha256.update(chunk)
+                        extracted.write(chunk)
+                extracted.seek(0)
+                yield info.filename, File(extracted, name=name), sha256.hexdigest()
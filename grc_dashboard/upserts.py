@@ -0,0 +1,47 @@
+# grc_dashboard/upserts.py
+from django.db import connections, transaction
+
+
+def bulk_upsert(model, objs, unique_fields, update_fields, batch_size=None):
+    """Insert objs, updating update_fields of the rows they collide with on unique_fields.
+
+    Backends with ON CONFLICT DO UPDATE get one upsert statement per batch.
+    Elsewhere the existing rows are looked up on unique_fields (objects with
+    a pk set are taken as existing), then updated with bulk_update() and the
+    rest inserted with bulk_create(); primary keys are kept either way.
+    """
+    if not objs:
+        return
+    manager = model._default_manager
+    connection = connections[manager.db]
+    if connection.features.supports_update_conflicts_with_target:
+        manager.bulk_create(
+            objs,
+            batch_size=batch_size,
+            update_conflicts=True,
+            unique_fields=unique_fields,
+            update_fields=update_fields,
+        )
+        return
+
+    unmatched = [obj for obj in objs if obj.pk is None]
+    if unmatched:
+        # Narrowed on the first unique field, matched on all of them
+        first = unique_fields[0]
+        existing = {
+            tuple(row[1:]): row[0]
+            for row in manager.filter(**{f'{first}__in': {getattr(obj, first) for obj in unmatched}})
+            .values_list('pk', *unique_fields)
+        }
+        for obj in unmatched:
+            obj.pk = existing.get(tuple(getattr(obj, field) for field in unique_fields))
+
+    to_update = [obj for obj in objs if obj.pk is not None]
+    # bulk_update() does not fill auto_now fields the way bulk_create() does
+    fields = [field for field in model._meta.concrete_fields if field.name in update_fields]
+    for obj in to_update:
+        for field in fields:
+            field.pre_save(obj, add=False)
+    with transaction.atomic(using=manager.db):
+        manager.bulk_update(to_update, update_fields, batch_size=batch_size)
+        manager.bulk_create([obj for obj in objs if obj.pk is None], batch_size=batch_size)
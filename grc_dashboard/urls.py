@@ -4,6 +4,8 @@ from . import views
 urlpatterns = [
     # Dashboard
     path('', views.dashboard, name='dashboard'),
+    path('dashboard/stats/', views.dashboard_stats, name='dashboard_stats'),
+    path('dashboard/cache-stats/', views.dashboard_cache_stats, name='dashboard_cache_stats'),
     
     # Risk Management
     path('risks/', views.risk_register, name='risk_register'),
@@ -39,8 +41,15 @@ urlpatterns = [
     path('vulnerabilities/', views.vulnerability_management, name='vulnerability_management'),
     path('vulnerabilities/<int:pk>/', views.vulnerability_detail, name='vulnerability_detail'),
     path('vulnerabilities/upload/', views.vulnerability_upload_scan, name='vulnerability_upload_scan'),
+    path('vulnerabilities/trends/', views.vulnerability_trends, name='vulnerability_trends'),
+    path('vulnerabilities/search/', views.vulnerability_search, name='vulnerability_search'),
+    path('vulnerabilities/hosts/', views.host_list, name='host_list'),
+    path('vulnerabilities/bulk-status/', views.vulnerability_bulk_status, name='vulnerability_bulk_status'),
     path('vulnerabilities/<int:pk>/update-status/', views.vulnerability_update_status, name='vulnerability_update_status'),
     path('vulnerabilities/<int:pk>/add-note/', views.vulnerability_add_note, name='vulnerability_add_note'),
     path('vulnerabilities/scans/<int:pk>/delete/', views.vulnerability_scan_delete, name='vulnerability_scan_delete'),
+    path('vulnerabilities/scans/<int:pk>/status/', views.vulnerability_scan_status, name='vulnerability_scan_status'),
+    path('vulnerabilities/scans/<int:pk>/delta/', views.vulnerability_scan_delta, name='vulnerability_scan_delta'),
     path('vulnerabilities/export/', views.vulnerability_export, name='vulnerability_export'),
+    path('exports/<str:dataset>.<str:fmt>', views.data_export, name='data_export'),
 ]
\ No newline at end of file
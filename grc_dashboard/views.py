@@ -1,80 +1,75 @@
 # grc_dashboard/views.py
+from asgiref.sync import sync_to_async
 from django.shortcuts import render, get_object_or_404, redirect
+from django.urls import reverse
 from django.contrib.auth.decorators import login_required
-from django.http import JsonResponse, HttpResponse
-from django.db.models import Count, Q, Avg
+from django.core.handlers.asgi import ASGIRequest
+from django.http import FileResponse, Http404, JsonResponse, StreamingHttpResponse
+from django.views.decorators.http import condition
+from django.db import transaction
+from django.db.models import Avg, Case, Count, F, Max, Q, Sum, Value, When, Window
+from django.db.models.functions import RowNumber
 from django.utils import timezone
 from django.contrib import messages
+from django.core.paginator import Paginator
+from collections import Counter
 from datetime import timedelta
-import pandas as pd
+from urllib.parse import urlencode
 import csv
+import hashlib
+import json
+import os
+import tempfile
+import zipfile
 
 from .models import Risk, ComplianceControl, Audit, Issue, Department, Artifact
 from .forms import RiskForm, ComplianceControlForm, AuditForm, IssueForm
+from .exports import DATASETS, EXPORT_FORMATS, write_export
+from .ingestion import SCAN_FILE_EXTENSIONS
+from .decorators import async_login_required
+from .metrics import STATS_MODULES, acompute_dashboard_metrics, aget_dashboard_metrics, cache_stats
+from .rollups import refresh_hosts
+from .pagination import capped_count, keyset_page
+from .search import ranked_search_ids, search_filter
+from .stats import ArtifactStats, IssueStats, VulnerabilityStats
+from .uploadhandlers import iter_zip_members, uploaded_file_digest, zip_member_names
 
-@login_required
-def dashboard(request):
+
+# Findings listed in the detail page's related panel; the rest are a link
+# to the filtered list
+RELATED_LIMIT = 10
+
+# Query parameters accepted by the vulnerability list, exports and bulk updates
+VULNERABILITY_FILTERS = ['severity', 'status', 'scan', 'host', 'cve', 'plugin', 'search']
+
+# Most ids accepted by one bulk status change
+BULK_STATUS_MAX_IDS = 10000
+
+# Risk ids listed per heatmap cell
+HEATMAP_TOP_RISKS = 5
+
+
+@async_login_required
+async def dashboard(request):
     """Main GRC dashboard with key metrics and visualizations"""
-    
-    # Risk metrics
-    total_risks = Risk.objects.count()
-    critical_risks = Risk.objects.filter(severity='critical', status__in=['open', 'in_progress']).count()
-    open_risks = Risk.objects.filter(status='open').count()
-    
-    # Compliance metrics
-    total_controls = ComplianceControl.objects.count()
-    compliant_controls = ComplianceControl.objects.filter(status='compliant').count()
-    non_compliant_controls = ComplianceControl.objects.filter(status='non_compliant').count()
-    compliance_rate = (compliant_controls / total_controls * 100) if total_controls > 0 else 0
-    
-    # Audit metrics
-    total_audits = Audit.objects.count()
-    upcoming_audits = Audit.objects.filter(
-        status='planned',
-        start_date__lte=timezone.now().date() + timedelta(days=30)
-    ).count()
-    in_progress_audits = Audit.objects.filter(status='in_progress').count()
-    
-    # Issue metrics
-    total_issues = Issue.objects.count()
-    open_issues = Issue.objects.filter(status__in=['open', 'in_progress']).count()
-    overdue_issues = Issue.objects.filter(
-        status__in=['open', 'in_progress'],
-        due_date__lt=timezone.now().date()
-    ).count()
-    
-    # Risk by severity
-    risks_by_severity = Risk.objects.values('severity').annotate(count=Count('id'))
-    
-    # Compliance by status
-    compliance_by_status = ComplianceControl.objects.values('status').annotate(count=Count('id'))
-    
-    # Recent activities
-    recent_risks = Risk.objects.select_related('department', 'owner').order_by('-created_at')[:5]
-    recent_audits = Audit.objects.select_related('department', 'auditor').order_by('-created_at')[:5]
-    recent_issues = Issue.objects.select_related('department', 'assigned_to').order_by('-created_at')[:5]
-    
-    context = {
-        'total_risks': total_risks,
-        'critical_risks': critical_risks,
-        'open_risks': open_risks,
-        'total_controls': total_controls,
-        'compliance_rate': round(compliance_rate, 1),
-        'non_compliant_controls': non_compliant_controls,
-        'total_audits': total_audits,
-        'upcoming_audits': upcoming_audits,
-        'in_progress_audits': in_progress_audits,
-        'total_issues': total_issues,
-        'open_issues': open_issues,
-        'overdue_issues': overdue_issues,
-        'risks_by_severity': risks_by_severity,
-        'compliance_by_status': compliance_by_status,
-        'recent_risks': recent_risks,
-        'recent_audits': recent_audits,
-        'recent_issues': recent_issues,
-    }
-    
-    return render(request, 'grc_dashboard/dashboard.html', context)
+    metrics = await aget_dashboard_metrics()
+    return await sync_to_async(render)(request, 'grc_dashboard/dashboard.html', metrics)
+
+
+@async_login_required
+async def dashboard_stats(request):
+    """API endpoint for every module's headline counts, computed live"""
+    metrics = await acompute_dashboard_metrics(STATS_MODULES)
+    return JsonResponse({
+        name: value for name, value in metrics.items()
+        if not name.startswith('recent_')
+    })
+
+
+@async_login_required
+async def dashboard_cache_stats(request):
+    """API endpoint for the dashboard cache's hit and miss counters"""
+    return JsonResponse(await sync_to_async(cache_stats)())
 
 
 @login_required
@@ -107,23 +102,70 @@ def risk_register(request):
     return render(request, 'grc_dashboard/risk_register.html', context)
 
 
+def _heatmap_risks(request):
+    """Risks matching the heatmap's department, severity and status filters"""
+    risks = Risk.objects.order_by()
+    if request.GET.get('department', '').isdigit():
+        risks = risks.filter(department_id=request.GET['department'])
+    if request.GET.get('severity'):
+        risks = risks.filter(severity=request.GET['severity'])
+    if request.GET.get('status'):
+        risks = risks.filter(status=request.GET['status'])
+    return risks
+
+
+def _heatmap_etag(request):
+    # Latest change and row count of the filtered risks; the count catches
+    # deletes, which a Last-Modified date would miss, so there is none
+    version = _heatmap_risks(request).aggregate(latest=Max('updated_at'), count=Count('id'))
+    latest = version['latest'].timestamp() if version['latest'] else 0
+    key = f"{latest}-{version['count']}-{request.GET.urlencode()}"
+    return hashlib.md5(key.encode(), usedforsecurity=False).hexdigest()
+
+
 @login_required
+@condition(etag_func=_heatmap_etag)
 def risk_heatmap_data(request):
-    """API endpoint for risk heatmap data"""
-    risks = Risk.objects.all()
-    
-    data = []
-    for risk in risks:
-        data.append({
-            'id': risk.id,
-            'title': risk.title,
-            'likelihood': risk.likelihood,
-            'impact': risk.impact,
-            'severity': risk.severity,
-            'department': risk.department.name,
+    """API endpoint for the 5x5 likelihood x impact heatmap.
+
+    Returns the risk count and the most severe risk ids of each occupied
+    cell, from one windowed query. Filters: ?department=, ?severity=,
+    ?status=; ?top= sets the ids per cell (default 5, at most 20).
+    """
+    try:
+        top = max(1, min(int(request.GET.get('top', HEATMAP_TOP_RISKS)), 20))
+    except ValueError:
+        return JsonResponse({'error': 'top must be an integer'}, status=400)
+    
+    cell = [F('likelihood'), F('impact')]
+    severity_rank = Case(
+        *[When(severity=severity, then=Value(rank)) for rank, (severity, label) in enumerate(reversed(Risk.SEVERITY_CHOICES))],
+        default=Value(-1),
+    )
+    ranked = (
+        _heatmap_risks(request)
+        .annotate(
+            cell_count=Window(Count('id'), partition_by=cell),
+            cell_rank=Window(RowNumber(), partition_by=cell, order_by=[severity_rank.desc(), F('id').desc()]),
+        )
+        .filter(cell_rank__lte=top)
+        .values_list('likelihood', 'impact', 'cell_count', 'id')
+    )
+    
+    cells = {}
+    for likelihood, impact, count, risk_id in ranked:
+        entry = cells.setdefault((likelihood, impact), {
+            'likelihood': likelihood,
+            'impact': impact,
+            'count': count,
+            'top_risk_ids': [],
         })
+        entry['top_risk_ids'].append(risk_id)
     
-    return JsonResponse({'risks': data})
+    return JsonResponse({
+        'total': sum(entry['count'] for entry in cells.values()),
+        'cells': sorted(cells.values(), key=lambda entry: (-entry['likelihood'], entry['impact'])),
+    })
 
 
 @login_required
@@ -192,6 +234,7 @@ def issue_tracking(request):
     
     context = {
         'issues': issues,
+        'stats': IssueStats.for_queryset(issues),
         'priority_filter': priority_filter,
         'status_filter': status_filter,
     }
@@ -271,15 +314,8 @@ def artifacts(request):
     # Get all departments for filter dropdown
     departments = Department.objects.all()
     
-    # Calculate statistics by category
-    all_artifacts = Artifact.objects.all()
-    stats = {
-        'total': all_artifacts.count(),
-        'policy': all_artifacts.filter(category='policy').count(),
-        'certification': all_artifacts.filter(category='certification').count(),
-        'evidence': all_artifacts.filter(category='evidence').count(),
-        'documents': all_artifacts.filter(category__in=['policy', 'procedure']).count(),
-    }
+    # Statistics by category, over all artifacts
+    stats = ArtifactStats.for_queryset(Artifact.objects.all())
     
     context = {
         'artifacts': artifacts_list,
@@ -417,74 +453,209 @@ def user_guide(request):
 # VULNERABILITY MANAGEMENT VIEWS
 # ============================================================================
 
+def _is_scan_id(value):
+    return value.isascii() and value.isdigit()
+
+
+def _filter_vulnerabilities(params, vulnerabilities):
+    """Apply the severity, status, scan, host, cve, plugin and search filters in params.
+
+    params is a query string (request.GET) or a dict of the same keys.
+    Returns the filtered queryset and a dict of the filter values in use.
+    """
+    filters = {key: str(params.get(key, '')) for key in VULNERABILITY_FILTERS}
+    if not _is_scan_id(filters['scan']):
+        # Not applied, so not reported as in use either
+        filters['scan'] = ''
+    
+    if filters['severity']:
+        vulnerabilities = vulnerabilities.filter(severity=filters['severity'])
+    if filters['status']:
+        vulnerabilities = vulnerabilities.filter(status=filters['status'])
+    if filters['scan']:
+        vulnerabilities = vulnerabilities.filter(scan_id=filters['scan'])
+    if filters['host']:
+        vulnerabilities = vulnerabilities.filter(dns_name=filters['host'])
+    if filters['cve']:
+        vulnerabilities = vulnerabilities.filter(cve=filters['cve'])
+    if filters['plugin']:
+        vulnerabilities = vulnerabilities.filter(plugin_id=filters['plugin'])
+    if filters['search']:
+        vulnerabilities = vulnerabilities.filter(search_filter(filters['search']))
+    
+    return vulnerabilities, filters
+
+
 @login_required
 def vulnerability_management(request):
-    """Main vulnerability management view"""
-    from .models import Vulnerability, VulnerabilityScan
+    """Main vulnerability management view, one keyset page at a time"""
+    from .models import Host, Vulnerability, VulnerabilityScan
     
-    vulnerabilities = Vulnerability.objects.select_related('scan').all()
+    vulnerabilities, filters = _filter_vulnerabilities(request.GET, Vulnerability.objects.select_related('plugin'))
     scans = VulnerabilityScan.objects.all()
     
-    # Apply filters
-    severity_filter = request.GET.get('severity')
-    status_filter = request.GET.get('status')
-    scan_filter = request.GET.get('scan')
-    search_query = request.GET.get('search')
-    
-    if severity_filter:
-        vulnerabilities = vulnerabilities.filter(severity=severity_filter)
-    if status_filter:
-        vulnerabilities = vulnerabilities.filter(status=status_filter)
-    if scan_filter:
-        vulnerabilities = vulnerabilities.filter(scan_id=scan_filter)
-    if search_query:
-        vulnerabilities = vulnerabilities.filter(
-            Q(cve__icontains=search_query) |
-            Q(dns_name__icontains=search_query) |
-            Q(ip_address__icontains=search_query) |
-            Q(plugin_name__icontains=search_query)
-        )
+    cursor = request.GET.get('after')
+    page, next_cursor = keyset_page(vulnerabilities, cursor)
+    match_count, more_matches = capped_count(vulnerabilities)
+    filter_query = urlencode({key: value for key, value in filters.items() if value})
     
     # Statistics
-    stats = {
-        'total': Vulnerability.objects.count(),
-        'critical': Vulnerability.objects.filter(severity='critical', status='open').count(),
-        'high': Vulnerability.objects.filter(severity='high', status='open').count(),
-        'affected_hosts': Vulnerability.objects.values('dns_name').distinct().count(),
-    }
+    stats = VulnerabilityStats.for_queryset(Vulnerability.objects.all())
+    affected_hosts = Host.objects.count()
     
     context = {
-        'vulnerabilities': vulnerabilities,
+        'vulnerabilities': page,
+        'match_count': match_count,
+        'more_matches': more_matches,
+        'next_cursor': next_cursor,
+        'is_first_page': not cursor,
+        'filter_query': filter_query,
         'scans': scans,
         'stats': stats,
-        'severity_filter': severity_filter,
-        'status_filter': status_filter,
-        'scan_filter': scan_filter,
-        'search_query': search_query,
+        'affected_hosts': affected_hosts,
+        'severity_filter': filters['severity'],
+        'status_filter': filters['status'],
+        'scan_filter': filters['scan'],
+        'host_filter': filters['host'],
+        'cve_filter': filters['cve'],
+        'plugin_filter': filters['plugin'],
+        'search_query': filters['search'],
     }
     
     return render(request, 'grc_dashboard/vulnerability_management.html', context)
 
 
 @login_required
-def vulnerability_detail(request, pk):
-    """Detailed view of a single vulnerability"""
+def vulnerability_trends(request):
+    """API endpoint for daily finding counts per severity, from the trend snapshots.
+
+    ?days= limits the window (default 365); ?status= takes a comma-separated
+    list of statuses to count (default open and in progress).
+    """
+    from .models import Vulnerability, VulnerabilityTrendSnapshot
+    
+    try:
+        days = min(int(request.GET.get('days', 365)), 3650)
+    except ValueError:
+        return JsonResponse({'error': 'days must be an integer'}, status=400)
+    statuses = [status for status in request.GET.get('status', 'open,in_progress').split(',') if status]
+    unknown = set(statuses) - set(dict(Vulnerability.STATUS_CHOICES))
+    if unknown:
+        return JsonResponse({'error': f"Unknown status: {', '.join(sorted(unknown))}"}, status=400)
+    
+    since = timezone.localdate() - timedelta(days=days - 1)
+    rows = (
+        VulnerabilityTrendSnapshot.objects.filter(date__gte=since, status__in=statuses)
+        .values('date', 'severity')
+        .annotate(total=Sum('count'))
+        .order_by('date', 'severity')
+    )
+    
+    dates = []
+    series = {severity: [] for severity, label in Vulnerability.SEVERITY_CHOICES}
+    for row in rows:
+        if not dates or dates[-1] != row['date']:
+            dates.append(row['date'])
+            for counts in series.values():
+                counts.append(0)
+        series[row['severity']][-1] = row['total']
+    
+    return JsonResponse({
+        'statuses': statuses,
+        'dates': [date.isoformat() for date in dates],
+        'series': series,
+    })
+
+
+@login_required
+def vulnerability_search(request):
+    """API endpoint for ranked full-text search over vulnerabilities"""
     from .models import Vulnerability
     
-    vulnerability = get_object_or_404(Vulnerability, pk=pk)
-    notes = vulnerability.notes.all()
+    query = request.GET.get('q', '')
+    try:
+        limit = min(int(request.GET.get('limit', 20)), 100)
+    except ValueError:
+        return JsonResponse({'error': 'limit must be an integer'}, status=400)
+    
+    ids = ranked_search_ids(query, limit)
+    found = Vulnerability.objects.select_related('plugin').in_bulk(ids)
+    results = [
+        {
+            'id': vuln.id,
+            'cve': vuln.cve,
+            'plugin_id': vuln.plugin_id,
+            'plugin_name': vuln.plugin.plugin_name,
+            'severity': vuln.severity,
+            'status': vuln.status,
+            'dns_name': vuln.dns_name,
+            'ip_address': vuln.ip_address,
+            'port': vuln.port,
+            'url': reverse('vulnerability_detail', args=[vuln.id]),
+        }
+        for vuln in (found[pk] for pk in ids if pk in found)
+    ]
+    
+    return JsonResponse({'query': query, 'results': results})
+
+
+@login_required
+def host_list(request):
+    """Hosts with their vulnerability counts, read from the Host rollup"""
+    from .models import Host
+    
+    hosts = Host.objects.all()
+    search_query = request.GET.get('search', '').strip()
+    if search_query:
+        hosts = hosts.filter(Q(dns_name__icontains=search_query) | Q(ip_address__icontains=search_query))
+    
+    page = Paginator(hosts, 100).get_page(request.GET.get('page'))
+    
+    context = {
+        'hosts': page,
+        'search_query': search_query,
+    }
+    
+    return render(request, 'grc_dashboard/host_list.html', context)
+
+
+@login_required
+def vulnerability_detail(request, pk):
+    """Detailed view of a single vulnerability"""
+    from .models import Host, Vulnerability
     
-    # Get all vulnerabilities for the same CVE
-    related_vulns = Vulnerability.objects.filter(cve=vulnerability.cve).exclude(pk=pk)
+    vulnerability = get_object_or_404(Vulnerability.objects.select_related('plugin', 'scan'), pk=pk)
+    notes = vulnerability.notes.select_related('user')
     
-    # Get all vulnerabilities on the same host
+    # The same finding elsewhere: by CVE, or by plugin where there is none
+    if vulnerability.cve:
+        related = Vulnerability.objects.filter(cve=vulnerability.cve)
+        related_filter = {'cve': vulnerability.cve}
+    else:
+        related = Vulnerability.objects.filter(plugin_id=vulnerability.plugin_id)
+        related_filter = {'plugin': vulnerability.plugin_id}
+    
+    # Both queries are served from the (cve|plugin, dns_name, status) index
+    related_stats = related.aggregate(
+        findings=Count('id'),
+        hosts=Count('dns_name', distinct=True),
+        open=Count('id', filter=Q(status__in=['open', 'in_progress'])),
+        resolved=Count('id', filter=Q(status='resolved')),
+    )
+    related_vulns = related.exclude(pk=pk).order_by('dns_name', 'status', 'id')[:RELATED_LIMIT]
+    
+    # Most severe other findings on the same host, with the host's rollup
     same_host_vulns = Vulnerability.objects.filter(dns_name=vulnerability.dns_name).exclude(pk=pk)[:10]
+    host = Host.objects.filter(dns_name=vulnerability.dns_name).first()
     
     context = {
         'vulnerability': vulnerability,
         'notes': notes,
         'related_vulns': related_vulns,
+        'related_stats': related_stats,
+        'related_url': f"{reverse('vulnerability_management')}?{urlencode(related_filter)}",
         'same_host_vulns': same_host_vulns,
+        'host': host,
     }
     
     return render(request, 'grc_dashboard/vulnerability_detail.html', context)
@@ -492,141 +663,199 @@ def vulnerability_detail(request, pk):
 
 @login_required
 def vulnerability_upload_scan(request):
-    """Upload and process vulnerability scan file"""
-    from .models import VulnerabilityScan
-    
+    """Upload one or more scan files, or a zip of them, and queue each for processing"""
     if request.method == 'POST':
-        if 'scan_file' not in request.FILES:
+        uploads = request.FILES.getlist('scan_file')
+        if not uploads:
             messages.error(request, 'No file uploaded')
             return redirect('vulnerability_management')
         
-        scan_file = request.FILES['scan_file']
+        scope = request.POST.get('scope', '').strip()[:100]
+        reconcile = request.POST.get('reconcile') == 'on'
+        batch = len(uploads) > 1 or any(scan_file.name.endswith('.zip') for scan_file in uploads)
+        if reconcile and not scope and not batch:
+            # Unscoped scans all share the blank scope, so reconciling would
+            # resolve the open findings of every one of them
+            messages.error(request, 'Enter a scan scope to resolve findings no longer observed.')
+            return redirect('vulnerability_upload_scan')
+        if batch:
+            scopes = Counter(_member_scope(scope, name, batch) for name in _upload_names(uploads))
+            repeated = sorted(member_scope for member_scope, count in scopes.items() if count > 1)
+            if repeated:
+                # Files sharing a scope would be compared with each other
+                messages.error(
+                    request,
+                    f'More than one file in this upload would have the scope {", ".join(repeated)}. '
+                    f'Rename the files or upload them separately.'
+                )
+                return redirect('vulnerability_upload_scan')
+        queued = []
+        duplicates = []
         
-        # Validate file type
-        if not scan_file.name.endswith(('.xlsx', '.xls', '.csv')):
-            messages.error(request, 'Invalid file type. Please upload Excel (.xlsx, .xls) or CSV file.')
-            return redirect('vulnerability_management')
-        
-        # Create scan record
-        scan = VulnerabilityScan.objects.create(
-            name=scan_file.name,
-            file=scan_file,
-            uploaded_by=request.user
-        )
-        
-        try:
-            # Process the file
-            process_scan_file(scan)
-            messages.success(request, f'Scan uploaded successfully! Found {scan.vulnerabilities_found} vulnerabilities across {scan.hosts_scanned} hosts.')
-        except Exception as e:
-            messages.error(request, f'Error processing scan file: {str(e)}')
-            scan.delete()
+        for index, scan_file in enumerate(uploads):
+            if scan_file.name.endswith('.zip'):
+                try:
+                    for path, member, digest in iter_zip_members(scan_file, SCAN_FILE_EXTENSIONS):
+                        member_scope = _member_scope(scope, path, batch)
+                        scan, created = _queue_scan(request, member.name, member, digest, member_scope, reconcile)
+                        (queued if created else duplicates).append(scan)
+                except (zipfile.BadZipFile, ValueError) as e:
+                    messages.error(request, f'Could not read {scan_file.name}: {e}')
+            elif scan_file.name.endswith(SCAN_FILE_EXTENSIONS):
+                digest = uploaded_file_digest(request, 'scan_file', index)
+                member_scope = _member_scope(scope, scan_file.name, batch)
+                scan, created = _queue_scan(request, scan_file.name, scan_file, digest, member_scope, reconcile)
+                (queued if created else duplicates).append(scan)
+            else:
+                messages.error(
+                    request,
+                    f'Invalid file type for {scan_file.name}. Please upload Excel (.xlsx, .xls), '
+                    f'CSV, Nessus (.nessus) or a zip of those files.'
+                )
         
+        if queued:
+            messages.success(request, f'{len(queued)} scan file(s) uploaded and queued for processing.')
+        for existing in duplicates:
+            messages.info(
+                request,
+                f'"{existing.name}" was already uploaded on '
+                f'{existing.upload_date:%b %d, %Y}; no changes were made.'
+            )
         return redirect('vulnerability_management')
     
     return render(request, 'grc_dashboard/vulnerability_upload.html')
 
 
-def process_scan_file(scan):
-    """Process uploaded scan file and create vulnerability records"""
-    from .models import Vulnerability
-    
-    file_path = scan.file.path
-    
-    # Read the file
-    if file_path.endswith('.csv'):
-        df = pd.read_csv(file_path)
-    else:
-        df = pd.read_excel(file_path)
-    
-    # Expected columns (map to your template)
-    column_mapping = {
-        'Plugin': 'plugin_id',
-        'Plugin name': 'plugin_name',
-        'Severity': 'severity',
-        'IP address': 'ip_address',
-        'DNS name': 'dns_name',
-        'synopsis': 'synopsis',
-        'Description': 'description',
-        'Steps to remediate': 'remediation',
-        'CVE': 'cve',
-        'First discovered': 'first_discovered',
-        'Last Observed': 'last_observed',
-        'Plugin Output': 'plugin_output',
-        'Port': 'port',
-        'Exploit?': 'exploit_available',
-        'Key': 'unique_key',
-    }
+def _upload_names(uploads):
+    """Names of the scan files in an upload, zip members by their path in the archive"""
+    names = []
+    for scan_file in uploads:
+        if scan_file.name.endswith('.zip'):
+            try:
+                names += zip_member_names(scan_file, SCAN_FILE_EXTENSIONS)
+            except (zipfile.BadZipFile, ValueError):
+                # Reported when the archive is read
+                pass
+        elif scan_file.name.endswith(SCAN_FILE_EXTENSIONS):
+            names.append(scan_file.name)
+    return names
+
+
+def _member_scope(scope, name, batch):
+    """The scope of one file of an upload.
+
+    Files uploaded together cover different segments, so in a batch each is
+    scoped by its name (its path, in a zip) without the extension, under the
+    entered scope if there is one. Otherwise each file would be compared
+    with the one before it.
+    """
+    if not batch:
+        return scope
+    path = os.path.splitext(name)[0].strip('/')
+    return (f'{scope}/{path}' if scope else path)[:100]
+
+
+def _queue_scan(request, name, scan_file, digest, scope, reconcile):
+    """Create a queued scan, or return the existing scan for a byte-identical file"""
+    from .models import VulnerabilityScan
     
-    vulnerabilities_created = 0
-    hosts = set()
-    
-    for index, row in df.iterrows():
-        try:
-            # Extract data
-            data = {}
-            for col, field in column_mapping.items():
-                value = row.get(col, '')
-                
-                # Handle special conversions
-                if field == 'severity':
-                    value = str(value).lower()
-                elif field == 'exploit_available':
-                    value = str(value).lower() in ['yes', 'true', '1']
-                elif field in ['first_discovered', 'last_observed']:
-                    if pd.notna(value):
-                        try:
-                            value = pd.to_datetime(value).date()
-                        except:
-                            value = None
-                    else:
-                        value = None
-                elif field == 'port':
-                    try:
-                        value = int(value) if pd.notna(value) else None
-                    except:
-                        value = None
-                elif pd.isna(value):
-                    value = ''
-                
-                data[field] = value
-            
-            # Create or update vulnerability
-            vuln, created = Vulnerability.objects.update_or_create(
-                unique_key=data.get('unique_key', f"{data['ip_address']}-{data['plugin_id']}"),
-                defaults={
-                    'scan': scan,
-                    'plugin_id': data.get('plugin_id', ''),
-                    'plugin_name': data.get('plugin_name', ''),
-                    'ip_address': data.get('ip_address', '0.0.0.0'),
-                    'dns_name': data.get('dns_name', data.get('ip_address', 'Unknown')),
-                    'port': data.get('port'),
-                    'severity': data.get('severity', 'info'),
-                    'cve': data.get('cve', ''),
-                    'synopsis': data.get('synopsis', ''),
-                    'description': data.get('description', ''),
-                    'remediation': data.get('remediation', ''),
-                    'plugin_output': data.get('plugin_output', ''),
-                    'exploit_available': data.get('exploit_available', False),
-                    'first_discovered': data.get('first_discovered'),
-                    'last_observed': data.get('last_observed'),
-                }
-            )
-            
-            if created:
-                vulnerabilities_created += 1
-            
-            hosts.add(data.get('dns_name', data.get('ip_address', 'Unknown')))
-            
-        except Exception as e:
-            print(f"Error processing row {index}: {e}")
-            continue
+    # A file that was already uploaded is not stored or processed again
+    existing = VulnerabilityScan.objects.filter(file_sha256=digest).exclude(status='failed').first()
+    if existing:
+        return existing, False
+    
+    # The process_scans worker picks up queued scans
+    scan = VulnerabilityScan.objects.create(
+        name=name,
+        scope=scope,
+        reconcile=reconcile,
+        file=scan_file,
+        file_sha256=digest,
+        uploaded_by=request.user
+    )
+    return scan, True
+
+
+@login_required
+def vulnerability_scan_status(request, pk):
+    """API endpoint for scan processing progress and ingest telemetry"""
+    from .models import VulnerabilityScan
     
-    # Update scan statistics
-    scan.vulnerabilities_found = vulnerabilities_created
-    scan.hosts_scanned = len(hosts)
-    scan.processed = True
-    scan.save()
+    scan = get_object_or_404(VulnerabilityScan, pk=pk)
+    eta = scan.eta_seconds
+    
+    return JsonResponse({
+        'id': scan.id,
+        'name': scan.name,
+        'status': scan.status,
+        'rows_processed': scan.rows_processed,
+        'progress': round(scan.progress * 100, 1),
+        'rows_per_second': round(scan.rows_per_second, 1),
+        'eta_seconds': round(eta) if eta is not None else None,
+        'started_at': scan.started_at,
+        'finished_at': scan.finished_at,
+        'vulnerabilities_found': scan.vulnerabilities_found,
+        'vulnerabilities_created': scan.vulnerabilities_created,
+        'vulnerabilities_updated': scan.vulnerabilities_updated,
+        'rows_skipped': scan.rows_skipped,
+        'duplicate_rows': scan.duplicate_rows,
+        'hosts_scanned': scan.hosts_scanned,
+        'timings': {
+            'parse_seconds': round(scan.parse_seconds, 3),
+            'normalize_seconds': round(scan.normalize_seconds, 3),
+            'write_seconds': round(scan.write_seconds, 3),
+        },
+        'peak_memory_kb': scan.peak_memory_kb,
+        'row_errors': list(scan.row_errors.values('row_number', 'message')),
+        'error': scan.error_message,
+    })
+
+
+@login_required
+def vulnerability_scan_delta(request, pk):
+    """API endpoint for findings that changed since the previous scan of the same scope"""
+    from .models import ScanDelta, VulnerabilityScan
+    
+    scan = get_object_or_404(VulnerabilityScan, pk=pk)
+    change = request.GET.get('change', 'new')
+    if change not in dict(ScanDelta.CHANGE_CHOICES):
+        return JsonResponse({'error': f'Unknown change type: {change}'}, status=400)
+    
+    try:
+        after = int(request.GET.get('after', 0))
+        limit = min(int(request.GET.get('limit', 100)), 1000)
+    except ValueError:
+        return JsonResponse({'error': 'after and limit must be integers'}, status=400)
+    
+    # Served straight from the (scan, change, id) index
+    deltas = list(
+        ScanDelta.objects.filter(scan=scan, change=change, id__gt=after)
+        .order_by('id')
+        .values(
+            'id', 'vulnerability_id', 'vulnerability__unique_key', 'vulnerability__plugin_id',
+            'vulnerability__severity', 'vulnerability__cve',
+            'vulnerability__dns_name', 'vulnerability__ip_address', 'vulnerability__port',
+            plugin_name=F('vulnerability__plugin__plugin_name'),
+        )[:limit]
+    )
+    
+    return JsonResponse({
+        'scan': scan.id,
+        'scope': scan.scope,
+        'previous_scan': scan.previous_scan_id,
+        'counts': {
+            'new': scan.vulnerabilities_created if scan.previous_scan_id else 0,
+            'reappeared': scan.findings_reappeared,
+            'missing': scan.findings_missing,
+            'resolved': scan.findings_resolved,
+        },
+        'change': change,
+        'results': [
+            {key.replace('vulnerability__', ''): value for key, value in delta.items()}
+            for delta in deltas
+        ],
+        'next_after': deltas[-1]['id'] if len(deltas) == limit else None,
+    })
 
 
 @login_required
@@ -640,7 +869,9 @@ def vulnerability_update_status(request, pk):
         
         if new_status in dict(Vulnerability.STATUS_CHOICES):
             vulnerability.status = new_status
+            vulnerability.resolved_by_scan = None
             vulnerability.save()
+            refresh_hosts([vulnerability.dns_name])
             messages.success(request, 'Vulnerability status updated successfully.')
         
         return redirect('vulnerability_detail', pk=pk)
@@ -648,6 +879,81 @@ def vulnerability_update_status(request, pk):
     return redirect('vulnerability_management')
 
 
+@login_required
+def vulnerability_bulk_status(request):
+    """API endpoint to set the status of many findings in one UPDATE.
+
+    Takes a JSON body of {"status": ..., "ids": [...]} or
+    {"status": ..., "filter": {"plugin": ..., "host": ..., "scan": ..., "cve": ...}}
+    (any of the vulnerability list filters). Findings already in the target
+    status are left alone.
+    """
+    from .models import Vulnerability, VulnerabilityStatusChange
+    
+    if request.method != 'POST':
+        return JsonResponse({'error': 'POST required'}, status=405)
+    
+    try:
+        body = json.loads(request.body)
+    except ValueError:
+        return JsonResponse({'error': 'Request body must be JSON'}, status=400)
+    if not isinstance(body, dict):
+        return JsonResponse({'error': 'Request body must be a JSON object'}, status=400)
+    
+    new_status = body.get('status')
+    if new_status not in dict(Vulnerability.STATUS_CHOICES):
+        return JsonResponse({'error': f'Unknown status: {new_status}'}, status=400)
+    
+    ids = body.get('ids')
+    criteria = body.get('filter')
+    if ids is not None:
+        if not isinstance(ids, list) or not all(type(pk) is int for pk in ids):
+            return JsonResponse({'error': 'ids must be a list of integers'}, status=400)
+        if len(ids) > BULK_STATUS_MAX_IDS:
+            return JsonResponse({'error': f'At most {BULK_STATUS_MAX_IDS} ids per request'}, status=400)
+        vulnerabilities = Vulnerability.objects.filter(pk__in=ids)
+        criteria = {'ids': ids}
+    elif isinstance(criteria, dict):
+        # A field that cannot be applied must not widen the update to every
+        # finding, so anything _filter_vulnerabilities would skip is an error
+        unknown = sorted(set(criteria) - set(VULNERABILITY_FILTERS))
+        if unknown:
+            return JsonResponse({'error': f'Unknown filter fields: {", ".join(unknown)}'}, status=400)
+        for key, value in criteria.items():
+            if isinstance(value, bool) or not isinstance(value, (str, int)):
+                return JsonResponse({'error': f'filter {key} must be a string'}, status=400)
+        if 'scan' in criteria and not _is_scan_id(str(criteria['scan'])):
+            return JsonResponse({'error': 'filter scan must be a scan id'}, status=400)
+        
+        vulnerabilities, filters = _filter_vulnerabilities(criteria, Vulnerability.objects.all())
+        criteria = {key: value for key, value in filters.items() if value}
+        # An empty filter would change every finding
+        if not criteria:
+            return JsonResponse({'error': 'filter must set at least one field'}, status=400)
+    else:
+        return JsonResponse({'error': 'Either ids or filter is required'}, status=400)
+    
+    vulnerabilities = vulnerabilities.exclude(status=new_status)
+    with transaction.atomic():
+        dns_names = list(vulnerabilities.order_by().values_list('dns_name', flat=True).distinct())
+        updated = vulnerabilities.update(status=new_status, resolved_by_scan=None, updated_at=timezone.now())
+        change = VulnerabilityStatusChange.objects.create(
+            user=request.user,
+            status=new_status,
+            criteria=criteria,
+            findings_updated=updated,
+            hosts_affected=len(dns_names),
+        )
+        refresh_hosts(dns_names)
+    
+    return JsonResponse({
+        'change': change.id,
+        'status': new_status,
+        'updated': updated,
+        'hosts': len(dns_names),
+    })
+
+
 @login_required
 def vulnerability_add_note(request, pk):
     """Add a note to a vulnerability"""
@@ -677,55 +983,126 @@ def vulnerability_scan_delete(request, pk):
     
     if request.method == 'POST':
         scan = get_object_or_404(VulnerabilityScan, pk=pk)
+        dns_names = list(scan.vulnerabilities.order_by().values_list('dns_name', flat=True).distinct())
         scan.file.delete()
         scan.delete()
+        refresh_hosts(dns_names)
         messages.success(request, 'Scan deleted successfully.')
     
     return redirect('vulnerability_management')
 
 
+class Echo:
+    """Pseudo-buffer whose write() returns the value, so csv.writer rows can be streamed"""
+    
+    def write(self, value):
+        return value
+
+
+# Rows fetched per database round trip, and CSV rows per streamed chunk
+EXPORT_CHUNK_SIZE = 2000
+EXPORT_ROWS_PER_WRITE = 500
+
+
 @login_required
 def vulnerability_export(request):
-    """Export vulnerabilities to CSV"""
+    """Stream vulnerabilities as CSV, with the same filters as the list view"""
     from .models import Vulnerability
     
-    vulnerabilities = Vulnerability.objects.all()
-    
-    # Apply same filters as main view
-    severity_filter = request.GET.get('severity')
-    status_filter = request.GET.get('status')
-    
-    if severity_filter:
-        vulnerabilities = vulnerabilities.filter(severity=severity_filter)
-    if status_filter:
-        vulnerabilities = vulnerabilities.filter(status=status_filter)
-    
-    response = HttpResponse(content_type='text/csv')
-    response['Content-Disposition'] = 'attachment; filename="vulnerabilities_export.csv"'
-    
-    writer = csv.writer(response)
-    writer.writerow([
-        'CVE', 'Plugin ID', 'Plugin Name', 'Severity', 'Status',
-        'DNS Name', 'IP Address', 'Port', 'Synopsis', 'Description',
-        'Remediation', 'First Discovered', 'Last Observed', 'Scan Name'
-    ])
-    
-    for vuln in vulnerabilities:
-        writer.writerow([
-            vuln.cve,
-            vuln.plugin_id,
-            vuln.plugin_name,
-            vuln.get_severity_display(),
-            vuln.get_status_display(),
-            vuln.dns_name,
-            vuln.ip_address,
-            vuln.port or '',
-            vuln.synopsis,
-            vuln.description,
-            vuln.remediation,
-            vuln.first_discovered or '',
-            vuln.last_observed or '',
-            vuln.scan.name,
+    vulnerabilities, filters = _filter_vulnerabilities(request.GET, Vulnerability.objects.all())
+    
+    # Plain tuples fetched in chunks (a server-side cursor on PostgreSQL);
+    # the scan name comes from the same query
+    rows = vulnerabilities.values_list(
+        'cve', 'plugin_id', 'plugin__plugin_name', 'severity', 'status',
+        'dns_name', 'ip_address', 'port', 'plugin__synopsis', 'plugin__description',
+        'plugin__remediation', 'first_discovered', 'last_observed', 'scan__name',
+    ).iterator(chunk_size=EXPORT_CHUNK_SIZE)
+    
+    severity_labels = dict(Vulnerability.SEVERITY_CHOICES)
+    status_labels = dict(Vulnerability.STATUS_CHOICES)
+    
+    def csv_rows():
+        writer = csv.writer(Echo())
+        yield writer.writerow([
+            'CVE', 'Plugin ID', 'Plugin Name', 'Severity', 'Status',
+            'DNS Name', 'IP Address', 'Port', 'Synopsis', 'Description',
+            'Remediation', 'First Discovered', 'Last Observed', 'Scan Name'
         ])
+        
+        lines = []
+        for (cve, plugin_id, plugin_name, severity, status, dns_name, ip_address, port,
+             synopsis, description, remediation, first_discovered, last_observed, scan_name) in rows:
+            lines.append(writer.writerow([
+                cve,
+                plugin_id,
+                plugin_name,
+                severity_labels.get(severity, severity),
+                status_labels.get(status, status),
+                dns_name,
+                ip_address,
+                port or '',
+                synopsis,
+                description,
+                remediation,
+                first_discovered or '',
+                last_observed or '',
+                scan_name,
+            ]))
+            if len(lines) >= EXPORT_ROWS_PER_WRITE:
+                yield ''.join(lines)
+                lines = []
+        if lines:
+            yield ''.join(lines)
+    
+    response = StreamingHttpResponse(_streaming_content(request, csv_rows()), content_type='text/csv')
+    response['Content-Disposition'] = 'attachment; filename="vulnerabilities_export.csv"'
+    return response
+
+
+def _streaming_content(request, chunks):
+    """Return chunks in the form that streams under the handler serving request.
+
+    Under ASGI, Django reads a synchronous iterator into a list before
+    sending any of it, so there each chunk is produced through
+    sync_to_async on the thread that holds the request's connection.
+    """
+    if not isinstance(request, ASGIRequest):
+        return chunks
+    
+    async def achunks():
+        next_chunk = sync_to_async(next, thread_sensitive=True)
+        while (chunk := await next_chunk(chunks, None)) is not None:
+            yield chunk
+    
+    return achunks()
+
+
+@login_required
+def data_export(request, dataset, fmt):
+    """Download a whole dataset as Parquet or xlsx; vulnerabilities honor the list filters"""
+    from .models import Vulnerability
     
-    return response
\ No newline at end of file
+    if dataset not in DATASETS or fmt not in EXPORT_FORMATS:
+        raise Http404('Unknown export')
+    
+    queryset = None
+    if dataset == 'vulnerabilities':
+        queryset, filters = _filter_vulnerabilities(request.GET, Vulnerability.objects.all())
+    
+    # Built in a temporary file, then streamed by FileResponse, which closes
+    # it. Neither format can be sent as it is written: an xlsx is a zip that
+    # openpyxl assembles from its sheet files in save(), and Parquet ends
+    # with a footer indexing the row groups
+    out = tempfile.TemporaryFile()
+    try:
+        write_export(dataset, fmt, out, queryset)
+    except ImportError as e:
+        out.close()
+        return JsonResponse({'error': str(e)}, status=501)
+    except ValueError as e:
+        out.close()
+        return JsonResponse({'error': str(e)}, status=400)
+    out.seek(0)
+    
+    return FileResponse(out, as_attachment=True, filename=f'{dataset}.{fmt}', content_type=EXPORT_FORMATS[fmt])
@@ -133,4 +133,30 @@ STATIC_ROOT = os.path.join(BASE_DIR, 'staticfiles')
 
 # Media files
 MEDIA_URL = '/media/'
-MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
\ No newline at end of file
+MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
+
+# Caches. The dashboard metrics bundle lives in its own cache and is
+# invalidated by model signals; local memory is per process, so deployments
+# running several web processes (or the process_scans worker alongside)
+# should set DASHBOARD_CACHE_DIR to share one file-based cache
+DASHBOARD_CACHE_DIR = os.environ.get('DASHBOARD_CACHE_DIR')
+
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    },
+    'dashboard': {
+        'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+        'LOCATION': DASHBOARD_CACHE_DIR,
+    } if DASHBOARD_CACHE_DIR else {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+        'LOCATION': 'dashboard',
+    },
+}
+
+# Upload handlers; HashingUploadHandler digests scan files as they stream in
+FILE_UPLOAD_HANDLERS = [
+    'grc_dashboard.uploadhandlers.HashingUploadHandler',
+    'django.core.files.uploadhandler.MemoryFileUploadHandler',
+    'django.core.files.uploadhandler.TemporaryFileUploadHandler',
+]